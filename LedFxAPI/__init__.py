@@ -1,4 +1,67 @@
-from .ledfx import LedFx
-from .rest_client import ApiError
+import importlib
+from typing import TYPE_CHECKING
 
-__all__ = ['LedFx', 'ApiError']
+if TYPE_CHECKING:
+    from .batch import BatchFailedError, BatchResult
+    from .cluster import LedFxCluster
+    from .command_queue import CommandQueue
+    from .config_builder import ConfigValidationError, EffectSchemas
+    from .disk_cache import DiskCache
+    from .events import Event, EventClient
+    from .frame_streamer import FrameStreamer
+    from .instrumentation import HistogramRecorder, Instrumentation
+    from .ledfx import LedFx
+    from .models import Device, Effect, Preset, PresetType, Scene, Virtual
+    from .preset_index import PresetIndex
+    from .resilience import CircuitBreaker, RetryPolicy
+    from .response_cache import ResponseCache
+    from .rest_client import (ApiConnectionError, ApiDecodeError, ApiError, ApiResponseError, ApiTimeoutError,
+                              CircuitOpenError, PoolConfig)
+    from .sequencer import Cue, Sequencer
+    from .snapshot import Snapshot
+    from .sync_client import SyncLedFx
+
+# exports are imported on first access, importing aiohttp and NumPy dominates the startup time of short scripts
+_EXPORTS = {
+    'BatchFailedError': 'batch', 'BatchResult': 'batch',
+    'LedFxCluster': 'cluster',
+    'CommandQueue': 'command_queue',
+    'ConfigValidationError': 'config_builder', 'EffectSchemas': 'config_builder',
+    'DiskCache': 'disk_cache',
+    'Event': 'events', 'EventClient': 'events',
+    'FrameStreamer': 'frame_streamer',
+    'HistogramRecorder': 'instrumentation', 'Instrumentation': 'instrumentation',
+    'LedFx': 'ledfx',
+    'Device': 'models', 'Effect': 'models', 'Preset': 'models', 'PresetType': 'models', 'Scene': 'models',
+    'Virtual': 'models',
+    'PresetIndex': 'preset_index',
+    'CircuitBreaker': 'resilience', 'RetryPolicy': 'resilience',
+    'ResponseCache': 'response_cache',
+    'ApiConnectionError': 'rest_client', 'ApiDecodeError': 'rest_client', 'ApiError': 'rest_client',
+    'ApiResponseError': 'rest_client', 'ApiTimeoutError': 'rest_client', 'CircuitOpenError': 'rest_client',
+    'PoolConfig': 'rest_client',
+    'Cue': 'sequencer', 'Sequencer': 'sequencer',
+    'Snapshot': 'snapshot',
+    'SyncLedFx': 'sync_client',
+}
+
+__all__ = ['LedFx', 'LedFxCluster', 'SyncLedFx',
+           'ApiError', 'ApiConnectionError', 'ApiDecodeError', 'ApiResponseError', 'ApiTimeoutError', 'CircuitOpenError',
+           'BatchFailedError', 'ConfigValidationError',
+           'BatchResult', 'CircuitBreaker', 'CommandQueue', 'Cue', 'DiskCache', 'EffectSchemas', 'Event',
+           'EventClient', 'FrameStreamer', 'HistogramRecorder', 'Instrumentation', 'PoolConfig', 'PresetIndex',
+           'ResponseCache', 'RetryPolicy', 'Sequencer', 'Snapshot',
+           'Device', 'Effect', 'Preset', 'PresetType', 'Scene', 'Virtual']
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
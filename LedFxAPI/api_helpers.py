@@ -1,32 +1,106 @@
-from enum import Enum
+import asyncio
+import logging
 
+from . import models
+from .batch import check_response, iter_batch, run_batch
+from .models import PresetType
+from .preset_index import PresetIndex
 from .raw_api import RawAPI
-from .rest_client import ApiError
+from .rest_client import ApiConnectionError, ApiError
 
-
-class PresetType(Enum):
-    DEFAULT = 'default_presets'
-    CUSTOM = 'custom_presets'
+_LOGGER = logging.getLogger(__name__)
 
 
 class APIHelpers:
-    def __init__(self, api: RawAPI):
+    def __init__(self, api: RawAPI, disk_cache=None):
+        """
+        :param api: RawAPI of the LedFx instance
+        :param disk_cache: optional DiskCache keeping schema and presets across restarts
+        """
         self._api = api
-        self._preset_lookup = None
-
-    async def load_helpers(self):
-        effects = await self.get_all_effect_ids()
-        preset_type_lookup = {}
-        for effect_id in effects:
-            default_presets = await self.get_presets_for_effect(effect_id, PresetType.DEFAULT)
-            if default_presets is not None:
-                for default_preset in default_presets:
-                    preset_type_lookup[default_preset] = PresetType.DEFAULT
-            custom_presets = await self.get_presets_for_effect(effect_id, PresetType.CUSTOM)
-            if custom_presets is not None:
-                for custom_preset in custom_presets:
-                    preset_type_lookup[custom_preset] = PresetType.CUSTOM
-        self._preset_lookup = preset_type_lookup
+        self.disk_cache = disk_cache
+        self._preset_index = None
+        self._schema = None
+        self._effect_schemas = None
+        self._presets = {}
+        self._index_tasks = set()
+        api.add_mutation_listener(self._on_mutation)
+
+    @property
+    def preset_index(self):
+        """
+        Index of all presets, available after load_helpers
+
+        :return: PresetIndex or None
+        """
+        return self._preset_index
+
+    async def load_helpers(self, max_concurrency=10, revalidate=False):
+        """
+        Build the preset table, fetching the presets of all effects concurrently.
+        With a disk cache the tables saved last for this instance are used at once, without waiting for the instance;
+        the LedFx version is checked in the background and the tables are fetched again only if it changed.
+        Tables are only saved when the presets of all effects could be fetched.
+
+        :param max_concurrency: max number of preset requests in flight at once
+        :param revalidate: also fetch tables loaded from the disk cache again when the version is unchanged
+        """
+        if self.disk_cache is None:
+            await self._fetch_tables(max_concurrency)
+            return
+        tables = self.disk_cache.load(self._api.base_url)
+        if tables is None:
+            version = (await self._api.ledfx_info()).get('version')
+            await self._fetch_tables(max_concurrency, version)
+            return
+        self._use_tables(tables.schema, tables.presets)
+        self._schedule(self._revalidate(max_concurrency, tables.version, revalidate))
+
+    async def _revalidate(self, max_concurrency, cached_version, always):
+        try:
+            version = (await self._api.ledfx_info()).get('version')
+        except ApiConnectionError as e:
+            _LOGGER.info("Using saved tables of %s while it is unreachable: %s", self._api.base_url, e)
+            return
+        if always or version != cached_version:
+            await self._fetch_tables(max_concurrency, version)
+
+    async def _fetch_tables(self, max_concurrency, version=None):
+        if self.disk_cache is None:
+            schema = None
+            effects = await self.get_all_effect_ids()
+        else:
+            schema = await self._api.ledfx_schema()
+            effects = list(schema['effects'])
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def fetch_presets(effect_id):
+            async with semaphore:
+                try:
+                    return await self._api.effect_get_presets(effect_id)
+                except ApiError as e:
+                    _LOGGER.warning("Could not load presets of effect %s: %s", effect_id, e)
+                    return None
+
+        results = await asyncio.gather(*(fetch_presets(effect_id) for effect_id in effects))
+        presets = {effect_id: presets for effect_id, presets in zip(effects, results) if presets is not None}
+        failed = [effect_id for effect_id in effects if effect_id not in presets]
+        # effects whose presets could not be fetched keep the ones loaded before, if any
+        presets.update((effect_id, self._presets[effect_id]) for effect_id in failed if effect_id in self._presets)
+        self._use_tables(schema, presets)
+        if failed and self.disk_cache is not None:
+            _LOGGER.warning("Not saving the tables of %s, presets of %d effects are missing",
+                            self._api.base_url, len(failed))
+        elif self.disk_cache is not None and version is not None:
+            await asyncio.get_running_loop().run_in_executor(
+                None, self.disk_cache.save, self._api.base_url, version, schema, presets)
+
+    def _use_tables(self, schema, presets):
+        self._presets = presets
+        self._preset_index = PresetIndex.from_responses(presets)
+        if schema is not None:
+            self._schema = schema
+            self._effect_schemas = None
 
     async def get_all_virtuals(self):
         """
@@ -44,7 +118,7 @@ class APIHelpers:
 
         :return: List
         """
-        schema = await self._api.ledfx_schema()
+        schema = await self._api.ledfx_schema(select='effects.*.id')
         return list(schema['effects'].keys())
 
     async def get_presets_for_effect(self, effect_id, preset_type: PresetType):
@@ -55,6 +129,8 @@ class APIHelpers:
         :param preset_type: preset type, default_presets or custom_presets
         :return: List
         """
+        if self._preset_index is not None and self._preset_index.has_effect(effect_id):
+            return [preset.id for preset in self._preset_index.presets_for_effect(effect_id, preset_type)]
         presets = await self._api.effect_get_presets(effect_id)
         if presets is None:
             return None
@@ -67,6 +143,8 @@ class APIHelpers:
         :param effect_id: ID of the effect
         :return: List of all preset ids
         """
+        if self._preset_index is not None and self._preset_index.has_effect(effect_id):
+            return [preset.id for preset in self._preset_index.presets_for_effect(effect_id)]
         presets = await self._api.effect_get_presets(effect_id)
         if presets['status'] == 'failed':
             raise ApiError(presets['reason'])
@@ -74,15 +152,294 @@ class APIHelpers:
         custom_presets = list(presets[PresetType.CUSTOM.value].keys())
         return default_presets + custom_presets
 
-    async def set_preset(self, virtual_id, effect_id, preset_id):
-        if preset_id not in self._preset_lookup.keys():
+    # async iterators
+
+    async def iter_virtual_ids(self):
+        """
+        Yield the ids of all virtuals
+
+        :return: async iterator of ids
+        """
+        data = check_response(await self._api.virtuals_all())
+        for virtual in data['virtuals'].values():
+            yield virtual['id']
+
+    async def iter_effect_ids(self):
+        """
+        Yield the ids of all effects
+
+        :return: async iterator of ids
+        """
+        schema = await self._api.ledfx_schema(select='effects.*.id')
+        for effect_id in schema['effects']:
+            yield effect_id
+
+    async def iter_presets(self, effect_ids=None, preset_type: PresetType = None, max_concurrency=10):
+        """
+        Yield the presets of many effects as their requests complete, in completion order.
+        Effects already in the preset index are served from it, failed effects are logged and skipped.
+
+        :param effect_ids: iterable of effect ids, None for all effects
+        :param preset_type: only yield presets of this type
+        :param max_concurrency: max number of preset requests in flight at once
+        :return: async iterator of Preset
+        """
+        if effect_ids is None:
+            effect_ids = [effect_id async for effect_id in self.iter_effect_ids()]
+        index = self._preset_index
+        missing = []
+        for effect_id in effect_ids:
+            if index is not None and index.has_effect(effect_id):
+                for preset in index.presets_for_effect(effect_id, preset_type):
+                    yield preset
+            else:
+                missing.append(effect_id)
+        async for result in iter_batch(missing, self._api.effect_get_presets, max_concurrency):
+            if not result.ok:
+                _LOGGER.warning("Could not load presets of effect %s: %s", result.target, result.error)
+                continue
+            for preset in models.parse_presets(result.target, result.result):
+                if preset_type is None or preset.category is preset_type:
+                    yield preset
+
+    async def iter_presets_for_effect(self, effect_id, preset_type: PresetType = None):
+        """
+        Yield the presets of one effect
+
+        :param effect_id: ID of the effect
+        :param preset_type: only yield presets of this type
+        :return: async iterator of Preset
+        """
+        async for preset in self.iter_presets((effect_id,), preset_type, 1):
+            yield preset
+
+    # typed models
+
+    async def get_virtual_models(self):
+        """
+        Get all virtuals as typed objects
+
+        :return: dict of virtual id to Virtual
+        """
+        return models.parse_virtuals(await self._api.virtuals_all())
+
+    async def get_device_models(self):
+        """
+        Get all devices as typed objects
+
+        :return: dict of device id to Device
+        """
+        return models.parse_devices(await self._api.devices_all_config())
+
+    async def get_effect_models(self):
+        """
+        Get all effect types of the schema as typed objects
+
+        :return: dict of effect id to Effect
+        """
+        return models.parse_effects(await self._api.ledfx_schema())
+
+    async def get_preset_models(self, effect_id):
+        """
+        Get all presets of an effect as typed objects
+
+        :param effect_id: ID of the effect
+        :return: list of Preset
+        """
+        presets = await self._api.effect_get_presets(effect_id)
+        if presets['status'] == 'failed':
+            raise ApiError(presets['reason'])
+        return models.parse_presets(effect_id, presets)
+
+    async def get_scene_models(self):
+        """
+        Get all scenes as typed objects
+
+        :return: dict of scene id to Scene
+        """
+        return models.parse_scenes(await self._api.scenes_get_all())
+
+    # effect configs
+
+    async def effect_schemas(self, reload=False):
+        """
+        Compiled schemas of all effects for validating and building configs, fetched on first use
+
+        :param reload: fetch the schemas again, e.g. after LedFx was updated
+        :return: EffectSchemas
+        """
+        if self._effect_schemas is None or reload:
+            # imported here as it loads NumPy
+            from .config_builder import EffectSchemas
+
+            if self._schema is not None and not reload:
+                self._effect_schemas = EffectSchemas.from_response(self._schema)
+            else:
+                self._effect_schemas = await EffectSchemas.load(self._api)
+        return self._effect_schemas
+
+    # presets
+
+    def search_presets(self, query, limit=10, fuzzy=True, effect_id=None):
+        """
+        Find presets by name, requires load_helpers
+
+        :param query: (part of) a preset name
+        :param limit: max number of results
+        :param fuzzy: include similar names if there are not enough prefix matches
+        :param effect_id: only search presets of this effect
+        :return: list of Preset
+        """
+        if self._preset_index is None:
+            raise ValueError("Preset index not loaded, call load_helpers first")
+        return self._preset_index.search(query, limit, fuzzy, effect_id)
+
+    async def reload_presets(self, effect_id):
+        """
+        Fetch the presets of one effect again and update the preset index
+
+        :param effect_id: ID of the effect
+        """
+        presets = await self._api.effect_get_presets(effect_id)
+        if self._preset_index is not None and presets is not None and presets.get('status') != 'failed':
+            self._preset_index.replace_effect(effect_id, models.parse_presets(effect_id, presets))
+            self._presets[effect_id] = presets
+
+    async def _reload_presets_of_device(self, device_id):
+        response = await self._api.device_get_effect(device_id)
+        effect = (response or {}).get('effect') or {}
+        effect_id = effect.get('effect_type') or effect.get('type')
+        if effect_id:
+            await self.reload_presets(effect_id)
+
+    async def flush(self):
+        """
+        Wait for background updates of the preset index, e.g. the refresh started by load_helpers
+        """
+        while self._index_tasks:
+            await asyncio.gather(*self._index_tasks, return_exceptions=True)
+
+    async def close(self):
+        """
+        Cancel background updates of the preset index
+        """
+        tasks = list(self._index_tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _schedule(self, coro):
+        # the coroutine is the task itself so cancelling it before it started does not leave it unawaited
+        task = asyncio.ensure_future(coro)
+        self._index_tasks.add(task)
+        task.add_done_callback(self._index_task_done)
+
+    def _index_task_done(self, task):
+        self._index_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            _LOGGER.error("Updating the preset index failed", exc_info=task.exception())
+
+    def _on_mutation(self, method, path, data, response):
+        if self._preset_index is None or not path.endswith('presets') or method == 'GET':
+            return
+        parts = path.strip('/').split('/')
+        if len(parts) != 3 or not isinstance(response, dict) or response.get('status') == 'failed':
+            return
+        collection, item_id = parts[0], parts[1]
+        if collection == 'effects':
+            data = data if isinstance(data, dict) else {}
+            preset_id = data.get('preset_id')
+            if method == 'DELETE' and preset_id is not None:
+                self._preset_index.remove(item_id, preset_id)
+            elif method == 'PUT' and preset_id is not None and 'name' in data:
+                self._preset_index.rename(item_id, preset_id, data['name'])
+            else:
+                self._schedule(self.reload_presets(item_id))
+        elif collection == 'devices' and method == 'POST':
+            # saved as custom preset of the device's active effect
+            self._schedule(self._reload_presets_of_device(item_id))
+
+    def preset_config(self, effect_id, preset_id):
+        """
+        Body applying a preset to a virtual, the category is looked up in the preset index, requires load_helpers
+
+        :param effect_id: ID of the effect
+        :param preset_id: ID of the preset
+        :return: dict for RawAPI.virtual_presets_set
+        :raises ValueError: if the preset is not in the index
+        """
+        preset = self._preset_index.get(effect_id, preset_id) if self._preset_index is not None else None
+        if preset is None:
             raise ValueError("Invalid preset id")
-        preset_type = self._preset_lookup[preset_id]
-        data = {
-            'category': preset_type.value,
+        return {
+            'category': preset.category.value,
             'effect_id': effect_id,
             'preset_id': preset_id
         }
+
+    async def set_preset(self, virtual_id, effect_id, preset_id):
+        data = self.preset_config(effect_id, preset_id)
         return await self._api.virtual_presets_set(virtual_id, data)
 
+    # batch operations
 
+    async def batch_set_preset(self, virtual_ids, effect_id, preset_id, max_concurrency=None):
+        """
+        Apply a preset to many virtuals at once
+
+        :param virtual_ids: ids of the virtuals
+        :param effect_id: ID of the effect
+        :param preset_id: ID of the preset
+        :param max_concurrency: max number of requests in flight at once, None for no limit
+        :return: BatchResult keyed by virtual id
+        """
+        data = self.preset_config(effect_id, preset_id)
+        return await run_batch(virtual_ids, lambda virtual_id: self._api.virtual_presets_set(virtual_id, data),
+                               max_concurrency)
+
+    async def batch_set_effect(self, virtual_ids, config, max_concurrency=None):
+        """
+        Set the same effect on many virtuals at once
+
+        :param virtual_ids: ids of the virtuals
+        :param config: effect config, e.g. {'type': 'energy', 'config': {...}}
+        :param max_concurrency: max number of requests in flight at once, None for no limit
+        :return: BatchResult keyed by virtual id
+        """
+        return await run_batch(virtual_ids, lambda virtual_id: self._api.virtual_effect_set(virtual_id, config),
+                               max_concurrency)
+
+    async def batch_set_effect_configs(self, effect_type, configs, max_concurrency=None, validate=True):
+        """
+        Set an effect with its own config on each virtual.
+        All configs are checked against the effect schema before the first request is sent.
+
+        :param effect_type: ID of the effect
+        :param configs: dict of virtual id to effect config, e.g. dict(zip(virtual_ids, schema.build(...)))
+        :param max_concurrency: max number of requests in flight at once, None for no limit
+        :param validate: False to skip validation, e.g. for configs returned by EffectSchema.build
+        :return: BatchResult keyed by virtual id
+        :raises ConfigValidationError: if a config is invalid, nothing is sent then
+        """
+        if validate:
+            schema = (await self.effect_schemas()).schema(effect_type)
+            errors = [(virtual_id, key, message) for virtual_id, config in configs.items()
+                      for key, message in schema.errors(config)]
+            if errors:
+                from .config_builder import ConfigValidationError
+
+                raise ConfigValidationError(effect_type, errors)
+        return await run_batch(configs, lambda virtual_id: self._api.virtual_effect_set(
+            virtual_id, {'type': effect_type, 'config': configs[virtual_id]}), max_concurrency)
+
+    async def batch_pause_unpause(self, virtual_ids, is_active: bool, max_concurrency=None):
+        """
+        Pause or unpause many virtuals at once
+
+        :param virtual_ids: ids of the virtuals
+        :param is_active: False to pause, True to unpause
+        :param max_concurrency: max number of requests in flight at once, None for no limit
+        :return: BatchResult keyed by virtual id
+        """
+        return await run_batch(virtual_ids, lambda virtual_id: self._api.virtual_pause_unpause(virtual_id, is_active),
+                               max_concurrency)
@@ -0,0 +1,156 @@
+import asyncio
+import time
+
+from .rest_client import ApiError
+
+_EXHAUSTED = object()
+
+
+class TargetResult:
+    """
+    Outcome of one call of a batch
+    """
+    __slots__ = ('target', 'result', 'error', 'completed_at')
+
+    def __init__(self, target, result=None, error=None, completed_at=0.0):
+        self.target = target
+        self.result = result
+        self.error = error
+        self.completed_at = completed_at
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def __repr__(self):
+        state = 'ok' if self.ok else f"error={self.error!r}"
+        return f"TargetResult({self.target!r}, {state}, completed_at={self.completed_at:.4f})"
+
+
+class BatchResult:
+    """
+    Results of a batch keyed by target, with timing relative to the batch start
+    """
+
+    def __init__(self, results, duration):
+        self.results = {result.target: result for result in results}
+        self.duration = duration
+
+    def __getitem__(self, target):
+        return self.results[target]
+
+    def __iter__(self):
+        return iter(self.results.values())
+
+    def __len__(self):
+        return len(self.results)
+
+    @property
+    def succeeded(self):
+        return [result.target for result in self if result.ok]
+
+    @property
+    def failed(self):
+        return {result.target: result.error for result in self if not result.ok}
+
+    @property
+    def skew(self):
+        """
+        Spread between the first and the last completed call in seconds
+
+        :return: float
+        """
+        if not self.results:
+            return 0.0
+        completed = [result.completed_at for result in self]
+        return max(completed) - min(completed)
+
+    def __repr__(self):
+        return (f"BatchResult(targets={len(self)}, failed={len(self.failed)}, "
+                f"duration={self.duration:.4f}, skew={self.skew:.4f})")
+
+
+class BatchFailedError(ApiError):
+    """
+    Some calls of a nested batch failed, result holds the BatchResult with the outcome of every call
+    """
+
+    def __init__(self, result):
+        super().__init__(f"{len(result.failed)} of {len(result)} calls failed")
+        self.result = result
+
+
+def check_response(response):
+    """
+    Raise if a LedFx response signals an error
+
+    :param response: decoded response
+    :return: response
+    """
+    if response is None:
+        raise ApiError('No response from LedFx instance')
+    if isinstance(response, dict) and response.get('status') == 'failed':
+        raise ApiError(response.get('reason', response))
+    return response
+
+
+async def _run_target(target, operation, start, semaphore=None):
+    try:
+        if semaphore is None:
+            result = check_response(await operation(target))
+        else:
+            async with semaphore:
+                result = check_response(await operation(target))
+        return TargetResult(target, result=result, completed_at=time.perf_counter() - start)
+    except Exception as e:
+        return TargetResult(target, error=e, completed_at=time.perf_counter() - start)
+
+
+async def run_batch(targets, operation, max_concurrency=None):
+    """
+    Run an operation for all targets concurrently
+
+    :param targets: iterable of targets, e.g. virtual ids
+    :param operation: coroutine function called with a single target
+    :param max_concurrency: max number of calls in flight at once, None for no limit
+    :return: BatchResult
+    """
+    semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+    start = time.perf_counter()
+    results = await asyncio.gather(*(_run_target(target, operation, start, semaphore) for target in targets))
+    return BatchResult(results, time.perf_counter() - start)
+
+
+async def iter_batch(targets, operation, max_concurrency=10):
+    """
+    Run an operation for all targets, yielding results as they complete.
+    Targets are taken from the iterable only when a slot is free, so large or lazy inputs are fine.
+    Calls still in flight are cancelled when the consumer stops iterating.
+
+    :param targets: iterable of targets, e.g. effect ids
+    :param operation: coroutine function called with a single target
+    :param max_concurrency: max number of calls in flight at once
+    :return: async iterator of TargetResult in completion order
+    """
+    targets = iter(targets)
+    start = time.perf_counter()
+    pending = set()
+
+    def fill():
+        while len(pending) < max_concurrency:
+            target = next(targets, _EXHAUSTED)
+            if target is _EXHAUSTED:
+                return
+            pending.add(asyncio.ensure_future(_run_target(target, operation, start)))
+
+    try:
+        fill()
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            pending.difference_update(done)
+            fill()
+            for task in done:
+                yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
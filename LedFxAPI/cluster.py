@@ -0,0 +1,176 @@
+import asyncio
+
+from .batch import BatchFailedError, run_batch
+from .ledfx import LedFx
+from .rest_client import PoolConfig
+
+
+class LedFxCluster:
+    """
+    Group of LedFx instances sharing one connection pool.
+
+    Calls can be broadcast to all instances or to the ones carrying a tag,
+    results are collected in a BatchResult keyed by instance name.
+    """
+
+    def __init__(self, pool_config=None, instrumentation=None):
+        """
+        :param pool_config: PoolConfig of the connection pool shared by all instances
+        :param instrumentation: optional Instrumentation shared by all instances
+        """
+        self._pool_config = pool_config or PoolConfig()
+        self._instrumentation = instrumentation
+        self._session = None
+        self._instances = {}
+        self._tags = {}
+
+    @property
+    def session(self):
+        """
+        Session shared by all instances, created on first use
+
+        :return: aiohttp.ClientSession
+        """
+        if self._session is None or self._session.closed:
+            import aiohttp
+
+            trace_configs = [self._instrumentation.trace_config()] if self._instrumentation is not None else None
+            self._session = aiohttp.ClientSession(connector=self._pool_config.create_connector(),
+                                                  trace_configs=trace_configs)
+        return self._session
+
+    def add(self, name, host, port, ssl=False, tags=(), **options):
+        """
+        Add an instance to the cluster, must be called from a running event loop
+
+        :param name: unique name of the instance
+        :param host: host of the LedFx instance
+        :param port: port of the LedFx instance
+        :param ssl: use https
+        :param tags: tags used to address a subset of instances
+        :param options: further keyword arguments of LedFx, e.g. cache or timeout
+        :return: LedFx
+        """
+        if name in self._instances:
+            raise ValueError(f"Instance {name} already exists")
+        instance = LedFx(host, port, ssl, session=self.session, instrumentation=self._instrumentation, **options)
+        self._instances[name] = instance
+        self._tags[name] = frozenset(tags)
+        return instance
+
+    async def remove(self, name):
+        """
+        Remove an instance from the cluster and close it, the shared session stays open
+
+        :param name: name of the instance
+        """
+        instance = self._instances.pop(name)
+        del self._tags[name]
+        await instance.close()
+
+    def __getitem__(self, name):
+        return self._instances[name]
+
+    def __contains__(self, name):
+        return name in self._instances
+
+    def __len__(self):
+        return len(self._instances)
+
+    @property
+    def names(self):
+        return list(self._instances.keys())
+
+    def select(self, tags=None):
+        """
+        Get the names of all instances carrying at least one of the given tags
+
+        :param tags: iterable of tags, None for all instances
+        :return: list of names
+        """
+        if tags is None:
+            return self.names
+        if isinstance(tags, str):
+            tags = (tags,)
+        tags = frozenset(tags)
+        return [name for name, instance_tags in self._tags.items() if instance_tags & tags]
+
+    async def broadcast(self, operation, tags=None, max_concurrency=None):
+        """
+        Run an operation on all selected instances concurrently
+
+        :param operation: coroutine function called with a LedFx instance
+        :param tags: tags selecting the instances, None for all
+        :param max_concurrency: max number of instances called at once, None for no limit
+        :return: BatchResult keyed by instance name
+        """
+        return await run_batch(self.select(tags), lambda name: operation(self._instances[name]), max_concurrency)
+
+    async def load_helpers(self, tags=None):
+        """
+        Build the preset tables of all selected instances
+
+        :param tags: tags selecting the instances, None for all
+        :return: BatchResult keyed by instance name
+        """
+        async def load(instance):
+            await instance.helper.load_helpers()
+            return {'status': 'success'}
+
+        return await self.broadcast(load, tags)
+
+    async def scenes_set(self, scene_config, tags=None):
+        """
+        Activate a scene on all selected instances
+
+        :param scene_config: dict
+        :param tags: tags selecting the instances, None for all
+        :return: BatchResult keyed by instance name
+        """
+        return await self.broadcast(lambda instance: instance.api.scenes_set(scene_config), tags)
+
+    async def virtuals_pause_unpause_all(self, tags=None):
+        """
+        Toggle pause of all virtuals on all selected instances
+
+        :param tags: tags selecting the instances, None for all
+        :return: BatchResult keyed by instance name
+        """
+        return await self.broadcast(lambda instance: instance.api.virtuals_pause_unpause_all(), tags)
+
+    async def set_preset(self, effect_id, preset_id, virtual_ids=None, tags=None):
+        """
+        Apply a preset to virtuals of all selected instances, requires load_helpers
+
+        :param effect_id: ID of the effect
+        :param preset_id: ID of the preset
+        :param virtual_ids: ids of the virtuals, None for all virtuals of each instance
+        :param tags: tags selecting the instances, None for all
+        :return: BatchResult keyed by instance name holding a BatchResult keyed by virtual id; an instance where
+            any virtual failed is failed with a BatchFailedError carrying its BatchResult
+        """
+        async def apply(instance):
+            targets = virtual_ids if virtual_ids is not None else await instance.helper.get_all_virtuals()
+            result = await instance.helper.batch_set_preset(targets, effect_id, preset_id)
+            if result.failed:
+                raise BatchFailedError(result)
+            return result
+
+        return await self.broadcast(apply, tags)
+
+    async def close(self):
+        """
+        Close all instances, flushing their queued commands and streamers, then the shared session
+        """
+        try:
+            await asyncio.gather(*(instance.close() for instance in self._instances.values()))
+        finally:
+            if self._session is not None and not self._session.closed:
+                await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
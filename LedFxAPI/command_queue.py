@@ -0,0 +1,283 @@
+import asyncio
+import collections
+import logging
+import time
+
+from .batch import check_response
+
+_LOGGER = logging.getLogger(__name__)
+
+VIRTUAL = 'virtual'
+DEVICE = 'device'
+
+
+class Command:
+    """
+    A queued mutation of one target
+    """
+    __slots__ = ('target', 'key', 'operation', 'future', 'queued_at')
+
+    def __init__(self, target, key, operation, future):
+        self.target = target
+        self.key = key
+        self.operation = operation
+        self.future = future
+        self.queued_at = time.perf_counter()
+
+    def __repr__(self):
+        return f"Command({self.target!r}, key={self.key!r})"
+
+
+class _TargetStats:
+    __slots__ = ('completed', 'errors', 'collapsed', 'latency_last', 'latency_max', 'latency_total')
+
+    def __init__(self):
+        self.completed = 0
+        self.errors = 0
+        self.collapsed = 0
+        self.latency_last = None
+        self.latency_max = 0.0
+        self.latency_total = 0.0
+
+    def as_dict(self):
+        return {
+            'completed': self.completed,
+            'errors': self.errors,
+            'collapsed': self.collapsed,
+            'latency_last': self.latency_last,
+            'latency_mean': self.latency_total / self.completed if self.completed else None,
+            'latency_max': self.latency_max,
+        }
+
+
+class CommandQueue:
+    """
+    Ordered mutations per target, run in parallel across targets.
+
+    Commands for the same virtual or device are sent one after another in the order they were queued,
+    commands for different targets run concurrently up to max_concurrency. A queued command is dropped
+    when a newer one with the same key replaces the same state of its target, e.g. two effect changes
+    of one virtual; waiters of the dropped command get the result of the newer one. submit waits while
+    maxsize commands are queued.
+    """
+
+    def __init__(self, api, maxsize=1000, max_concurrency=10):
+        """
+        :param api: RawAPI of the LedFx instance
+        :param maxsize: max number of queued commands before submit waits
+        :param max_concurrency: max number of requests in flight at once
+        """
+        self._api = api
+        self.maxsize = maxsize
+        self.max_concurrency = max_concurrency
+        self._slots = asyncio.Semaphore(maxsize)
+        self._requests = asyncio.Semaphore(max_concurrency)
+        self._queues = {}
+        self._tasks = {}
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._stats = collections.defaultdict(_TargetStats)
+        self.depth = 0
+        self.in_flight = 0
+        self.last_error = None
+
+    # queueing
+
+    async def submit(self, target, operation, key=None):
+        """
+        Queue a mutation, waits while the queue is full
+
+        :param target: tuple identifying the target, e.g. ('virtual', virtual_id)
+        :param operation: coroutine function without arguments sending the request
+        :param key: state replaced by the command, a queued command of the target with the same key is dropped;
+            None for commands that must never be dropped, e.g. partial updates
+        :return: asyncio.Future resolved with the response of the command or of the one replacing it
+        """
+        queue = self._queues.get(target)
+        superseded = self._find(queue, key) if queue is not None else None
+        if superseded is None:
+            await self._slots.acquire()
+            # the queue may have changed while waiting for a slot
+            queue = self._queues.get(target)
+        future = asyncio.get_running_loop().create_future()
+        # failures are counted and logged, callers do not have to await the future
+        future.add_done_callback(_retrieve)
+        command = Command(target, key, operation, future)
+        if queue is None:
+            queue = self._queues[target] = collections.deque()
+        if superseded is not None:
+            # takes over the slot of the dropped command
+            queue.remove(superseded)
+            self._stats[target].collapsed += 1
+            _chain(future, superseded.future)
+        else:
+            self.depth += 1
+        queue.append(command)
+        self._idle.clear()
+        if target not in self._tasks:
+            self._tasks[target] = asyncio.get_running_loop().create_task(self._drain(target))
+        return future
+
+    @staticmethod
+    def _find(queue, key):
+        if key is None:
+            return None
+        for command in reversed(queue):
+            if command.key is None:
+                # a command that is never dropped may depend on the queued state, e.g. a partial update
+                return None
+            if command.key == key:
+                return command
+        return None
+
+    async def _drain(self, target):
+        queue = self._queues[target]
+        try:
+            while queue:
+                # commands stay queued, counted against maxsize and replaceable, until a request can be sent
+                async with self._requests:
+                    command = queue.popleft()
+                    self.depth -= 1
+                    self._slots.release()
+                    await self._run(command)
+        finally:
+            del self._tasks[target]
+            if not queue:
+                del self._queues[target]
+            if not self._tasks:
+                self._idle.set()
+
+    async def _run(self, command):
+        stats = self._stats[command.target]
+        self.in_flight += 1
+        try:
+            result = check_response(await command.operation())
+        except Exception as e:
+            stats.errors += 1
+            self.last_error = e
+            _LOGGER.warning("Command %r failed: %r", command, e)
+            if not command.future.done():
+                command.future.set_exception(e)
+            return
+        finally:
+            self.in_flight -= 1
+        latency = time.perf_counter() - command.queued_at
+        stats.completed += 1
+        stats.latency_last = latency
+        stats.latency_max = max(stats.latency_max, latency)
+        stats.latency_total += latency
+        if not command.future.done():
+            command.future.set_result(result)
+
+    # mutations
+
+    async def virtual_effect_set(self, virtual_id, config):
+        """
+        Queue setting the effect of a virtual, replaces a queued effect or preset change of the virtual
+
+        :param virtual_id: Id of the virtual
+        :param config: effect, e.g. {'type': 'energy', 'config': {...}}
+        :return: asyncio.Future of the response
+        """
+        return await self.submit((VIRTUAL, virtual_id), lambda: self._api.virtual_effect_set(virtual_id, config),
+                                 'effect')
+
+    async def virtual_effect_update(self, virtual_id, config):
+        """
+        Queue a partial update of the active effect of a virtual, never dropped
+
+        :param virtual_id: Id of the virtual
+        :param config: changes, e.g. {'config': {'brightness': 0.5}}
+        :return: asyncio.Future of the response
+        """
+        return await self.submit((VIRTUAL, virtual_id), lambda: self._api.virtual_effect_update(virtual_id, config))
+
+    async def virtual_presets_set(self, virtual_id, config):
+        """
+        Queue applying a preset to a virtual, replaces a queued effect or preset change of the virtual
+
+        :param virtual_id: Id of the virtual
+        :param config: preset, e.g. {'category': 'default_presets', 'effect_id': ..., 'preset_id': ...}
+        :return: asyncio.Future of the response
+        """
+        return await self.submit((VIRTUAL, virtual_id), lambda: self._api.virtual_presets_set(virtual_id, config),
+                                 'effect')
+
+    async def virtual_pause_unpause(self, virtual_id, is_active: bool):
+        """
+        Queue pausing or unpausing a virtual, replaces a queued pause change of the virtual
+
+        :param virtual_id: Id of the virtual
+        :param is_active: False to pause, True to unpause
+        :return: asyncio.Future of the response
+        """
+        return await self.submit((VIRTUAL, virtual_id),
+                                 lambda: self._api.virtual_pause_unpause(virtual_id, is_active), 'active')
+
+    async def devices_modify_by_id(self, device_id, config):
+        """
+        Queue a change of a device config, never dropped as LedFx merges the changes
+
+        :param device_id: ID of the device
+        :param config: changes, e.g. {'config': {...}}
+        :return: asyncio.Future of the response
+        """
+        return await self.submit((DEVICE, device_id), lambda: self._api.devices_modify_by_id(device_id, config))
+
+    # stats and lifecycle
+
+    def target_stats(self, target):
+        """
+        :param target: tuple identifying the target, e.g. ('virtual', virtual_id)
+        :return: dict of counters and latency from queueing to response in seconds
+        """
+        stats = self._stats.get(target)
+        return (stats or _TargetStats()).as_dict()
+
+    def stats(self):
+        """
+        :return: dict of queue depth, requests in flight and counters summed over all targets
+        """
+        completed = sum(stats.completed for stats in self._stats.values())
+        latency_total = sum(stats.latency_total for stats in self._stats.values())
+        return {
+            'depth': self.depth,
+            'in_flight': self.in_flight,
+            'targets': len(self._queues),
+            'completed': completed,
+            'errors': sum(stats.errors for stats in self._stats.values()),
+            'collapsed': sum(stats.collapsed for stats in self._stats.values()),
+            'latency_mean': latency_total / completed if completed else None,
+            'latency_max': max((stats.latency_max for stats in self._stats.values()), default=0.0),
+        }
+
+    async def flush(self):
+        """
+        Wait until all queued commands have completed
+        """
+        await self._idle.wait()
+
+    async def close(self):
+        """
+        Send queued commands and wait for them
+        """
+        await self.flush()
+
+
+def _retrieve(future):
+    if not future.cancelled():
+        future.exception()
+
+
+def _chain(source, target):
+    def copy(future):
+        if target.done():
+            return
+        if future.cancelled():
+            target.cancel()
+        elif future.exception() is not None:
+            target.set_exception(future.exception())
+        else:
+            target.set_result(future.result())
+
+    source.add_done_callback(copy)
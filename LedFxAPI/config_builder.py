@@ -0,0 +1,423 @@
+"""
+Validate and generate effect configs in bulk.
+
+Effect schemas are compiled once into a checker per property, configs are then validated without walking the
+schema again. build() creates many configs from columns of values, e.g. one brightness per virtual; with NumPy
+installed numeric columns are checked as arrays and colors and gradients can be generated vectorized.
+"""
+import math
+import re
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+_HEX_COLOR = re.compile(r'#(?:[0-9a-fA-F]{3}|[0-9a-fA-F]{6})$')
+_GRADIENT_PREFIXES = ('linear-gradient(', 'radial-gradient(')
+
+
+class ConfigValidationError(ValueError):
+    """
+    An effect config does not match the schema of its effect, raised before anything is sent
+    """
+
+    def __init__(self, effect_type, errors):
+        """
+        :param effect_type: ID of the effect
+        :param errors: list of (index, key, message), index is the position or virtual id, None for single configs
+        """
+        self.effect_type = effect_type
+        self.errors = errors
+        shown = '; '.join(f"{key}: {message}" if index is None else f"[{index}] {key}: {message}"
+                          for index, key, message in errors[:5])
+        more = f" and {len(errors) - 5} more" if len(errors) > 5 else ''
+        super().__init__(f"Invalid {effect_type} config: {shown}{more}")
+
+
+def _check_number(minimum, maximum, integer):
+    def check(value):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return 'not a number'
+        if isinstance(value, float):
+            if not math.isfinite(value):
+                return 'not a finite number'
+            if integer and not value.is_integer():
+                return 'not an integer'
+        if minimum is not None and value < minimum:
+            return f"below minimum {minimum}"
+        if maximum is not None and value > maximum:
+            return f"above maximum {maximum}"
+        return None
+    return check
+
+
+def _check_boolean(value):
+    return None if isinstance(value, bool) else 'not a boolean'
+
+
+def _check_string(value):
+    return None if isinstance(value, str) else 'not a string'
+
+
+def _check_choices(choices, base):
+    def check(value):
+        error = base(value)
+        if error is None and value not in choices:
+            return f"not one of {sorted(choices, key=str)}"
+        return error
+    return check
+
+
+def _check_color(gradient):
+    def check(value):
+        if not isinstance(value, str) or not value:
+            return 'not a color'
+        if value.startswith('#'):
+            return None if _HEX_COLOR.match(value) else 'invalid hex color'
+        if value.startswith(_GRADIENT_PREFIXES):
+            return None if gradient else 'gradients are not allowed'
+        # named colors are resolved by LedFx
+        return None
+    return check
+
+
+def _check_any(value):
+    return None
+
+
+class _Property:
+    __slots__ = ('key', 'kind', 'minimum', 'maximum', 'choices', 'default', 'check')
+
+    def __init__(self, key, spec):
+        self.key = key
+        self.kind = spec.get('type')
+        self.minimum = spec.get('minimum')
+        self.maximum = spec.get('maximum')
+        self.choices = frozenset(spec['enum']) if spec.get('enum') else None
+        self.default = spec.get('default')
+        if self.kind in ('number', 'integer'):
+            check = _check_number(self.minimum, self.maximum, self.kind == 'integer')
+        elif self.kind == 'boolean':
+            check = _check_boolean
+        elif self.kind == 'color':
+            check = _check_color(spec.get('gradient', True))
+        elif self.kind == 'string':
+            check = _check_string
+        else:
+            check = _check_any
+        self.check = _check_choices(self.choices, check) if self.choices else check
+
+    @property
+    def numeric(self):
+        return self.kind in ('number', 'integer') and self.choices is None
+
+
+class EffectSchema:
+    """
+    Compiled schema of one effect type
+    """
+
+    def __init__(self, effect_type, schema, allow_extra=False):
+        """
+        :param effect_type: ID of the effect
+        :param schema: JSON schema of the effect config, i.e. schema['effects'][effect_type]['schema']
+        :param allow_extra: accept keys not in the schema
+        """
+        self.effect_type = effect_type
+        self.allow_extra = allow_extra
+        self.properties = {key: _Property(key, spec) for key, spec in (schema.get('properties') or {}).items()}
+        self.required = frozenset(schema.get('required') or ())
+
+    def defaults(self):
+        """
+        :return: dict of the default values given by the schema
+        """
+        return {key: prop.default for key, prop in self.properties.items() if prop.default is not None}
+
+    def errors(self, config, partial=True):
+        """
+        :param config: effect config
+        :param partial: allow missing required keys, e.g. for updates merged into the active config
+        :return: list of (key, message), empty if the config is valid
+        """
+        if not isinstance(config, dict):
+            return [(None, 'not an object')]
+        errors = []
+        properties = self.properties
+        for key, value in config.items():
+            prop = properties.get(key)
+            if prop is None:
+                if not self.allow_extra:
+                    errors.append((key, 'unknown key'))
+                continue
+            message = prop.check(value)
+            if message is not None:
+                errors.append((key, message))
+        if not partial:
+            errors.extend((key, 'missing') for key in self.required if key not in config)
+        return errors
+
+    def validate(self, config, partial=True):
+        """
+        :param config: effect config
+        :param partial: allow missing required keys
+        :return: the config
+        :raises ConfigValidationError: if the config does not match the schema
+        """
+        errors = self.errors(config, partial)
+        if errors:
+            raise ConfigValidationError(self.effect_type, [(None, key, message) for key, message in errors])
+        return config
+
+    def validate_many(self, configs, partial=True):
+        """
+        :param configs: effect configs
+        :param partial: allow missing required keys
+        :return: the configs as list
+        :raises ConfigValidationError: listing the errors of all invalid configs
+        """
+        configs = list(configs)
+        errors = [(index, key, message) for index, config in enumerate(configs)
+                  for key, message in self.errors(config, partial)]
+        if errors:
+            raise ConfigValidationError(self.effect_type, errors)
+        return configs
+
+    def build(self, count, columns, base=None):
+        """
+        Generate and validate many configs at once
+
+        :param count: number of configs
+        :param columns: dict of key to a scalar shared by all configs or a sequence or array of count values,
+            e.g. {'brightness': numpy.linspace(0.2, 1, count)}
+        :param base: values shared by all configs, validated once
+        :return: list of config dicts
+        :raises ConfigValidationError: if any value does not match the schema
+        :raises ValueError: if a column does not have count values
+        """
+        base = dict(base or {})
+        errors = [(None, key, message) for key, message in self.errors(base)]
+        keys = []
+        values = []
+        for key, column in columns.items():
+            prop = self.properties.get(key)
+            if prop is None and not self.allow_extra:
+                errors.append((None, key, 'unknown key'))
+                continue
+            if isinstance(column, (str, bytes, dict)) or not hasattr(column, '__len__'):
+                if prop is not None:
+                    message = prop.check(column)
+                    if message is not None:
+                        errors.append((None, key, message))
+                base[key] = column
+                continue
+            if len(column) != count:
+                raise ValueError(f"Column {key} has {len(column)} values, expected {count}")
+            column, column_errors = self._check_column(prop, column)
+            errors.extend((index, key, message) for index, message in column_errors)
+            keys.append(key)
+            values.append(column)
+        if errors:
+            errors.sort(key=lambda error: -1 if error[0] is None else error[0])
+            raise ConfigValidationError(self.effect_type, errors)
+        if not keys:
+            return [dict(base) for _ in range(count)]
+        return [{**base, **dict(zip(keys, row))} for row in zip(*values)]
+
+    @staticmethod
+    def _check_column(prop, column):
+        if prop is not None and prop.numeric and np is not None:
+            return _check_array(prop, column)
+        if np is not None and isinstance(column, np.ndarray):
+            column = column.tolist()
+        if prop is None:
+            return column, []
+        check = prop.check
+        errors = []
+        for index, value in enumerate(column):
+            message = check(value)
+            if message is not None:
+                errors.append((index, message))
+        return column, errors
+
+
+def _check_array(prop, column):
+    try:
+        array = np.asarray(column, dtype=np.float64)
+    except (TypeError, ValueError):
+        # mixed content, check value by value
+        values = column.tolist() if isinstance(column, np.ndarray) else list(column)
+        return values, [(index, message) for index, message in
+                        ((index, prop.check(value)) for index, value in enumerate(values)) if message is not None]
+    if array.ndim != 1:
+        return array.tolist(), [(None, 'not a number')]
+    finite = np.isfinite(array)
+    errors = [(index, 'not a finite number') for index in np.flatnonzero(~finite).tolist()]
+    if prop.kind == 'integer':
+        errors += [(index, 'not an integer') for index in np.flatnonzero(finite & (array != np.round(array))).tolist()]
+    if prop.minimum is not None:
+        errors += [(index, f"below minimum {prop.minimum}")
+                   for index in np.flatnonzero(array < prop.minimum).tolist()]
+    if prop.maximum is not None:
+        errors += [(index, f"above maximum {prop.maximum}")
+                   for index in np.flatnonzero(array > prop.maximum).tolist()]
+    if errors:
+        return None, sorted(errors)
+    if prop.kind == 'integer':
+        return array.astype(np.int64).tolist(), []
+    return array.tolist(), []
+
+
+class EffectSchemas:
+    """
+    Compiled schemas of all effect types of a LedFx instance
+    """
+
+    def __init__(self, effects, allow_extra=False):
+        """
+        :param effects: dict of effect id to schema entry, i.e. schema['effects'] or the response of GET schema/effect
+        :param allow_extra: accept keys not in the schemas
+        """
+        self._schemas = {effect_type: EffectSchema(effect_type, (entry or {}).get('schema') or {}, allow_extra)
+                         for effect_type, entry in effects.items()}
+
+    @classmethod
+    def from_response(cls, response, allow_extra=False):
+        """
+        :param response: response of GET schema or GET schema/effect
+        :param allow_extra: accept keys not in the schemas
+        :return: EffectSchemas
+        """
+        if 'effects' in response and isinstance(response['effects'], dict):
+            response = response['effects']
+        return cls(response, allow_extra)
+
+    @classmethod
+    async def load(cls, api, allow_extra=False):
+        """
+        :param api: RawAPI
+        :param allow_extra: accept keys not in the schemas
+        :return: EffectSchemas
+        """
+        return cls.from_response(await api.ledfx_schema_effect(), allow_extra)
+
+    def __getitem__(self, effect_type):
+        """
+        :raises KeyError: for unknown effect types
+        """
+        return self._schemas[effect_type]
+
+    def __contains__(self, effect_type):
+        return effect_type in self._schemas
+
+    def __len__(self):
+        return len(self._schemas)
+
+    def __iter__(self):
+        return iter(self._schemas)
+
+    def schema(self, effect_type):
+        """
+        :param effect_type: ID of the effect
+        :return: EffectSchema
+        :raises ConfigValidationError: for unknown effect types
+        """
+        schema = self._schemas.get(effect_type)
+        if schema is None:
+            raise ConfigValidationError(effect_type, [(None, 'type', 'unknown effect type')])
+        return schema
+
+    def validate(self, effect_type, config, partial=True):
+        """
+        :param effect_type: ID of the effect
+        :param config: effect config
+        :param partial: allow missing required keys
+        :return: the config
+        :raises ConfigValidationError: if the config or effect type is invalid
+        """
+        return self.schema(effect_type).validate(config, partial)
+
+    def validate_effect(self, effect, partial=True):
+        """
+        :param effect: body of an effect request, e.g. {'type': 'energy', 'config': {...}}
+        :param partial: allow missing required keys
+        :return: the effect
+        :raises ConfigValidationError: if the config or effect type is invalid
+        """
+        self.validate(effect.get('type'), effect.get('config') or {}, partial)
+        return effect
+
+    def build(self, effect_type, count, columns, base=None):
+        """
+        Generate and validate many configs of an effect type, see EffectSchema.build
+
+        :return: list of config dicts
+        """
+        return self.schema(effect_type).build(count, columns, base)
+
+
+# vectorized color helpers, NumPy arrays are used when available
+
+def hex_colors(rgb):
+    """
+    :param rgb: sequence or array of shape (n, 3) with values 0-255
+    :return: list of '#rrggbb' strings
+    """
+    if np is not None:
+        array = np.clip(np.rint(np.asarray(rgb, dtype=np.float64)), 0, 255).astype(np.uint32)
+        packed = (array[:, 0] << 16) | (array[:, 1] << 8) | array[:, 2]
+        return ['#%06x' % value for value in packed.tolist()]
+    return ['#%02x%02x%02x' % tuple(min(255, max(0, round(channel))) for channel in color) for color in rgb]
+
+
+def hsv_to_rgb(hue, saturation=1.0, value=1.0):
+    """
+    :param hue: hue 0-1, scalar, sequence or array
+    :param saturation: saturation 0-1, scalar or matching sequence
+    :param value: value 0-1, scalar or matching sequence
+    :return: array of shape (n, 3) with values 0-255, list of tuples without NumPy
+    """
+    if np is None:
+        import colorsys
+
+        hues = hue if hasattr(hue, '__len__') else [hue]
+        saturations = saturation if hasattr(saturation, '__len__') else [saturation] * len(hues)
+        values = value if hasattr(value, '__len__') else [value] * len(hues)
+        return [tuple(channel * 255 for channel in colorsys.hsv_to_rgb(h % 1.0, s, v))
+                for h, s, v in zip(hues, saturations, values)]
+    h, s, v = np.broadcast_arrays(*(np.atleast_1d(np.asarray(x, dtype=np.float64)) for x in (hue, saturation, value)))
+    h = (h % 1.0) * 6.0
+    sector = np.floor(h).astype(np.int64) % 6
+    f = h - np.floor(h)
+    p = v * (1 - s)
+    q = v * (1 - s * f)
+    t = v * (1 - s * (1 - f))
+    r = np.choose(sector, [v, q, p, p, t, v])
+    g = np.choose(sector, [t, v, v, q, p, p])
+    b = np.choose(sector, [p, p, t, v, v, q])
+    return np.stack((r, g, b), axis=-1) * 255
+
+
+def linear_gradients(colors, angle=90):
+    """
+    :param colors: per gradient a sequence of colors, i.e. array of shape (n, stops, 3) with values 0-255
+        or n lists of '#rrggbb' strings, stops are spread evenly
+    :param angle: gradient angle in degrees
+    :return: list of n gradient strings as used by LedFx
+    """
+    if np is not None and not (len(colors) and isinstance(colors[0][0], str)):
+        array = np.asarray(colors, dtype=np.float64)
+        count, stops = array.shape[:2]
+        colors = np.asarray(hex_colors(array.reshape(-1, 3))).reshape(count, stops).tolist()
+    elif len(colors) and not isinstance(colors[0][0], str):
+        colors = [hex_colors(stops) for stops in colors]
+    gradients = []
+    positions = {}
+    for stops in colors:
+        if len(stops) not in positions:
+            last = max(1, len(stops) - 1)
+            positions[len(stops)] = [f"{round(100 * i / last)}%" for i in range(len(stops))]
+        parts = ', '.join(f"{color} {position}" for color, position in zip(stops, positions[len(stops)]))
+        gradients.append(f"linear-gradient({angle}deg, {parts})")
+    return gradients
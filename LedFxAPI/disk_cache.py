@@ -0,0 +1,164 @@
+"""
+On-disk copy of the schema and preset tables of LedFx instances for warm restarts.
+
+Entries are keyed by the url of the instance and the LedFx version reported by ledfx_info, an update of
+LedFx therefore never reuses tables of an older version. Files are written atomically, unreadable or
+foreign files are ignored.
+"""
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import time
+from dataclasses import dataclass, field
+
+from .serializers import default_serializer
+
+_LOGGER = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+_SUFFIX = '.ledfx-cache'
+_UNSAFE = re.compile(r'[^A-Za-z0-9._-]')
+
+
+def default_directory():
+    """
+    :return: LedFxAPI directory in the user cache directory, e.g. ~/.cache/LedFxAPI
+    """
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'LedFxAPI')
+
+
+@dataclass(slots=True)
+class CachedTables:
+    """
+    Schema and preset responses of one instance as saved on disk
+    """
+    base_url: str
+    version: str
+    saved_at: float
+    schema: dict = field(repr=False)
+    presets: dict = field(repr=False)
+
+    @property
+    def age(self):
+        """
+        :return: seconds since the tables were saved
+        """
+        return time.time() - self.saved_at
+
+
+class DiskCache:
+    """
+    Directory of schema and preset tables, one file per instance and LedFx version
+    """
+
+    def __init__(self, directory=None, max_age=None, serializer=None):
+        """
+        :param directory: where the files are kept, defaults to default_directory()
+        :param max_age: seconds after which saved tables are ignored, None to use them regardless of age
+        :param serializer: JSON serializer, defaults to the fastest available
+        """
+        self.directory = directory or default_directory()
+        self.max_age = max_age
+        self.serializer = serializer or default_serializer()
+
+    def _prefix(self, base_url):
+        return hashlib.sha1(base_url.encode()).hexdigest()[:16]
+
+    def path(self, base_url, version):
+        """
+        :param base_url: api url of the instance, see RawAPI.base_url
+        :param version: LedFx version
+        :return: path of the file holding the tables
+        """
+        return os.path.join(self.directory, f"{self._prefix(base_url)}-{_UNSAFE.sub('_', str(version))}{_SUFFIX}")
+
+    def load(self, base_url, version=None):
+        """
+        :param base_url: api url of the instance
+        :param version: LedFx version, None for the tables saved last for this instance, e.g. while it is offline
+        :return: CachedTables or None if nothing usable is saved
+        """
+        if version is not None:
+            paths = [self.path(base_url, version)]
+        else:
+            prefix = f"{self._prefix(base_url)}-"
+            try:
+                names = [name for name in os.listdir(self.directory)
+                         if name.startswith(prefix) and name.endswith(_SUFFIX)]
+            except OSError:
+                return None
+            paths = sorted((os.path.join(self.directory, name) for name in names),
+                           key=_mtime, reverse=True)
+        for path in paths:
+            tables = self._read(path, base_url)
+            if tables is not None and (version is None or tables.version == version):
+                return tables
+        return None
+
+    def _read(self, path, base_url):
+        try:
+            with open(path, 'rb') as f:
+                data = self.serializer.loads(f.read())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            _LOGGER.debug("Ignoring unreadable cache file %s: %r", path, e)
+            return None
+        if not isinstance(data, dict) or data.get('format') != FORMAT_VERSION or data.get('base_url') != base_url:
+            return None
+        try:
+            tables = CachedTables(base_url, data['version'], data['saved_at'], data['schema'], data['presets'])
+        except KeyError:
+            return None
+        if self.max_age is not None and tables.age > self.max_age:
+            return None
+        return tables
+
+    def save(self, base_url, version, schema, presets):
+        """
+        Write the tables of an instance, replacing the file atomically
+
+        :param base_url: api url of the instance
+        :param version: LedFx version
+        :param schema: response of RawAPI.ledfx_schema
+        :param presets: dict of effect id to response of RawAPI.effect_get_presets
+        :return: path of the written file
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(base_url, version)
+        data = self.serializer.dumps({'format': FORMAT_VERSION, 'base_url': base_url, 'version': version,
+                                      'saved_at': time.time(), 'schema': schema, 'presets': presets})
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return path
+
+    def clear(self, base_url=None):
+        """
+        Delete saved tables
+
+        :param base_url: only delete the tables of this instance, None for all
+        """
+        prefix = f"{self._prefix(base_url)}-" if base_url is not None else ''
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return
+        for name in names:
+            if name.startswith(prefix) and name.endswith(_SUFFIX):
+                os.unlink(os.path.join(self.directory, name))
+
+
+def _mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0.0
@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import time
+
+from .batch import check_response
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class EffectStreamer:
+    """
+    Rate limited effect config updates for one virtual, e.g. driven by a fader.
+
+    Changes can be pushed at any rate, pending changes are merged (latest value wins)
+    and sent with at most one request per interval and one request in flight.
+    """
+
+    def __init__(self, api, virtual_id, interval=1 / 30, effect_type=None):
+        """
+        :param api: RawAPI of the LedFx instance
+        :param virtual_id: Id of the virtual
+        :param interval: min seconds between two requests
+        :param effect_type: effect type sent along with the config, None to update the active effect
+        """
+        self._api = api
+        self.virtual_id = virtual_id
+        self.interval = interval
+        self.effect_type = effect_type
+        self._pending = {}
+        self._pending_since = None
+        self._wakeup = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._task = None
+        self.updates_received = 0
+        self.updates_merged = 0
+        self.values_dropped = 0
+        self.requests_sent = 0
+        self.errors = 0
+        self.last_error = None
+        self.latency_last = None
+        self.latency_max = 0.0
+        self._latency_total = 0.0
+
+    def update(self, config=None, **params):
+        """
+        Queue changes of the effect config, must be called from the event loop
+
+        :param config: dict of config values
+        :param params: config values as keyword arguments
+        """
+        changes = {**(config or {}), **params}
+        if not changes:
+            return
+        self.updates_received += 1
+        if self._pending:
+            self.updates_merged += 1
+            self.values_dropped += len(changes.keys() & self._pending.keys())
+        else:
+            self._pending_since = time.perf_counter()
+        self._pending.update(changes)
+        self._idle.clear()
+        self._wakeup.set()
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_send = 0.0
+        while True:
+            await self._wakeup.wait()
+            delay = next_send - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._wakeup.clear()
+            config, since = self._pending, self._pending_since
+            self._pending, self._pending_since = {}, None
+            next_send = loop.time() + self.interval
+            await self._send(config, since)
+            if not self._pending:
+                self._idle.set()
+
+    async def _send(self, config, since):
+        data = {'config': config}
+        if self.effect_type is not None:
+            data['type'] = self.effect_type
+        self.requests_sent += 1
+        try:
+            check_response(await self._api.virtual_effect_update(self.virtual_id, data))
+        except Exception as e:
+            self.errors += 1
+            self.last_error = e
+            _LOGGER.warning("Effect update of %s failed: %r", self.virtual_id, e)
+            return
+        latency = time.perf_counter() - since
+        self.latency_last = latency
+        self.latency_max = max(self.latency_max, latency)
+        self._latency_total += latency
+
+    @property
+    def latency_mean(self):
+        """
+        Mean time from the first queued change to the response that applied it
+
+        :return: seconds or None if nothing was sent yet
+        """
+        succeeded = self.requests_sent - self.errors
+        return self._latency_total / succeeded if succeeded else None
+
+    def stats(self):
+        """
+        Get update counters and latency
+
+        :return: dict
+        """
+        return {
+            'updates_received': self.updates_received,
+            'updates_merged': self.updates_merged,
+            'values_dropped': self.values_dropped,
+            'requests_sent': self.requests_sent,
+            'errors': self.errors,
+            'latency_last': self.latency_last,
+            'latency_mean': self.latency_mean,
+            'latency_max': self.latency_max,
+        }
+
+    async def flush(self):
+        """
+        Wait until all queued changes have been sent
+        """
+        await self._idle.wait()
+
+    async def close(self):
+        """
+        Send queued changes and stop the sender task
+        """
+        if self._task is None:
+            return
+        await self.flush()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
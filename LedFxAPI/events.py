@@ -0,0 +1,262 @@
+import asyncio
+import inspect
+import logging
+import time
+from dataclasses import dataclass, field
+
+from .resilience import RetryPolicy
+
+_LOGGER = logging.getLogger(__name__)
+
+# events sent by LedFx
+DEVICE_UPDATE = 'device_update'
+DEVICE_CREATED = 'device_created'
+DEVICES_UPDATED = 'devices_updated'
+VIRTUAL_UPDATE = 'virtual_update'
+VIRTUAL_CONFIG_UPDATE = 'virtual_config_update'
+VIRTUAL_PAUSE = 'virtual_pause'
+GLOBAL_PAUSE = 'global_pause'
+EFFECT_SET = 'effect_set'
+EFFECT_CLEARED = 'effect_cleared'
+SCENE_ACTIVATED = 'scene_activated'
+PRESET_ACTIVATED = 'preset_activated'
+VISUALISATION_UPDATE = 'visualisation_update'
+
+# events created by the client
+CONNECTED = 'connected'
+DISCONNECTED = 'disconnected'
+
+DEFAULT_EVENTS = (DEVICE_UPDATE, DEVICE_CREATED, DEVICES_UPDATED, VIRTUAL_CONFIG_UPDATE, VIRTUAL_PAUSE,
+                  GLOBAL_PAUSE, EFFECT_SET, EFFECT_CLEARED, SCENE_ACTIVATED, PRESET_ACTIVATED)
+
+
+@dataclass(slots=True)
+class Event:
+    """
+    An event of a LedFx instance, data holds the fields of the message besides the event type
+    """
+    type: str
+    data: dict = field(default_factory=dict, repr=False)
+    received_at: float = field(default_factory=time.monotonic, repr=False)
+
+    @classmethod
+    def from_message(cls, message):
+        """
+        :param message: decoded websocket message
+        :return: Event
+        """
+        data = {key: value for key, value in message.items() if key not in ('id', 'type', 'event_type')}
+        return cls(message['event_type'], data)
+
+    @property
+    def virtual_id(self):
+        return self.data.get('virtual_id')
+
+    @property
+    def device_id(self):
+        return self.data.get('device_id')
+
+    @property
+    def scene_id(self):
+        return self.data.get('scene_id')
+
+    @property
+    def effect_type(self):
+        return self.data.get('effect_name') or self.data.get('effect_type')
+
+
+class EventClient:
+    """
+    Websocket event channel of a LedFx instance.
+
+    The connection is opened with the http session of the RawAPI, subscribes to the requested event types
+    and reconnects with jittered exponential backoff when it is lost. Events are passed to callbacks
+    and async iterators, CONNECTED and DISCONNECTED events mark gaps where events may have been missed.
+    """
+
+    def __init__(self, api, event_types=DEFAULT_EVENTS, reconnect_policy=None, heartbeat=30.0):
+        """
+        :param api: RawAPI of the LedFx instance
+        :param event_types: event types to subscribe to
+        :param reconnect_policy: RetryPolicy whose backoff is used between reconnects, attempts are ignored
+        :param heartbeat: seconds between websocket pings
+        """
+        self._api = api
+        self.event_types = set(event_types)
+        self.reconnect_policy = reconnect_policy or RetryPolicy(backoff=0.5, max_backoff=30.0)
+        self.heartbeat = heartbeat
+        self._subscribers = []
+        self._queues = []
+        self._task = None
+        self._ws = None
+        self._message_id = 0
+        self._connected = asyncio.Event()
+        self.events_received = 0
+        self.reconnects = 0
+        self.last_error = None
+
+    @property
+    def connected(self):
+        return self._connected.is_set()
+
+    async def wait_connected(self, timeout=None):
+        """
+        Wait until the websocket is connected and subscribed
+
+        :param timeout: seconds to wait, None to wait forever
+        """
+        await asyncio.wait_for(self._connected.wait(), timeout)
+
+    def stats(self):
+        """
+        :return: dict of counters
+        """
+        return {
+            'connected': self.connected,
+            'events_received': self.events_received,
+            'reconnects': self.reconnects,
+            'subscribers': len(self._subscribers),
+            'iterators': len(self._queues),
+        }
+
+    # consumers
+
+    def subscribe(self, callback, event_types=None):
+        """
+        Register an event callback, coroutine functions are scheduled as tasks.
+        Event types not subscribed yet are added to the connection.
+
+        :param callback: callable(event)
+        :param event_types: event types passed to the callback, None for all
+        :return: function removing the subscription
+        """
+        subscriber = (callback, frozenset(event_types) if event_types is not None else None)
+        self._subscribers.append(subscriber)
+        self._add_event_types(event_types)
+        return lambda: self._subscribers.remove(subscriber)
+
+    async def events(self, event_types=None, maxsize=1000):
+        """
+        Iterate over events, starts the client if needed.
+        If the consumer falls behind by more than maxsize events the oldest ones are dropped.
+
+        :param event_types: event types to yield, None for all
+        :param maxsize: max number of buffered events
+        :return: async iterator of Event
+        """
+        queue = asyncio.Queue(maxsize)
+        entry = (queue, frozenset(event_types) if event_types is not None else None)
+        self._queues.append(entry)
+        self._add_event_types(event_types)
+        self.start()
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self._queues.remove(entry)
+
+    def _add_event_types(self, event_types):
+        new = set(event_types or ()) - self.event_types - {CONNECTED, DISCONNECTED}
+        if not new:
+            return
+        self.event_types |= new
+        if self._ws is not None and not self._ws.closed:
+            for event_type in new:
+                asyncio.ensure_future(self._subscribe(self._ws, event_type))
+
+    def _dispatch(self, event):
+        for callback, event_types in list(self._subscribers):
+            if event_types is not None and event.type not in event_types:
+                continue
+            try:
+                result = callback(event)
+                if inspect.isawaitable(result):
+                    asyncio.ensure_future(result)
+            except Exception:
+                _LOGGER.exception("Event subscriber failed")
+        for queue, event_types in list(self._queues):
+            if event_types is not None and event.type not in event_types:
+                continue
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    # connection
+
+    def start(self):
+        """
+        Connect in the background, reconnecting until stop is called
+        """
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            self._task.add_done_callback(self._task_done)
+
+    def _task_done(self, task):
+        # start can run the client again should the task ever end without stop being called
+        if self._task is task:
+            self._task = None
+
+    async def stop(self):
+        """
+        Close the websocket and stop reconnecting
+        """
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _subscribe(self, ws, event_type):
+        self._message_id += 1
+        await ws.send_json({'id': self._message_id, 'type': 'subscribe_event', 'event_type': event_type})
+
+    async def _run(self):
+        import aiohttp
+
+        failures = 0
+        while True:
+            try:
+                async with self._api.websocket(self.heartbeat) as ws:
+                    self._ws = ws
+                    for event_type in sorted(self.event_types):
+                        await self._subscribe(ws, event_type)
+                    failures = 0
+                    self._connected.set()
+                    self._dispatch(Event(CONNECTED))
+                    await self._receive(ws)
+            except asyncio.CancelledError:
+                raise
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                self.last_error = e
+                _LOGGER.debug("Event websocket failed: %r", e)
+            except Exception as e:
+                self.last_error = e
+                _LOGGER.exception("Event websocket failed unexpectedly")
+            finally:
+                self._ws = None
+                if self._connected.is_set():
+                    self._connected.clear()
+                    self._dispatch(Event(DISCONNECTED))
+            failures += 1
+            self.reconnects += 1
+            await asyncio.sleep(self.reconnect_policy.delay(failures))
+
+    async def _receive(self, ws):
+        import aiohttp
+
+        loads = self._api.serializer.loads
+        async for message in ws:
+            if message.type == aiohttp.WSMsgType.TEXT:
+                data = loads(message.data.encode())
+            elif message.type == aiohttp.WSMsgType.BINARY:
+                data = loads(message.data)
+            elif message.type == aiohttp.WSMsgType.ERROR:
+                raise ws.exception() or aiohttp.ClientError('Websocket error')
+            else:
+                continue
+            if isinstance(data, dict) and data.get('event_type'):
+                self.events_received += 1
+                self._dispatch(Event.from_message(data))
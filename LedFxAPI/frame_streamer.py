@@ -0,0 +1,236 @@
+import asyncio
+import collections
+import logging
+import socket
+import struct
+import time
+
+_LOGGER = logging.getLogger(__name__)
+
+DDP_PORT = 4048
+DDP_HEADER = struct.Struct('!BBBBIH')
+DDP_VERSION_1 = 0x40
+DDP_PUSH = 0x01
+# data type and destination as sent by LedFx itself
+DDP_DATATYPE_RGB = 0x01
+DDP_DESTINATION = 0x01
+DDP_MAX_DATA = 480 * 3
+
+
+class FrameStreamer:
+    """
+    Sends RGB frames straight to a DDP device over UDP, e.g. a WLED controller managed by LedFx.
+
+    Frames are any buffer of uint8 RGB values such as a NumPy array of shape (pixels, 3), bytes or a memoryview.
+    They are split into DDP packets without copying the pixel data where the platform supports scatter/gather
+    sends, only non-contiguous frames such as views of RGBA arrays are copied; packet headers are preallocated.
+    send() transmits at once, push() hands the latest frame to a pacer sending at most fps frames per second;
+    frames replaced before they were sent count as dropped.
+    """
+
+    def __init__(self, host, port=DDP_PORT, pixel_count=None, fps=60, keepalive=1.0, destination=DDP_DESTINATION):
+        """
+        :param host: ip or host name of the device
+        :param port: DDP port of the device
+        :param pixel_count: number of pixels of the device, longer frames are cut, None to send frames as they are
+        :param fps: target frame rate of push()
+        :param keepalive: resend the last frame after this many seconds without a new one, None to disable
+        :param destination: DDP destination id
+        """
+        self.host = host
+        self.port = port
+        self.pixel_count = pixel_count
+        self.fps = fps
+        self.keepalive = keepalive
+        self.destination = destination
+        self._socket = None
+        self._scatter = hasattr(socket.socket, 'sendmsg')
+        self._headers = []
+        self._packets = []
+        self._sequence = 0
+        self._pending = None
+        self._last_frame = None
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._sent_at = collections.deque(maxlen=max(2, int(fps * 2)))
+        self.frames_pushed = 0
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self.packets_sent = 0
+        self.packets_dropped = 0
+        self.send_errors = 0
+        self.late_ticks = 0
+        self.keepalives = 0
+        self.last_error = None
+
+    # connection
+
+    def open(self):
+        """
+        Create the UDP socket, called by send() if needed
+        """
+        if self._socket is not None:
+            return
+        address = socket.getaddrinfo(self.host, self.port, type=socket.SOCK_DGRAM)[0]
+        sock = socket.socket(address[0], socket.SOCK_DGRAM)
+        sock.setblocking(False)
+        sock.connect(address[4])
+        self._socket = sock
+
+    async def close(self):
+        """
+        Send the pending frame, stop the pacer and close the socket
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._pending is not None:
+            self.send(self._pending)
+            self._pending = None
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+    async def __aenter__(self):
+        self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    # sending
+
+    def _buffers(self, count):
+        while len(self._headers) < count:
+            self._headers.append(bytearray(DDP_HEADER.size))
+            if not self._scatter:
+                packet = bytearray(DDP_HEADER.size + DDP_MAX_DATA)
+                self._packets.append((packet, memoryview(packet)))
+
+    def send(self, frame):
+        """
+        Send a frame now
+
+        :param frame: buffer of RGB bytes, e.g. numpy.ndarray of dtype uint8 and shape (pixels, 3)
+        :return: number of packets sent
+        """
+        sent = self._transmit(frame)
+        self.frames_sent += 1
+        self._last_frame = frame
+        self._sent_at.append(time.perf_counter())
+        return sent
+
+    def _transmit(self, frame):
+        if self._socket is None:
+            self.open()
+        data = memoryview(frame)
+        if not data.c_contiguous:
+            # e.g. the RGB channels of an RGBA array, packets need the pixels in one piece so they are copied once
+            data = memoryview(data.tobytes())
+        elif data.ndim != 1 or data.itemsize != 1:
+            data = data.cast('B')
+        if self.pixel_count is not None:
+            data = data[:self.pixel_count * 3]
+        size = len(data)
+        count = max(1, -(-size // DDP_MAX_DATA))
+        self._buffers(count)
+        self._sequence = self._sequence % 15 + 1
+        sent = 0
+        for index in range(count):
+            offset = index * DDP_MAX_DATA
+            length = min(DDP_MAX_DATA, size - offset)
+            flags = DDP_VERSION_1 | (DDP_PUSH if index == count - 1 else 0)
+            header = self._headers[index]
+            DDP_HEADER.pack_into(header, 0, flags, self._sequence, DDP_DATATYPE_RGB, self.destination, offset, length)
+            try:
+                if self._scatter:
+                    self._socket.sendmsg((header, data[offset:offset + length]))
+                else:
+                    packet, view = self._packets[index]
+                    packet[:DDP_HEADER.size] = header
+                    packet[DDP_HEADER.size:DDP_HEADER.size + length] = data[offset:offset + length]
+                    self._socket.send(view[:DDP_HEADER.size + length])
+                sent += 1
+            except BlockingIOError:
+                self.packets_dropped += 1
+            except OSError as e:
+                # e.g. connection refused reported for an earlier datagram
+                self.send_errors += 1
+                self.last_error = e
+        self.packets_sent += sent
+        return sent
+
+    def push(self, frame):
+        """
+        Queue a frame for the pacer, must be called from the event loop.
+        The frame is read when it is sent, pass a new buffer instead of modifying a pushed one.
+
+        :param frame: buffer of RGB bytes, see send
+        """
+        self.frames_pushed += 1
+        if self._pending is not None:
+            self.frames_dropped += 1
+        self._pending = frame
+        self._wakeup.set()
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._pace())
+
+    async def _pace(self):
+        loop = asyncio.get_running_loop()
+        interval = 1 / self.fps
+        next_tick = loop.time()
+        while True:
+            timeout = self.keepalive if self._last_frame is not None else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                # devices fall back to their own effects when frames stop
+                self._transmit(self._last_frame)
+                self.keepalives += 1
+                continue
+            now = loop.time()
+            if next_tick > now:
+                await asyncio.sleep(next_tick - now)
+            elif now - next_tick > interval:
+                # fell behind, restart the schedule instead of sending a burst
+                self.late_ticks += 1
+                next_tick = now
+            self._wakeup.clear()
+            frame, self._pending = self._pending, None
+            if frame is not None:
+                self.send(frame)
+            next_tick += interval
+
+    # stats
+
+    @property
+    def achieved_fps(self):
+        """
+        Frame rate over the last sent frames
+
+        :return: frames per second or None if less than two frames were sent
+        """
+        if len(self._sent_at) < 2:
+            return None
+        duration = self._sent_at[-1] - self._sent_at[0]
+        return (len(self._sent_at) - 1) / duration if duration > 0 else None
+
+    def stats(self):
+        """
+        :return: dict of counters and the achieved frame rate
+        """
+        return {
+            'frames_pushed': self.frames_pushed,
+            'frames_sent': self.frames_sent,
+            'frames_dropped': self.frames_dropped,
+            'packets_sent': self.packets_sent,
+            'packets_dropped': self.packets_dropped,
+            'send_errors': self.send_errors,
+            'late_ticks': self.late_ticks,
+            'keepalives': self.keepalives,
+            'achieved_fps': self.achieved_fps,
+        }
@@ -0,0 +1,280 @@
+import bisect
+import logging
+import time
+
+
+_LOGGER = logging.getLogger(__name__)
+
+# path segments followed by an id, e.g. virtuals/{id}/effects
+_COLLECTIONS = frozenset(('devices', 'effects', 'virtuals'))
+
+
+def path_template(path):
+    """
+    Replace ids in an api path by a placeholder
+
+    :param path: api path, e.g. virtuals/my-strip/effects
+    :return: template, e.g. virtuals/{id}/effects
+    """
+    parts = path.strip('/').split('/')
+    if len(parts) > 1 and parts[0] in _COLLECTIONS:
+        parts[1] = '{id}'
+    return '/'.join(parts)
+
+
+class RequestEvent:
+    """
+    Measurements of one request, timings are in seconds and None when not observed
+    """
+    __slots__ = ('method', 'path', 'path_template', 'status', 'bytes_in', 'bytes_out', 'dns', 'connect', 'ttfb',
+                 'total', 'retries', 'cache_hit', 'coalesced', 'error', 'started', '_dns_start', '_connect_start')
+
+    def __init__(self, method, path):
+        self.method = method
+        self.path = path
+        self.path_template = path_template(path)
+        self.status = None
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.dns = None
+        self.connect = None
+        self.ttfb = None
+        self.total = None
+        self.retries = 0
+        self.cache_hit = False
+        self.coalesced = False
+        self.error = None
+        self.started = time.perf_counter()
+        self._dns_start = None
+        self._connect_start = None
+
+    def __repr__(self):
+        return (f"RequestEvent({self.method} {self.path_template}, status={self.status}, "
+                f"total={self.total}, cache_hit={self.cache_hit}, error={self.error!r})")
+
+
+class Instrumentation:
+    """
+    Hook surface of a RESTClient, every hook is called with a RequestEvent once a request finished
+    """
+
+    def __init__(self, hooks=()):
+        """
+        :param hooks: initial hooks, callables taking a RequestEvent
+        """
+        self._hooks = list(hooks)
+
+    def add_hook(self, hook):
+        """
+        :param hook: callable(RequestEvent)
+        """
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook):
+        """
+        :param hook: hook added before
+        """
+        self._hooks.remove(hook)
+
+    def start(self, method, path):
+        """
+        :return: RequestEvent for a new request
+        """
+        return RequestEvent(method, path)
+
+    def finish(self, event):
+        """
+        Complete an event and pass it to all hooks
+
+        :param event: RequestEvent
+        """
+        event.total = time.perf_counter() - event.started
+        for hook in list(self._hooks):
+            try:
+                hook(event)
+            except Exception:
+                _LOGGER.exception("Instrumentation hook failed")
+
+    def trace_config(self):
+        """
+        Create an aiohttp TraceConfig filling in DNS, connect and time to first byte of events.
+        Sessions created by a RESTClient with instrumentation use it automatically,
+        add it to shared sessions to get these timings as well.
+
+        :return: aiohttp.TraceConfig
+        """
+        # the dns lookup runs inside connection creation, each phase keeps its own start
+        def phase_start(name):
+            async def callback(session, ctx, params):
+                if isinstance(ctx.trace_request_ctx, RequestEvent):
+                    setattr(ctx.trace_request_ctx, f"_{name}_start", time.perf_counter())
+            return callback
+
+        def phase_end(name):
+            async def callback(session, ctx, params):
+                event = ctx.trace_request_ctx
+                started = getattr(event, f"_{name}_start", None) if isinstance(event, RequestEvent) else None
+                if started is not None:
+                    setattr(event, name, time.perf_counter() - started)
+            return callback
+
+        async def on_request_end(session, ctx, params):
+            event = ctx.trace_request_ctx
+            if isinstance(event, RequestEvent):
+                event.ttfb = time.perf_counter() - event.started
+
+        import aiohttp
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_dns_resolvehost_start.append(phase_start('dns'))
+        trace_config.on_dns_resolvehost_end.append(phase_end('dns'))
+        trace_config.on_connection_create_start.append(phase_start('connect'))
+        trace_config.on_connection_create_end.append(phase_end('connect'))
+        trace_config.on_request_end.append(on_request_end)
+        return trace_config
+
+
+class LatencyHistogram:
+    """
+    Fixed bucket latency histogram in seconds
+    """
+    BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0, 10.0)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def percentile(self, p):
+        """
+        Upper bound of the bucket holding the given percentile
+
+        :param p: percentile between 0 and 1
+        :return: seconds or None if empty
+        """
+        if not self.count:
+            return None
+        rank = p * self.count
+        seen = 0
+        for bound, count in zip(self.BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.max
+
+
+class HistogramRecorder:
+    """
+    Hook aggregating events per method and path template in memory
+    """
+
+    def __init__(self):
+        self._stats = {}
+
+    def __call__(self, event):
+        key = (event.method, event.path_template)
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = {
+                'latency': LatencyHistogram(),
+                'errors': 0,
+                'cache_hits': 0,
+                'coalesced': 0,
+                'retries': 0,
+                'bytes_in': 0,
+                'bytes_out': 0,
+            }
+        stats['latency'].observe(event.total)
+        stats['errors'] += event.error is not None
+        stats['cache_hits'] += event.cache_hit
+        stats['coalesced'] += event.coalesced
+        stats['retries'] += event.retries
+        stats['bytes_in'] += event.bytes_in
+        stats['bytes_out'] += event.bytes_out
+
+    def reset(self):
+        self._stats.clear()
+
+    def snapshot(self):
+        """
+        Get aggregated stats
+
+        :return: dict of 'METHOD path/template' to dict of counters and latency percentiles in seconds
+        """
+        result = {}
+        for (method, template), stats in self._stats.items():
+            latency = stats['latency']
+            result[f"{method} {template}"] = {
+                'count': latency.count,
+                'mean': latency.sum / latency.count if latency.count else None,
+                'p50': latency.percentile(0.5),
+                'p99': latency.percentile(0.99),
+                'max': latency.max,
+                **{key: value for key, value in stats.items() if key != 'latency'},
+            }
+        return result
+
+
+class PrometheusExporter:
+    """
+    Hook exporting events to prometheus_client, no-op when it is not installed
+    """
+
+    def __init__(self, prefix='ledfx_api', registry=None):
+        try:
+            import prometheus_client
+        except ImportError:
+            _LOGGER.debug("prometheus_client not installed, metrics are not exported")
+            self._latency = None
+            return
+        kwargs = {'registry': registry} if registry is not None else {}
+        labels = ('method', 'path', 'status')
+        self._latency = prometheus_client.Histogram(f"{prefix}_request_seconds", 'LedFx api request latency',
+                                                    labels, buckets=LatencyHistogram.BUCKETS, **kwargs)
+        self._bytes = prometheus_client.Counter(f"{prefix}_response_bytes", 'LedFx api response bytes', labels,
+                                                **kwargs)
+        self._errors = prometheus_client.Counter(f"{prefix}_request_errors", 'LedFx api request errors',
+                                                 ('method', 'path'), **kwargs)
+
+    def __call__(self, event):
+        if self._latency is None:
+            return
+        status = 'cached' if event.cache_hit else str(event.status)
+        self._latency.labels(event.method, event.path_template, status).observe(event.total)
+        self._bytes.labels(event.method, event.path_template, status).inc(event.bytes_in)
+        if event.error is not None:
+            self._errors.labels(event.method, event.path_template).inc()
+
+
+class OpenTelemetryExporter:
+    """
+    Hook exporting events as OpenTelemetry metrics, no-op when opentelemetry is not installed
+    """
+
+    def __init__(self, meter_name='ledfx_api'):
+        try:
+            from opentelemetry import metrics
+        except ImportError:
+            _LOGGER.debug("opentelemetry not installed, metrics are not exported")
+            self._latency = None
+            return
+        meter = metrics.get_meter(meter_name)
+        self._latency = meter.create_histogram('ledfx_api.request.duration', unit='s',
+                                               description='LedFx api request latency')
+        self._errors = meter.create_counter('ledfx_api.request.errors', description='LedFx api request errors')
+
+    def __call__(self, event):
+        if self._latency is None:
+            return
+        attributes = {'http.method': event.method, 'http.route': event.path_template,
+                      'http.status_code': event.status or 0, 'cache_hit': event.cache_hit}
+        self._latency.record(event.total, attributes)
+        if event.error is not None:
+            self._errors.add(1, attributes)
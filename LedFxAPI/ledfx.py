@@ -1,8 +1,125 @@
 from .raw_api import RawAPI
 from .api_helpers import APIHelpers
+from .command_queue import CommandQueue
+from .effect_streamer import EffectStreamer
+from .events import EventClient
+from .frame_streamer import DDP_PORT, FrameStreamer
+from .snapshot import Snapshot, reconcile
+from .state_mirror import StateMirror
 
 
 class LedFx:
-    def __init__(self, host, port, ssl=False):
-        self.api = RawAPI(host, port, ssl)
-        self.helper = APIHelpers(self.api)
+    def __init__(self, host, port, ssl=False, session=None, pool_config=None, cache=None, serializer=None,
+                 instrumentation=None, timeout=10.0, retry_policy=None, circuit_breaker=None, disk_cache=None):
+        """
+        :param host: host of the LedFx instance
+        :param port: port of the LedFx instance
+        :param ssl: use https
+        :param session: optional shared aiohttp.ClientSession, not closed by this object
+        :param pool_config: PoolConfig for the connection pool of the internally created session
+        :param cache: optional ResponseCache for read-only endpoints
+        :param serializer: JSON serializer, see LedFxAPI.serializers
+        :param instrumentation: optional Instrumentation receiving an event per request
+        :param timeout: default timeout of a single request attempt in seconds
+        :param retry_policy: RetryPolicy for idempotent requests
+        :param circuit_breaker: CircuitBreaker failing fast while the instance is down
+        :param disk_cache: optional DiskCache keeping schema and presets across restarts, see APIHelpers.load_helpers
+        """
+        self.api = RawAPI(host, port, ssl, session=session, pool_config=pool_config, cache=cache,
+                          serializer=serializer, instrumentation=instrumentation, timeout=timeout,
+                          retry_policy=retry_policy, circuit_breaker=circuit_breaker)
+        self.helper = APIHelpers(self.api, disk_cache)
+        self.state = StateMirror(self.api)
+        self._streamers = {}
+        self._events = None
+        self._commands = None
+
+    @property
+    def events(self):
+        """
+        Websocket event channel of the instance, created on first use and connected by start() or events()
+
+        :return: EventClient
+        """
+        if self._events is None:
+            self._events = EventClient(self.api)
+        return self._events
+
+    @property
+    def commands(self):
+        """
+        Queue running mutations in order per virtual or device and in parallel across them, created on first use
+
+        :return: CommandQueue
+        """
+        if self._commands is None:
+            self._commands = CommandQueue(self.api)
+        return self._commands
+
+    def streamer(self, virtual_id, interval=1 / 30, effect_type=None):
+        """
+        Get the rate limited effect streamer of a virtual, created on first use
+
+        :param virtual_id: Id of the virtual
+        :param interval: min seconds between two requests, only used when the streamer is created
+        :param effect_type: effect type sent along with the config, only used when the streamer is created
+        :return: EffectStreamer
+        """
+        if virtual_id not in self._streamers:
+            self._streamers[virtual_id] = EffectStreamer(self.api, virtual_id, interval, effect_type)
+        return self._streamers[virtual_id]
+
+    async def frame_streamer(self, device_id, fps=60, port=DDP_PORT):
+        """
+        Create a frame streamer sending pixels straight to a device, bypassing LedFx.
+        Address and pixel count are read from the device config; stop the effect of its virtuals first,
+        otherwise LedFx keeps sending frames as well.
+
+        :param device_id: Id of a DDP capable device, e.g. WLED
+        :param fps: target frame rate of push()
+        :param port: DDP port of the device
+        :return: FrameStreamer, close it when done
+        """
+        config = (await self.api.devices_config_by_id(device_id))['device']['config']
+        return FrameStreamer(config['ip_address'], port, config.get('pixel_count'), fps)
+
+    async def snapshot(self, max_concurrency=10):
+        """
+        Capture devices, virtuals, active effects and scenes of the instance
+
+        :param max_concurrency: max number of requests in flight at once
+        :return: Snapshot
+        """
+        return await Snapshot.capture(self.api, max_concurrency)
+
+    async def reconcile(self, desired, max_concurrency=10):
+        """
+        Apply the minimal set of calls turning the current state into the desired snapshot
+
+        :param desired: Snapshot, e.g. captured earlier or from another instance
+        :param max_concurrency: max number of requests in flight at once
+        :return: BatchResult keyed by snapshot.Change
+        """
+        return await reconcile(self.api, desired, max_concurrency)
+
+    async def close(self):
+        """
+        Flush all streamers and queued commands, stop the state mirror, the event channel and background updates of the
+        preset index and close the http session and all pooled connections
+        """
+        if self._commands is not None:
+            await self._commands.close()
+        await self.helper.close()
+        await self.state.stop()
+        if self._events is not None:
+            await self._events.stop()
+        for streamer in self._streamers.values():
+            await streamer.close()
+        self._streamers.clear()
+        await self.api.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
@@ -0,0 +1,167 @@
+import sys
+from dataclasses import dataclass, field
+from enum import Enum
+
+
+class PresetType(Enum):
+    DEFAULT = 'default_presets'
+    CUSTOM = 'custom_presets'
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+@dataclass(slots=True)
+class Effect:
+    """
+    An effect type from the schema or the active effect of a virtual
+    """
+    id: str
+    name: str = None
+    category: str = None
+    config: dict = None
+    schema: dict = field(default=None, repr=False)
+
+    @classmethod
+    def from_schema(cls, effect_id, data):
+        """
+        :param effect_id: ID of the effect
+        :param data: entry of schema['effects']
+        :return: Effect
+        """
+        return cls(_intern(effect_id), data.get('name'), _intern(data.get('category')), schema=data.get('schema'))
+
+    @classmethod
+    def from_active(cls, data):
+        """
+        :param data: active effect as returned for a virtual, e.g. {'type': ..., 'name': ..., 'config': ...}
+        :return: Effect or None if no effect is active
+        """
+        if not data or 'type' not in data:
+            return None
+        return cls(_intern(data['type']), data.get('name'), config=data.get('config'))
+
+
+@dataclass(slots=True)
+class Preset:
+    """
+    A default or custom preset of an effect
+    """
+    id: str
+    effect_id: str
+    category: PresetType
+    name: str = None
+    config: dict = field(default=None, repr=False)
+
+
+@dataclass(slots=True)
+class Virtual:
+    """
+    A virtual, the active effect is parsed on first access
+    """
+    id: str
+    name: str
+    active: bool
+    pixel_count: int = None
+    config: dict = field(default=None, repr=False)
+    segments: list = field(default=None, repr=False)
+    _effect_data: dict = field(default=None, repr=False, compare=False)
+    _effect: Effect = field(default=None, repr=False, compare=False)
+
+    @classmethod
+    def from_dict(cls, data):
+        config = data.get('config') or {}
+        return cls(_intern(data['id']), config.get('name'), data.get('active', False), config.get('pixel_count'),
+                   config, data.get('segments'), _effect_data=data.get('effect'))
+
+    @property
+    def effect(self):
+        """
+        Active effect of the virtual
+
+        :return: Effect or None
+        """
+        if self._effect is None and self._effect_data is not None:
+            self._effect = Effect.from_active(self._effect_data)
+            self._effect_data = None
+        return self._effect
+
+
+@dataclass(slots=True)
+class Device:
+    """
+    A physical output device
+    """
+    id: str
+    type: str
+    name: str
+    online: bool = None
+    config: dict = field(default=None, repr=False)
+    virtuals: list = field(default=None, repr=False)
+
+    @classmethod
+    def from_dict(cls, data):
+        config = data.get('config') or {}
+        return cls(_intern(data['id']), _intern(data.get('type')), config.get('name'), data.get('online'), config,
+                   data.get('virtuals'))
+
+
+@dataclass(slots=True)
+class Scene:
+    """
+    A saved scene, virtuals maps virtual ids to their effect
+    """
+    id: str
+    name: str
+    virtuals: dict = field(default=None, repr=False)
+
+    @classmethod
+    def from_dict(cls, scene_id, data):
+        return cls(_intern(scene_id), data.get('name'), data.get('virtuals'))
+
+
+def parse_virtuals(data):
+    """
+    :param data: response of RawAPI.virtuals_all
+    :return: dict of virtual id to Virtual
+    """
+    return {virtual.id: virtual for virtual in map(Virtual.from_dict, data['virtuals'].values())}
+
+
+def parse_devices(data):
+    """
+    :param data: response of RawAPI.devices_all_config
+    :return: dict of device id to Device
+    """
+    return {device.id: device for device in map(Device.from_dict, data['devices'].values())}
+
+
+def parse_effects(schema):
+    """
+    :param schema: response of RawAPI.ledfx_schema
+    :return: dict of effect id to Effect
+    """
+    return {effect_id: Effect.from_schema(effect_id, data) for effect_id, data in schema['effects'].items()}
+
+
+def parse_presets(effect_id, data):
+    """
+    :param effect_id: ID of the effect
+    :param data: response of RawAPI.effect_get_presets
+    :return: list of Preset
+    """
+    effect_id = _intern(effect_id)
+    presets = []
+    for preset_type in PresetType:
+        for preset_id, preset in data.get(preset_type.value, {}).items():
+            presets.append(Preset(_intern(preset_id), effect_id, preset_type, preset.get('name'), preset.get('config')))
+    return presets
+
+
+def parse_scenes(data):
+    """
+    :param data: response of RawAPI.scenes_get_all
+    :return: dict of scene id to Scene
+    """
+    return {scene_id: Scene.from_dict(scene_id, scene) for scene_id, scene in data['scenes'].items()}
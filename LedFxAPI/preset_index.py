@@ -0,0 +1,187 @@
+import bisect
+import difflib
+
+from .models import Preset, PresetType, parse_presets
+
+
+def _normalize(name):
+    return ' '.join(name.casefold().split())
+
+
+class PresetIndex:
+    """
+    Presets of all effects keyed by (effect_id, preset_id) with reverse lookups and name search
+    """
+
+    def __init__(self):
+        self._presets = {}
+        self._by_effect = {}
+        self._effects_by_preset = {}
+        self._by_category = {preset_type: set() for preset_type in PresetType}
+        self._keys_by_name = {}
+        self._names = []
+
+    @classmethod
+    def from_responses(cls, responses):
+        """
+        Build an index from effect_get_presets responses
+
+        :param responses: dict of effect id to response of RawAPI.effect_get_presets
+        :return: PresetIndex
+        """
+        index = cls()
+        for effect_id, response in responses.items():
+            index.replace_effect(effect_id, parse_presets(effect_id, response))
+        return index
+
+    def __len__(self):
+        return len(self._presets)
+
+    def __contains__(self, key):
+        return key in self._presets
+
+    # lookups
+
+    def get(self, effect_id, preset_id):
+        """
+        :param effect_id: ID of the effect
+        :param preset_id: ID of the preset
+        :return: Preset or None
+        """
+        return self._presets.get((effect_id, preset_id))
+
+    def has_effect(self, effect_id):
+        return effect_id in self._by_effect
+
+    def presets_for_effect(self, effect_id, preset_type: PresetType = None):
+        """
+        :param effect_id: ID of the effect
+        :param preset_type: only return presets of this type
+        :return: list of Preset, default presets first
+        """
+        presets = self._by_effect.get(effect_id, {}).values()
+        if preset_type is not None:
+            return [preset for preset in presets if preset.category is preset_type]
+        return sorted(presets, key=lambda preset: preset.category is not PresetType.DEFAULT)
+
+    def effects_for_preset(self, preset_id):
+        """
+        :param preset_id: ID of the preset
+        :return: set of effect ids having a preset with this id
+        """
+        return set(self._effects_by_preset.get(preset_id, ()))
+
+    def by_category(self, preset_type: PresetType):
+        """
+        :param preset_type: preset type
+        :return: list of Preset
+        """
+        return [self._presets[key] for key in self._by_category[preset_type]]
+
+    def search(self, query, limit=10, fuzzy=True, effect_id=None):
+        """
+        Find presets by name, prefix matches come first followed by similar names
+
+        :param query: (part of) a preset name
+        :param limit: max number of results
+        :param fuzzy: include similar names if there are not enough prefix matches
+        :param effect_id: only search presets of this effect
+        :return: list of Preset
+        """
+        query = _normalize(query)
+        results = []
+        seen = set()
+
+        def collect(name):
+            for key in self._keys_by_name.get(name, ()):
+                if key not in seen and (effect_id is None or key[0] == effect_id):
+                    seen.add(key)
+                    results.append(self._presets[key])
+
+        position = bisect.bisect_left(self._names, query)
+        while position < len(self._names) and self._names[position].startswith(query) and len(results) < limit:
+            collect(self._names[position])
+            position += 1
+        if fuzzy and len(results) < limit:
+            for name in difflib.get_close_matches(query, self._names, n=limit, cutoff=0.5):
+                collect(name)
+        return results[:limit]
+
+    # updates
+
+    def add(self, preset: Preset):
+        """
+        Add or replace a preset
+        """
+        key = (preset.effect_id, preset.id)
+        if key in self._presets:
+            self.remove(*key)
+        self._presets[key] = preset
+        self._by_effect.setdefault(preset.effect_id, {})[preset.id] = preset
+        self._effects_by_preset.setdefault(preset.id, set()).add(preset.effect_id)
+        self._by_category[preset.category].add(key)
+        self._add_name(preset.name or preset.id, key)
+
+    def remove(self, effect_id, preset_id):
+        """
+        Remove a preset if it exists
+
+        :return: removed Preset or None
+        """
+        key = (effect_id, preset_id)
+        preset = self._presets.pop(key, None)
+        if preset is None:
+            return None
+        del self._by_effect[effect_id][preset_id]
+        effects = self._effects_by_preset[preset_id]
+        effects.discard(effect_id)
+        if not effects:
+            del self._effects_by_preset[preset_id]
+        self._by_category[preset.category].discard(key)
+        self._remove_name(preset.name or preset.id, key)
+        return preset
+
+    def rename(self, effect_id, preset_id, name):
+        """
+        Change the display name of a preset
+
+        :return: renamed Preset or None
+        """
+        preset = self.get(effect_id, preset_id)
+        if preset is None:
+            return None
+        self._remove_name(preset.name or preset.id, (effect_id, preset_id))
+        preset.name = name
+        self._add_name(name or preset_id, (effect_id, preset_id))
+        return preset
+
+    def replace_effect(self, effect_id, presets):
+        """
+        Replace all presets of an effect
+
+        :param effect_id: ID of the effect
+        :param presets: list of Preset
+        """
+        for preset_id in list(self._by_effect.get(effect_id, ())):
+            self.remove(effect_id, preset_id)
+        self._by_effect.setdefault(effect_id, {})
+        for preset in presets:
+            self.add(preset)
+
+    def _add_name(self, name, key):
+        name = _normalize(name)
+        keys = self._keys_by_name.get(name)
+        if keys is None:
+            keys = self._keys_by_name[name] = set()
+            bisect.insort(self._names, name)
+        keys.add(key)
+
+    def _remove_name(self, name, key):
+        name = _normalize(name)
+        keys = self._keys_by_name.get(name)
+        if keys is None:
+            return
+        keys.discard(key)
+        if not keys:
+            del self._keys_by_name[name]
+            del self._names[bisect.bisect_left(self._names, name)]
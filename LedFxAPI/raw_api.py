@@ -3,59 +3,159 @@ from LedFxAPI.rest_client import RESTClient
 
 class RawAPI:
 
-    def __init__(self, host, port, ssl=False):
-        self._client = RESTClient(host, port, '/api/', ssl)
+    def __init__(self, host, port, ssl=False, session=None, pool_config=None, cache=None, serializer=None,
+                 instrumentation=None, timeout=10.0, retry_policy=None, circuit_breaker=None):
+        self._client = RESTClient(host, port, '/api/', ssl, session=session, pool_config=pool_config, cache=cache,
+                                  serializer=serializer, instrumentation=instrumentation, timeout=timeout,
+                                  retry_policy=retry_policy, circuit_breaker=circuit_breaker)
+
+    @property
+    def base_url(self):
+        """
+        Url of the api of this instance, e.g. http://127.0.0.1:8888/api/
+
+        :return: str
+        """
+        return self._client.base_url
+
+    @property
+    def cache(self):
+        """
+        Response cache of this instance, None if caching is disabled
+
+        :return: ResponseCache
+        """
+        return self._client.cache
+
+    @property
+    def serializer(self):
+        """
+        JSON serializer of this instance
+
+        :return: serializer, see LedFxAPI.serializers
+        """
+        return self._client.serializer
+
+    def add_mutation_listener(self, listener):
+        """
+        Register a callback for responses to all mutating calls
+
+        :param listener: callable(method, path, data, response)
+        """
+        self._client.add_mutation_listener(listener)
+
+    def remove_mutation_listener(self, listener):
+        """
+        Unregister a callback added with add_mutation_listener
+
+        :param listener: callable
+        """
+        self._client.remove_mutation_listener(listener)
+
+    def prepare(self, data):
+        """
+        Serialize a request body ahead of time, it can be passed instead of a config dict to all calls
+
+        :param data: json serializable object
+        :return: PreparedBody
+        """
+        return self._client.prepare(data)
+
+    async def ping(self):
+        """
+        Request the instance info bypassing the cache, opens a pooled connection if there is none
+
+        :return: round trip time in seconds
+        """
+        return await self._client.ping('info')
+
+    def websocket(self, heartbeat=30.0):
+        """
+        Open the event websocket of the instance, see EventClient for subscriptions and reconnects
+
+        :param heartbeat: seconds between pings
+        :return: context manager of aiohttp.ClientWebSocketResponse
+        """
+        return self._client.ws_connect('websocket', heartbeat)
+
+    def stats(self):
+        """
+        Request counters of the underlying client, e.g. number of coalesced GET requests
+
+        :return: dict
+        """
+        return self._client.stats()
+
+    async def close(self):
+        """
+        Close the underlying http session
+        """
+        await self._client.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
 
     # method order follows api spec
     # general section
 
-    async def ledfx_info(self):
+    async def ledfx_info(self, timeout=None):
         """
         Returns basic information about the LedFx instance as JSON
 
+        :param timeout: timeout of a single attempt in seconds, None for the client timeout
         :return: dict
         """
-        return await self._client.get('info')
+        return await self._client.get('info', timeout=timeout)
 
-    async def ledfx_config(self):
+    async def ledfx_config(self, select=None, timeout=None):
         """
         Returns the current configuration for LedFx as JSON
 
+        :param select: optional path or paths of the parts to return, e.g. 'virtuals.*.id'
+        :param timeout: timeout of a single attempt in seconds, None for the client timeout
         :return: dict
         """
-        return await self._client.get('config')
+        return await self._client.get('config', select=select, timeout=timeout)
 
-    async def ledfx_schema(self):
+    async def ledfx_schema(self, select=None, timeout=None):
         """
         Returns all LedFx schemas for devices, effects, and integrations as JSON
 
+        :param select: optional path or paths of the parts to return, e.g. 'effects.*.name'
+        :param timeout: timeout of a single attempt in seconds, None for the client timeout
         :return: dict
         """
-        return await self._client.get('schema')
+        return await self._client.get('schema', select=select, timeout=timeout)
 
-    async def ledfx_schema_devices(self):
+    async def ledfx_schema_devices(self, timeout=None):
         """
         Returns all the devices registered with LedFx
 
+        :param timeout: timeout of a single attempt in seconds, None for the client timeout
         :return: dict
         """
-        return await self._client.get('schema/device')
+        return await self._client.get('schema/device', timeout=timeout)
 
-    async def ledfx_schema_effect(self):
+    async def ledfx_schema_effect(self, timeout=None):
         """
         Returns all the valid schemas for an LedFx effect
 
+        :param timeout: timeout of a single attempt in seconds, None for the client timeout
         :return: dict
         """
-        return await self._client.get('schema/effect')
+        return await self._client.get('schema/effect', timeout=timeout)
 
-    async def ledfx_schema_integration(self):
+    async def ledfx_schema_integration(self, timeout=None):
         """
         Returns all the integrations registered with LedFx
 
+        :param timeout: timeout of a single attempt in seconds, None for the client timeout
         :return: dict
         """
-        return await self._client.get('schema/integration')
+        return await self._client.get('schema/integration', timeout=timeout)
 
     async def ledfx_log(self):
         """
@@ -67,60 +167,66 @@ class RawAPI:
 
     # devices
 
-    async def devices_all_config(self):
+    async def devices_all_config(self, timeout=None):
         """
         Get configuration of all devices
 
+        :param timeout: timeout of a single attempt in seconds, None for the client timeout
         :return: dict
         """
-        return await self._client.get('devices')
+        return await self._client.get('devices', timeout=timeout)
 
-    async def devices_add(self, config):
+    async def devices_add(self, config, timeout=None):
         """
         Adds a new device to LedFx based on the provided JSON configuration
 
         :param config: device config as JSON
+        :param timeout: timeout of a single attempt in seconds, None for the client timeout
         :return: status as dict
         """
-        return await self._client.post('devices', data=config)
+        return await self._client.post('devices', data=config, timeout=timeout)
 
-    async def devices_config_by_id(self, device_id: str):
+    async def devices_config_by_id(self, device_id: str, timeout=None):
         """
         Returns information about the device
 
         :param device_id: ID of the device
+        :param timeout: timeout of a single attempt in seconds, None for the client timeout
         :return: dict
         """
-        return await self._client.get(f"devices/{device_id}")
+        return await self._client.get(f"devices/{device_id}", timeout=timeout)
 
-    async def devices_modify_by_id(self, device_id: str, config):
+    async def devices_modify_by_id(self, device_id: str, config, timeout=None):
         """
         Modifies the information pertaining to the device and returns the new device as JSON
 
         :param device_id: ID of the device
         :param config: device config as JSON
+        :param timeout: timeout of a single attempt in seconds, None for the client timeout
         :return: new device config as dict
         """
-        return await self._client.put(f"devices/{device_id}", data=config)
+        return await self._client.put(f"devices/{device_id}", data=config, timeout=timeout)
 
-    async def devices_delete_by_id(self, device_id: str):
+    async def devices_delete_by_id(self, device_id: str, timeout=None):
         """
         Deletes a device with the matching device_id
 
         :param device_id: ID of the device
+        :param timeout: timeout of a single attempt in seconds, None for the client timeout
         :return: status as dict
         """
-        return await self._client.delete(f"devices/{device_id}")
+        return await self._client.delete(f"devices/{device_id}", timeout=timeout)
 
     # effects
 
-    async def effects_get_current(self):
+    async def effects_get_current(self, timeout=None):
         """
         Returns all the effects currently created in LedFx as JSON
 
+        :param timeout: timeout of a single attempt in seconds, None for the client timeout
         :return: dict
         """
-        return await self._client.get('effects')
+        return await self._client.get('effects', timeout=timeout)
 
     async def effects_new(self, config):
         """
@@ -131,14 +237,15 @@ class RawAPI:
         """
         raise NotImplementedError
 
-    async def effects_by_id(self, effect_id: str):
+    async def effects_by_id(self, effect_id: str, timeout=None):
         """
         Returns information about the effect
 
         :param effect_id: Id of the effect
+        :param timeout: timeout of a single attempt in seconds, None for the client timeout
         :return: dict
         """
-        return await self._client.get(f"effects/{effect_id}")
+        return await self._client.get(f"effects/{effect_id}", timeout=timeout)
 
     async def effects_modify(self, effect_id: str, config):
         """
@@ -161,249 +268,294 @@ class RawAPI:
 
     # device effects
 
-    async def device_get_effect(self, device_id: str):
+    async def device_get_effect(self, device_id: str, timeout=None):
         """
         Returns the active effect config of a device
 
         :param device_id: Id if the device
+        :param timeout: timeout of a single attempt in seconds, None for the client timeout
         :return: dict
         """
-        return await self._client.get(f"devices/{device_id}/effects")
+        return await self._client.get(f"devices/{device_id}/effects", timeout=timeout)
 
-    async def device_update_effect(self, device_id: str, effect_config='RANDOMIZE'):
+    async def device_update_effect(self, device_id: str, effect_config='RANDOMIZE', timeout=None):
         """
         Update the active effect config of a device based on the provided JSON configuration.
         If config given is “RANDOMIZE”, the active effect config will be automatically generated to random values
 
         :param device_id:
         :param effect_config: dict
+        :param timeout: timeout of a single attempt in seconds, None for the client timeout
         :return: dict
         """
-        return await self._client.put(f"devices/{device_id}/effects", data=effect_config)
+        return await self._client.put(f"devices/{device_id}/effects", data=effect_config, timeout=timeout)
 
-    async def device_set_new_effect(self, device_id: str, effect_config):
+    async def device_set_new_effect(self, device_id: str, effect_config, timeout=None):
         """
         Set the device to a new effect based on the provided JSON configuration
 
         :param device_id:
         :param effect_config:
+        :param timeout: timeout of a single attempt in seconds, None for the client timeout
         :return: dict
         """
-        return await self._client.post(f"devices/{device_id}/effects", data=effect_config)
+        return await self._client.post(f"devices/{device_id}/effects", data=effect_config, timeout=timeout)
 
-    async def device_delete_effect(self, device_id: str):
+    async def device_delete_effect(self, device_id: str, timeout=None):
         """
         Clear the active effect of a device
 
         :param device_id:
+        :param timeout: timeout of a single attempt in seconds, None for the client timeout
         :return: dict
         """
-        return await self._client.delete(f"devices/{device_id}/effects")
+        return await self._client.delete(f"devices/{device_id}/effects", timeout=timeout)
 
     # device presets
 
-    async def device_get_presets(self, device_id: str):
+    async def device_get_presets(self, device_id: str, timeout=None):
         """
         Get preset effect configs for active effect of a device
 
         :param device_id: Id of the device
+        :param timeout: timeout of a single attempt in seconds, None for the client timeout
         :return: dict
         """
-        return await self._client.get(f"devices/{device_id}/presets")
+        return await self._client.get(f"devices/{device_id}/presets", timeout=timeout)
 
-    async def device_set_preset(self, device_id: str, preset):
+    async def device_set_preset(self, device_id: str, preset, timeout=None):
         """
         Set active effect config of device to a preset
 
         :param device_id: Id of the device
         :param preset: dict
+        :param timeout: timeout of a single attempt in seconds, None for the client timeout
         :return: dict
         """
-        return await self._client.put(f"devices/{device_id}/presets", data=preset)
+        return await self._client.put(f"devices/{device_id}/presets", data=preset, timeout=timeout)
 
-    async def device_save_as_preset(self, device_id: str, preset_config):
+    async def device_save_as_preset(self, device_id: str, preset_config, timeout=None):
         """
         Save configuration of device’s active effect as a custom preset for that effect
 
         :param device_id: Id of the device
         :param preset_config: JSON
+        :param timeout: timeout of a single attempt in seconds, None for the client timeout
         :return: dict
         """
-        return await self._client.post(f"devices/{device_id}/presets", data=preset_config)
+        return await self._client.post(f"devices/{device_id}/presets", data=preset_config, timeout=timeout)
 
-    async def device_clear_effect(self, device_id: str):
+    async def device_clear_effect(self, device_id: str, timeout=None):
         """
         Clear effect of a device
 
         :param device_id: Id of the device
+        :param timeout: timeout of a single attempt in seconds, None for the client timeout
         :return: status as dict
         """
-        return await self._client.delete(f"devices/{device_id}/presets")
+        return await self._client.delete(f"devices/{device_id}/presets", timeout=timeout)
 
     # effect presets
 
-    async def effect_get_presets(self, effect_id: str):
+    async def effect_get_presets(self, effect_id: str, timeout=None):
         """
         Get all presets for an effect
 
         :param effect_id: Id of the effect
+        :param timeout: timeout of a single attempt in seconds, None for the client timeout
         :return: dict
         """
-        return await self._client.get(f"effects/{effect_id}/presets")
+        return await self._client.get(f"effects/{effect_id}/presets", timeout=timeout)
 
-    async def effect_rename_preset(self, effect_id: str, preset_config):
+    async def effect_rename_preset(self, effect_id: str, preset_config, timeout=None):
         """
         Rename a preset
 
         :param effect_id: Id of the effect
         :param preset_config: dict
+        :param timeout: timeout of a single attempt in seconds, None for the client timeout
         :return: dict
         """
-        return await self._client.put(f"effects/{effect_id}/presets", data=preset_config)
+        return await self._client.put(f"effects/{effect_id}/presets", data=preset_config, timeout=timeout)
 
-    async def effect_delete_preset(self, effect_id: str, preset_config):
+    async def effect_delete_preset(self, effect_id: str, preset_config, timeout=None):
         """
         Delete a preset
 
         :param effect_id: Id of the effect
         :param preset_config: dict
+        :param timeout: timeout of a single attempt in seconds, None for the client timeout
         :return: dict
         """
-        return await self._client.delete(f"effects/{effect_id}/presets", data=preset_config)
+        return await self._client.delete(f"effects/{effect_id}/presets", data=preset_config, timeout=timeout)
 
     # scenes
 
-    async def scenes_get_all(self):
+    async def scenes_get_all(self, timeout=None):
         """
         Get all saved scenes
 
+        :param timeout: timeout of a single attempt in seconds, None for the client timeout
         :return: dict
         """
-        return await self._client.get('scenes')
+        return await self._client.get('scenes', timeout=timeout)
 
-    async def scenes_set(self, scene_config):
+    async def scenes_set(self, scene_config, timeout=None):
         """
         Set effects and configs of all devices to those specified in a scene
 
         :param scene_config: dict
+        :param timeout: timeout of a single attempt in seconds, None for the client timeout
         :return:
         """
-        return self._client.put('scenes', data=scene_config)
+        return await self._client.put('scenes', data=scene_config, timeout=timeout)
 
-    async def scenes_save_current_config_as_scene(self, scene_config):
+    async def scenes_save_current_config_as_scene(self, scene_config, timeout=None):
         """
         Save effect configuration of devices as a scene
 
         :param scene_config: dict
+        :param timeout: timeout of a single attempt in seconds, None for the client timeout
         :return:
         """
-        return await self._client.post('scenes', data=scene_config)
+        return await self._client.post('scenes', data=scene_config, timeout=timeout)
 
-    async def scenes_delete_scene(self, scene_config):
+    async def scenes_delete_scene(self, scene_config, timeout=None):
         """
         Delete a scene
 
         :param scene_config: dict
+        :param timeout: timeout of a single attempt in seconds, None for the client timeout
         :return: dict
         """
-        return await self._client.delete('scenes', data=scene_config)
+        return await self._client.delete('scenes', data=scene_config, timeout=timeout)
 
     # virtuals
 
-    async def virtuals_all(self):
+    async def virtuals_all(self, timeout=None):
         """
         Get all virtuals from the instance
 
+        :param timeout: timeout of a single attempt in seconds, None for the client timeout
         :return: dict
         """
-        return await self._client.get('virtuals')
+        return await self._client.get('virtuals', timeout=timeout)
 
-    async def virtuals_pause_unpause_all(self):
+    async def virtuals_pause_unpause_all(self, timeout=None):
         """
-        Pauses all virtuals or resumes when paused
+        Pauses all virtuals or resumes when paused, never retried as a repeated toggle would undo it
 
+        :param timeout: timeout of a single attempt in seconds, None for the client timeout
         :return:
         """
-        return await self._client.put('virtuals')
+        return await self._client.put('virtuals', retry=False, timeout=timeout)
 
-    async def virtuals_add(self, config):
+    async def virtuals_add(self, config, timeout=None):
         """
         Add a new virtual with the supplied config
 
         :param config: dict
+        :param timeout: timeout of a single attempt in seconds, None for the client timeout
         :return: dict
         """
-        return await self._client.post('virtuals', data=config)
+        return await self._client.post('virtuals', data=config, timeout=timeout)
 
     # virtual config
 
-    async def virtual_get_config(self, virtual_id):
+    async def virtual_get_config(self, virtual_id, timeout=None):
         """
         Get configuration of a virtual
 
         :param virtual_id: Id of the virtual
+        :param timeout: timeout of a single attempt in seconds, None for the client timeout
         :return:
         """
-        return await self._client.get(f"virtuals/{virtual_id}")
+        return await self._client.get(f"virtuals/{virtual_id}", timeout=timeout)
 
-    async def virtual_pause_unpause(self, virtual_id, is_active: bool):
+    async def virtual_pause_unpause(self, virtual_id, is_active: bool, timeout=None):
         """
         Pauses or unpauses a virtual
 
         :param virtual_id: Id of the virtual
         :param is_active:
+        :param timeout: timeout of a single attempt in seconds, None for the client timeout
         :return:
         """
-        return await self._client.put(f"virtuals/{virtual_id}", {'active': is_active})
+        return await self._client.put(f"virtuals/{virtual_id}", {'active': is_active}, timeout=timeout)
+
+    async def virtual_delete(self, virtual_id, timeout=None):
+        """
+        Delete a virtual
+
+        :param virtual_id: Id of the virtual
+        :param timeout: timeout of a single attempt in seconds, None for the client timeout
+        :return: dict
+        """
+        return await self._client.delete(f"virtuals/{virtual_id}", timeout=timeout)
 
     # virtuals effects
 
-    async def virtual_effect_active(self, virtual_id: str):
+    async def virtual_effect_active(self, virtual_id: str, timeout=None):
         """
         Active effect config
 
         :param virtual_id: Id of the virtual
+        :param timeout: timeout of a single attempt in seconds, None for the client timeout
         :return:
         """
-        return await self._client.get(f"virtuals/{virtual_id}/effects")
+        return await self._client.get(f"virtuals/{virtual_id}/effects", timeout=timeout)
 
-    async def virtual_effect_update(self, virtual_id, config):
+    async def virtual_effect_update(self, virtual_id, config, timeout=None):
         """
         TODO add desc
 
         :param virtual_id:
         :param config:
+        :param timeout: timeout of a single attempt in seconds, None for the client timeout
         :return:
         """
-        return await self._client.put(f"virtuals/{virtual_id}/effects", data=config)
+        return await self._client.put(f"virtuals/{virtual_id}/effects", data=config, timeout=timeout)
 
-    async def virtual_effect_set(self, virtual_id, config):
+    async def virtual_effect_set(self, virtual_id, config, timeout=None):
         """
         TODO add desc
 
         :param virtual_id:
         :param config:
+        :param timeout: timeout of a single attempt in seconds, None for the client timeout
         :return:
         """
-        return await self._client.post(f"virtuals/{virtual_id}/effects", config)
+        return await self._client.post(f"virtuals/{virtual_id}/effects", config, timeout=timeout)
+
+    async def virtual_effect_delete(self, virtual_id, timeout=None):
+        """
+        Clear the active effect of a virtual
+
+        :param virtual_id: Id of the virtual
+        :param timeout: timeout of a single attempt in seconds, None for the client timeout
+        :return: dict
+        """
+        return await self._client.delete(f"virtuals/{virtual_id}/effects", timeout=timeout)
 
     # virtual presets
 
-    async def virtual_presets_active(self, virtual_id):
+    async def virtual_presets_active(self, virtual_id, timeout=None):
         """
         TODO add desc
 
         :param virtual_id:
+        :param timeout: timeout of a single attempt in seconds, None for the client timeout
         :return:
         """
-        return await self._client.get(f"virtuals/{virtual_id}/presets")
+        return await self._client.get(f"virtuals/{virtual_id}/presets", timeout=timeout)
 
-    async def virtual_presets_set(self, virtual_id, config):
+    async def virtual_presets_set(self, virtual_id, config, timeout=None):
         """
         TODO add desc
 
         :param virtual_id:
         :param config:
+        :param timeout: timeout of a single attempt in seconds, None for the client timeout
         :return:
         """
-        return await self._client.put(f"virtuals/{virtual_id}/presets", data=config)
+        return await self._client.put(f"virtuals/{virtual_id}/presets", data=config, timeout=timeout)
@@ -0,0 +1,97 @@
+import random
+import time
+
+IDEMPOTENT_METHODS = frozenset(('GET', 'PUT', 'DELETE'))
+
+
+class RetryPolicy:
+    """
+    Bounded retries with jittered exponential backoff, only idempotent methods are retried.
+    Calls that are not idempotent despite their method, like the global pause toggle, opt out per request.
+    """
+
+    def __init__(self, attempts=3, backoff=0.1, max_backoff=2.0, retry_on_status=(502, 503, 504),
+                 methods=IDEMPOTENT_METHODS):
+        """
+        :param attempts: max number of attempts including the first one, 1 disables retries
+        :param backoff: base delay in seconds, doubled with every retry
+        :param max_backoff: upper bound of the delay in seconds
+        :param retry_on_status: http status codes that are retried
+        :param methods: http methods that may be retried
+        """
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retry_on_status = frozenset(retry_on_status)
+        self.methods = frozenset(methods)
+
+    def delay(self, retry):
+        """
+        Delay before the given retry using full jitter
+
+        :param retry: number of the retry, starting at 1
+        :return: seconds
+        """
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (retry - 1)))
+
+
+class CircuitBreaker:
+    """
+    Fails fast while a host is down.
+
+    After failure_threshold consecutive failures the circuit opens and requests are rejected
+    without touching the network. After reset_timeout one trial request is let through,
+    its outcome closes or reopens the circuit.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=10.0, clock=time.monotonic):
+        """
+        :param failure_threshold: consecutive failures opening the circuit
+        :param reset_timeout: seconds until a trial request is allowed
+        :param clock: monotonic time source
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.rejected = 0
+        self._opened_at = None
+
+    def allow_request(self):
+        """
+        Check if a request may be sent, moves an expired open circuit to half open
+
+        :return: bool
+        """
+        if self.state == self.CLOSED:
+            return True
+        now = self._clock()
+        if now - self._opened_at >= self.reset_timeout:
+            # also covers a trial request that never reported back
+            self.state = self.HALF_OPEN
+            self._opened_at = now
+            return True
+        self.rejected += 1
+        return False
+
+    def retry_after(self):
+        """
+        :return: seconds until the next trial request is allowed
+        """
+        if self.state == self.CLOSED:
+            return 0.0
+        return max(0.0, self.reset_timeout - (self._clock() - self._opened_at))
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self._opened_at = self._clock()
@@ -0,0 +1,186 @@
+import time
+from collections import OrderedDict
+
+# seconds a response stays fresh, keyed by path prefix (longest prefix wins)
+DEFAULT_TTLS = {
+    'info': 60,
+    'schema': 300,
+    'effects/': 60,
+}
+# requests changing the presets of an effect or device, visible in the preset lists of other resources;
+# applying a preset to a virtual (PUT virtuals/{id}/presets) does not change any preset list
+_PRESET_CHANGES = {
+    'effects': ('PUT', 'DELETE'),
+    'devices': ('POST',),
+}
+
+
+class CacheEntry:
+    __slots__ = ('value', 'size', 'expires', 'etag', 'last_modified')
+
+    def __init__(self, value, size, expires, etag=None, last_modified=None):
+        self.value = value
+        self.size = size
+        self.expires = expires
+        self.etag = etag
+        self.last_modified = last_modified
+
+    def is_fresh(self, now):
+        return now < self.expires
+
+    def validators(self):
+        """
+        Conditional request headers for revalidating this entry
+
+        :return: dict, empty if the server sent no validators
+        """
+        headers = {}
+        if self.etag is not None:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified is not None:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """
+    LRU cache for decoded GET responses with per path TTLs and a memory bound.
+
+    Cached values are shared between callers and must not be modified.
+    """
+
+    def __init__(self, ttls=None, max_bytes=16 * 1024 * 1024, clock=time.monotonic):
+        """
+        :param ttls: dict of path prefix to TTL in seconds, paths without a matching prefix are not cached
+        :param max_bytes: upper bound for the summed size of all cached response bodies
+        :param clock: monotonic time source
+        """
+        self._ttls = sorted((ttls if ttls is not None else DEFAULT_TTLS).items(),
+                            key=lambda item: len(item[0]), reverse=True)
+        self._max_bytes = max_bytes
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def ttl_for(self, path):
+        """
+        Get the TTL configured for a path
+
+        :param path: api path
+        :return: TTL in seconds or None if the path is not cached
+        """
+        for prefix, ttl in self._ttls:
+            if path.startswith(prefix):
+                return ttl
+        return None
+
+    def is_fresh(self, entry):
+        """
+        Check if an entry can be served without asking the server
+
+        :param entry: CacheEntry
+        :return: bool
+        """
+        return entry.is_fresh(self._clock())
+
+    def lookup(self, path):
+        """
+        Look up the entry for a path, counting a hit when it is still fresh
+
+        :param path: api path
+        :return: CacheEntry, possibly stale, or None
+        """
+        entry = self._entries.get(path)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(path)
+        if entry.is_fresh(self._clock()):
+            self.hits += 1
+        else:
+            self.misses += 1
+        return entry
+
+    def store(self, path, value, size, etag=None, last_modified=None):
+        """
+        Store a decoded response
+
+        :param path: api path
+        :param value: decoded response
+        :param size: size of the response body in bytes
+        :param etag: ETag header of the response
+        :param last_modified: Last-Modified header of the response
+        """
+        ttl = self.ttl_for(path)
+        if ttl is None or size > self._max_bytes:
+            return
+        self._remove(path)
+        self._entries[path] = CacheEntry(value, size, self._clock() + ttl, etag, last_modified)
+        self._size += size
+        while self._size > self._max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def revalidated(self, path, entry):
+        """
+        Mark a stale entry as fresh again after the server answered 304 Not Modified
+
+        :param path: api path
+        :param entry: the entry that was revalidated
+        :return: cached value
+        """
+        entry.expires = self._clock() + self.ttl_for(path)
+        self.revalidations += 1
+        return entry.value
+
+    def invalidate(self, prefix=''):
+        """
+        Drop all entries whose path starts with prefix
+
+        :param prefix: path prefix, empty to clear the cache
+        """
+        for path in [path for path in self._entries if path.startswith(prefix)]:
+            self._remove(path)
+            self.invalidations += 1
+
+    def invalidate_for(self, method, path):
+        """
+        Drop entries that may be stale after a mutating request to path.
+        This covers the whole top level resource and, for changes of the presets of an effect or a device,
+        all cached preset lists.
+
+        :param method: http method of the request
+        :param path: path of the mutating request
+        """
+        parts = path.strip('/').split('/')
+        touches_presets = len(parts) == 3 and parts[2] == 'presets' and method in _PRESET_CHANGES.get(parts[0], ())
+        for cached in list(self._entries):
+            if cached.split('/', 1)[0] == parts[0] or (touches_presets and cached.endswith('presets')):
+                self._remove(cached)
+                self.invalidations += 1
+
+    def stats(self):
+        """
+        Get cache counters
+
+        :return: dict
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'revalidations': self.revalidations,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'entries': len(self._entries),
+            'bytes': self._size,
+        }
+
+    def _remove(self, path):
+        entry = self._entries.pop(path, None)
+        if entry is not None:
+            self._size -= entry.size
@@ -1,108 +1,474 @@
 import logging
+import time
 import urllib.parse as url_parser
 
 import asyncio
-import aiohttp
-import json
+
+from .resilience import CircuitBreaker, RetryPolicy
+from . import selection
+from .serializers import PreparedBody, default_serializer
 
 _LOGGER = logging.getLogger(__name__)
 
+# parsed urls kept per client, paths contain ids so the number of distinct paths is bounded by the setup
+_URL_CACHE_SIZE = 1024
+
 
-class ApiError(BaseException):
+class ApiError(Exception):
     pass
 
 
+class ApiConnectionError(ApiError):
+    """
+    The LedFx instance could not be reached
+    """
+
+
+class ApiTimeoutError(ApiConnectionError):
+    """
+    The LedFx instance did not answer in time
+    """
+
+
+class CircuitOpenError(ApiConnectionError):
+    """
+    The request was rejected without sending it, the host failed repeatedly
+    """
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ApiResponseError(ApiError):
+    """
+    The LedFx instance answered with an http error status
+    """
+
+    def __init__(self, status, payload=None):
+        reason = payload.get('reason') if isinstance(payload, dict) else None
+        super().__init__(f"HTTP {status}: {reason}" if reason else f"HTTP {status}")
+        self.status = status
+        self.payload = payload
+
+
+class ApiDecodeError(ApiError):
+    """
+    The response body is not valid JSON
+    """
+
+
+class PoolConfig:
+    """
+    Settings for the connection pool backing a RESTClient session
+    """
+
+    def __init__(self, limit=100, limit_per_host=0, keepalive_timeout=30.0, ttl_dns_cache=300):
+        """
+        :param limit: max number of simultaneous connections, 0 for unlimited
+        :param limit_per_host: max number of simultaneous connections to one host, 0 for unlimited
+        :param keepalive_timeout: seconds an idle connection is kept open for reuse
+        :param ttl_dns_cache: seconds a resolved host is cached, None to cache forever
+        """
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.ttl_dns_cache = ttl_dns_cache
+
+    def create_connector(self):
+        """
+        Create a new connector using this configuration
+
+        :return: aiohttp.TCPConnector
+        """
+        import aiohttp
+
+        return aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            use_dns_cache=True,
+            ttl_dns_cache=self.ttl_dns_cache,
+        )
+
+
 class RESTClient:
-    def __init__(self, host, port, url_base, https=False, ):
+    def __init__(self, host, port, url_base, https=False, session=None, pool_config=None, cache=None,
+                 serializer=None, coalesce_gets=True, instrumentation=None, timeout=10.0, retry_policy=None,
+                 circuit_breaker=None):
+        """
+        :param host: host of the LedFx instance
+        :param port: port of the LedFx instance
+        :param url_base: base path of the api
+        :param https: use https instead of http
+        :param session: shared aiohttp.ClientSession, the client will not close a session passed in here
+        :param pool_config: PoolConfig used when the client creates its own session
+        :param cache: optional ResponseCache for GET responses
+        :param serializer: object with dumps/loads working on bytes, defaults to the fastest available
+        :param coalesce_gets: let concurrent identical GET requests share one request and its decoded result
+        :param instrumentation: optional Instrumentation receiving an event per request
+        :param timeout: default timeout of a single attempt in seconds, None to wait forever
+        :param retry_policy: RetryPolicy for idempotent requests, defaults to 3 attempts
+        :param circuit_breaker: CircuitBreaker of this host, defaults to opening after 5 failures
+        """
         if https:
             self.base_url = f"https://{host}:{port}"
         else:
             self.base_url = f"http://{host}:{port}"
 
         self.base_url = url_parser.urljoin(self.base_url, url_base)
+        self._session = session
+        self._owns_session = session is None
+        self._closed = False
+        self._pool_config = pool_config or PoolConfig()
+        self.cache = cache
+        self.serializer = serializer or default_serializer()
+        self.coalesce_gets = coalesce_gets
+        self.instrumentation = instrumentation
+        self.timeout = timeout
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        self._inflight = {}
+        self._urls = {}
+        self._timeouts = {}
+        self.requests_sent = 0
+        self.requests_coalesced = 0
+        self._mutation_listeners = []
 
-    """
-    @staticmethod
-    def handle_exception(e, response):
-        if isinstance(e, requests.ConnectionError):
-            _LOGGER.error("Cant connect to LedFx Instance")
-        if isinstance(e, requests.HTTPError):
-            # Handle http errors
-            _LOGGER.error(response.text)
-        if isinstance(e, requests.Timeout):
-            _LOGGER.error("Timeout while connecting to LedFx Instance")
-        if isinstance(e, requests.TooManyRedirects):
-            _LOGGER.error("To many redirects while connecting to LedFx Instance")
-
-        raise ApiError from e
-    """
+    @property
+    def session(self):
+        """
+        The session used for all requests, created on first use so it binds to the running event loop
+
+        :return: aiohttp.ClientSession
+        """
+        if self._closed:
+            raise ApiError('Client has been closed')
+        if self._session is None or self._session.closed:
+            if not self._owns_session:
+                raise ApiError('Shared session has been closed')
+            import aiohttp
+
+            trace_configs = [self.instrumentation.trace_config()] if self.instrumentation is not None else None
+            self._session = aiohttp.ClientSession(connector=self._pool_config.create_connector(),
+                                                  trace_configs=trace_configs)
+        return self._session
+
+    async def close(self):
+        """
+        Close the session and release all pooled connections, a shared session is left open.
+        Requests made after closing raise ApiError.
+        """
+        self._closed = True
+        if self._owns_session and self._session is not None and not self._session.closed:
+            await self._session.close()
+        if self._owns_session:
+            self._session = None
 
-    def handle_http_error(self, e):
-        pass
+    async def __aenter__(self):
+        return self
 
-    async def get(self, path, data=None, headers=None):
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    def stats(self):
+        """
+        Get request counters
+
+        :return: dict
+        """
+        return {
+            'requests_sent': self.requests_sent,
+            'requests_coalesced': self.requests_coalesced,
+            'in_flight_gets': len(self._inflight),
+        }
+
+    def add_mutation_listener(self, listener):
+        """
+        Register a callback for responses to POST, PUT and DELETE requests
+
+        :param listener: callable(method, path, data, response)
+        """
+        self._mutation_listeners.append(listener)
+
+    def remove_mutation_listener(self, listener):
+        """
+        Unregister a callback added with add_mutation_listener
+
+        :param listener: callable
+        """
+        self._mutation_listeners.remove(listener)
+
+    def prepare(self, data):
+        """
+        Serialize a request body ahead of time, the result can be passed as data to all request methods
+
+        :param data: json serializable object
+        :return: PreparedBody
+        """
+        return PreparedBody(data, self.serializer.dumps(data))
+
+    async def ping(self, path='info'):
+        """
+        Send a GET request bypassing cache and coalescing, e.g. to open a pooled connection ahead of time
+
+        :param path: url path
+        :return: round trip time in seconds
+        """
+        start = time.perf_counter()
+        await self._attempt('GET', path, self._url(path), None, None, self._client_timeout(None), None, None, None,
+                            None)
+        return time.perf_counter() - start
+
+    def ws_connect(self, path, heartbeat=None):
+        """
+        Open a websocket using the session of this client
+
+        :param path: url path
+        :param heartbeat: seconds between pings, the connection is closed if a pong is missing
+        :return: context manager of aiohttp.ClientWebSocketResponse
+        """
+        return self.session.ws_connect(self._url(path), heartbeat=heartbeat)
+
+    def _url(self, path):
+        url = self._urls.get(path)
+        if url is None:
+            import yarl
+
+            if len(self._urls) >= _URL_CACHE_SIZE:
+                self._urls.clear()
+            url = self._urls[path] = yarl.URL(url_parser.urljoin(self.base_url, path))
+        return url
+
+    def _client_timeout(self, timeout):
+        timeout = timeout if timeout is not None else self.timeout
+        client_timeout = self._timeouts.get(timeout)
+        if client_timeout is None:
+            import aiohttp
+
+            client_timeout = self._timeouts[timeout] = aiohttp.ClientTimeout(total=timeout)
+        return client_timeout
+
+    async def _mutate(self, method, path, data, headers, timeout, retry):
+        result = await self._request(method, path, data, headers, timeout, retry=retry)
+        if isinstance(data, PreparedBody):
+            data = data.data
+        if result is not None:
+            for listener in list(self._mutation_listeners):
+                try:
+                    listener(method, path, data, result)
+                except Exception:
+                    _LOGGER.exception("Mutation listener failed for %s %s", method, path)
+        return result
+
+    async def _coalesced_get(self, path):
+        inflight = self._inflight.get(path)
+        if inflight is not None:
+            self.requests_coalesced += 1
+            if self.instrumentation is None:
+                return await asyncio.shield(inflight)
+            event = self.instrumentation.start('GET', path)
+            event.coalesced = True
+            try:
+                return await asyncio.shield(inflight)
+            finally:
+                self.instrumentation.finish(event)
+
+        def done(task):
+            if self._inflight.get(path) is task:
+                del self._inflight[path]
+            if not task.cancelled():
+                task.exception()
+
+        task = asyncio.ensure_future(self._request('GET', path))
+        self._inflight[path] = task
+        task.add_done_callback(done)
+        return await asyncio.shield(task)
+
+    async def _request(self, method, path, data=None, headers=None, timeout=None, select=None, retry=True):
+        if self.instrumentation is None:
+            return await self._send(method, path, data, headers, timeout, None, select, retry)
+        event = self.instrumentation.start(method, path)
+        try:
+            return await self._send(method, path, data, headers, timeout, event, select, retry)
+        finally:
+            self.instrumentation.finish(event)
+
+    async def _send(self, method, path, data, headers, timeout, event, select, retry):
+        url = self._url(path)
+        cache = None
+        entry = None
+        if method == 'GET' and data is None and self.cache is not None and self.cache.ttl_for(path) is not None:
+            cache = self.cache
+            entry = cache.lookup(path)
+            if entry is not None:
+                if cache.is_fresh(entry):
+                    if event is not None:
+                        event.cache_hit = True
+                    return entry.value if select is None else selection.prune(entry.value, select)
+                headers = {**(headers or {}), **entry.validators()}
+        body = None
+        if data is not None:
+            body = data.body if isinstance(data, PreparedBody) else self.serializer.dumps(data)
+            headers = {'Content-Type': self.serializer.content_type, **(headers or {})}
+            if event is not None:
+                event.bytes_out = len(body)
+        if method != 'GET' and self._inflight:
+            # later readers must not join a GET that started before this mutation
+            resource = path.split('/', 1)[0]
+            for inflight_path in [key for key in self._inflight if key.split('/', 1)[0] == resource]:
+                del self._inflight[inflight_path]
+        client_timeout = self._client_timeout(timeout)
+        retries = 0
+        try:
+            while True:
+                try:
+                    return await self._attempt(method, path, url, body, headers, client_timeout, cache, entry, event,
+                                               select)
+                except ApiError as e:
+                    if not retry or not self._should_retry(method, e, retries):
+                        raise
+                    retries += 1
+                    if event is not None:
+                        event.retries = retries
+                    _LOGGER.debug("Retrying %s %s after %r", method, url, e)
+                    await asyncio.sleep(self.retry_policy.delay(retries))
+        except ApiError as e:
+            _LOGGER.debug("Request %s %s failed: %r", method, url, e)
+            if event is not None:
+                event.error = e
+            raise
+        finally:
+            if method != 'GET' and self.cache is not None:
+                self.cache.invalidate_for(method, path)
+
+    def _should_retry(self, method, error, retries):
+        policy = self.retry_policy
+        if retries + 1 >= policy.attempts or method not in policy.methods or isinstance(error, CircuitOpenError):
+            return False
+        if isinstance(error, ApiResponseError):
+            return error.status in policy.retry_on_status
+        return isinstance(error, ApiConnectionError)
+
+    async def _attempt(self, method, path, url, body, headers, timeout, cache, entry, event, select):
+        import aiohttp
+
+        breaker = self.circuit_breaker
+        if not breaker.allow_request():
+            raise CircuitOpenError(f"Circuit open for {self.base_url}", breaker.retry_after())
+        self.requests_sent += 1
+        try:
+            async with self.session.request(method, url, headers=headers, data=body, timeout=timeout,
+                                            trace_request_ctx=event) as resp:
+                status = resp.status
+                if event is not None:
+                    event.status = status
+                if entry is not None and status == 304:
+                    breaker.record_success()
+                    if event is not None:
+                        event.cache_hit = True
+                    value = cache.revalidated(path, entry)
+                    return value if select is None else selection.prune(value, select)
+                # cacheable responses are decoded whole and stored, later selections are pruned from the cache
+                if (select is not None and cache is None and status < 400
+                        and selection.should_stream(resp.content_length, select)):
+                    return await self._read_selected(method, url, resp, select, breaker, event)
+                content = await resp.read()
+                response_headers = resp.headers
+        except asyncio.TimeoutError as e:
+            breaker.record_failure()
+            raise ApiTimeoutError(f"Timeout while connecting to LedFx instance {self.base_url}") from e
+        except aiohttp.ClientError as e:
+            breaker.record_failure()
+            raise ApiConnectionError(f"Cant connect to LedFx instance {self.base_url}: {e}") from e
+        if status >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        if event is not None:
+            event.bytes_in = len(content)
+        try:
+            result = self.serializer.loads(content) if content else None
+        except ValueError as e:
+            if status >= 400:
+                result = None
+            else:
+                raise ApiDecodeError(f"Invalid JSON in response to {method} {url}") from e
+        if status >= 400:
+            raise ApiResponseError(status, result)
+        if cache is not None and status == 200:
+            cache.store(path, result, len(content), response_headers.get('ETag'), response_headers.get('Last-Modified'))
+        if select is not None:
+            result = selection.prune(result, select)
+        return result
+
+    @staticmethod
+    async def _read_selected(method, url, resp, select, breaker, event):
+        try:
+            result = await selection.select_stream(resp.content, select)
+        except ValueError as e:
+            breaker.record_success()
+            raise ApiDecodeError(f"Invalid JSON in response to {method} {url}") from e
+        # drain the rest without parsing so the connection can be reused
+        while await resp.content.readany():
+            pass
+        breaker.record_success()
+        if event is not None:
+            event.bytes_in = resp.content.total_bytes
+        return result
+
+    async def get(self, path, data=None, headers=None, timeout=None, select=None):
         """
         :param path: url path
         :param data: dict like obj
         :param headers: request headers
+        :param timeout: timeout of a single attempt in seconds, defaults to the client timeout
+        :param select: path or paths of the parts of the response to decode, see LedFxAPI.selection;
+            responses the cache keeps are decoded whole, cached and pruned
         :return: json response as dict obj
+        :raises ApiError: on connection errors, timeouts, http errors and invalid responses
         """
-        url = url_parser.urljoin(self.base_url, path)
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.get(url, headers=headers, data=json.dumps(data)) as resp:
-                    return await resp.json()
-            except Exception as e:
-                # self.handle_exception(e, response)
-                pass
+        if select is not None:
+            return await self._request('GET', path, data, headers, timeout, selection.compile_paths(select))
+        if self.coalesce_gets and data is None and headers is None and timeout is None:
+            return await self._coalesced_get(path)
+        return await self._request('GET', path, data, headers, timeout)
 
-    async def post(self, path, data=None, headers=None):
+    async def post(self, path, data=None, headers=None, timeout=None, retry=True):
         """
         :param path: url path
         :param data: dict like obj
         :param headers: request headers
+        :param timeout: timeout of a single attempt in seconds, defaults to the client timeout
+        :param retry: False for requests that must not be repeated, e.g. toggles, even if the method is idempotent
         :returns:
             - json response as dict obj
+        :raises ApiError: on connection errors, timeouts, http errors and invalid responses
         """
-        url = url_parser.urljoin(self.base_url, path)
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.post(url, headers=headers, data=json.dumps(data)) as resp:
-                    return await resp.json()
-            except Exception as e:
-                # self.handle_exception(e, response)
-                pass
+        return await self._mutate('POST', path, data, headers, timeout, retry)
 
-    async def put(self, path, data=None, headers=None):
+    async def put(self, path, data=None, headers=None, timeout=None, retry=True):
         """
         :param path: url path
         :param data: dict like obj
         :param headers: request headers
+        :param timeout: timeout of a single attempt in seconds, defaults to the client timeout
+        :param retry: False for requests that must not be repeated, e.g. toggles, even if the method is idempotent
         :returns:
             - json response as dict obj
+        :raises ApiError: on connection errors, timeouts, http errors and invalid responses
         """
-        url = url_parser.urljoin(self.base_url, path)
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.put(url, headers=headers, data=json.dumps(data)) as resp:
-                    return await resp.json()
-            except Exception as e:
-                # self.handle_exception(e, response)
-                pass
+        return await self._mutate('PUT', path, data, headers, timeout, retry)
 
-    async def delete(self, path, data=None, headers=None):
+    async def delete(self, path, data=None, headers=None, timeout=None, retry=True):
         """
         :param path: url path
         :param data: dict like obj
         :param headers: request headers
+        :param timeout: timeout of a single attempt in seconds, defaults to the client timeout
+        :param retry: False for requests that must not be repeated, e.g. toggles, even if the method is idempotent
         :returns:
             - json response as dict obj
+        :raises ApiError: on connection errors, timeouts, http errors and invalid responses
         """
-        url = url_parser.urljoin(self.base_url, path)
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.delete(url, headers=headers, data=json.dumps(data)) as resp:
-                    return await resp.json()
-            except Exception as e:
-                # self.handle_exception(e, response)
-                pass
+        return await self._mutate('DELETE', path, data, headers, timeout, retry)
@@ -0,0 +1,227 @@
+"""
+Extract parts of large JSON documents.
+
+Paths are dotted keys, '*' matches every key of an object or item of a list, e.g. 'effects.*.name'.
+The result keeps the shape of the document with only the selected values and the objects leading to them.
+With ijson installed large responses are parsed while they are streamed and only selected values are built,
+parsing stops once nothing more can match. Smaller responses and selections containing a wildcard, which have to
+parse the document to its end anyway, are decoded as a whole and pruned, which is faster.
+"""
+import json
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+WILDCARD = '*'
+# responses with a known size below this are decoded as a whole instead of streamed
+STREAMING_MIN_BYTES = 1024 * 1024
+
+_START = frozenset(('start_map', 'start_array'))
+_END = frozenset(('end_map', 'end_array'))
+
+
+def should_stream(content_length, paths=()):
+    """
+    :param content_length: size of the response body, None if unknown
+    :param paths: path tuples of the selection, see compile_paths
+    :return: True if the response should be parsed while streaming
+    """
+    if ijson is None or any(WILDCARD in path for path in paths):
+        # a wildcard matches up to the end of its container, streaming would not save reading the rest
+        return False
+    return content_length is None or content_length >= STREAMING_MIN_BYTES
+
+
+def compile_paths(select):
+    """
+    :param select: path or iterable of paths, '' selects the whole document
+    :return: tuple of path tuples
+    """
+    if isinstance(select, str):
+        select = (select,)
+    return tuple(tuple(path.split('.')) if path else () for path in select)
+
+
+def _child_paths(paths, key):
+    key = str(key)
+    return [path[1:] for path in paths if path[0] == WILDCARD or path[0] == key]
+
+
+def prune(document, paths):
+    """
+    Select parts of a decoded document
+
+    :param document: decoded JSON
+    :param paths: path tuples, see compile_paths
+    :return: pruned copy of the document, None if nothing matched
+    """
+    if any(not path for path in paths):
+        return document
+    if isinstance(document, dict):
+        items = document.items()
+        result = {}
+    elif isinstance(document, list):
+        items = enumerate(document)
+        result = []
+    else:
+        return None
+    for key, value in items:
+        child_paths = _child_paths(paths, key)
+        if not child_paths:
+            continue
+        if any(not path for path in child_paths):
+            selected = value
+        elif isinstance(value, (dict, list)):
+            selected = prune(value, child_paths)
+        else:
+            continue
+        if isinstance(result, dict):
+            result[key] = selected
+        else:
+            result.append(selected)
+    return result
+
+
+class _Selector:
+    """
+    Builds the pruned document from ijson basic_parse events
+    """
+
+    def __init__(self, paths):
+        self.paths = paths
+        self.result = None
+        self.done = False
+        # frames of the containers leading to selected values: [paths, container, key, index]
+        self._stack = []
+        self._skip = 0
+        self._builder = None
+        self._depth = 0
+
+    def event(self, event, value):
+        """
+        Process one event
+
+        :return: True once nothing more can be selected
+        """
+        if self._skip:
+            if event in _START:
+                self._skip += 1
+            elif event in _END:
+                self._skip -= 1
+                if not self._skip:
+                    self._child_done()
+            return self.done
+        if self._builder is not None:
+            self._builder.event(event, value)
+            if event in _START:
+                self._depth += 1
+            elif event in _END:
+                self._depth -= 1
+                if not self._depth:
+                    self._attach(self._builder.value)
+                    self._builder = None
+                    self._child_done()
+            return self.done
+        if event == 'map_key':
+            self._stack[-1][2] = value
+            return False
+        if event in _END:
+            self._stack.pop()
+            self._child_done()
+            return self.done
+        paths = self._child_paths()
+        if any(not path for path in paths):
+            if event in _START:
+                self._builder = ijson.ObjectBuilder()
+                self._builder.event(event, value)
+                self._depth = 1
+                return False
+            self._attach(value)
+        elif event in _START:
+            if not paths:
+                self._skip = 1
+                return False
+            container = {} if event == 'start_map' else []
+            self._attach(container)
+            self._stack.append([paths, container, None, 0])
+            return False
+        self._child_done()
+        return self.done
+
+    def _child_done(self):
+        if not self._stack:
+            self.done = True
+            return
+        frame = self._stack[-1]
+        key = str(frame[2] if isinstance(frame[1], dict) else frame[3] - 1)
+        frame[0] = [path for path in frame[0] if path[0] != key]
+        if frame[0]:
+            return
+        # no path left inside this container, skip the rest of it
+        self._stack.pop()
+        if self._stack:
+            self._skip = 1
+        else:
+            self.done = True
+
+    def _child_paths(self):
+        if not self._stack:
+            return list(self.paths)
+        frame = self._stack[-1]
+        if isinstance(frame[1], dict):
+            key = frame[2]
+        else:
+            key = frame[3]
+            frame[3] += 1
+        return _child_paths(frame[0], key)
+
+    def _attach(self, value):
+        if not self._stack:
+            self.result = value
+            return
+        frame = self._stack[-1]
+        if isinstance(frame[1], dict):
+            frame[1][frame[2]] = value
+        else:
+            frame[1].append(value)
+
+
+def select_bytes(data, paths):
+    """
+    Select parts of an encoded document without decoding the rest
+
+    :param data: JSON as bytes
+    :param paths: path tuples, see compile_paths
+    :return: pruned document
+    """
+    if ijson is None:
+        return prune(json.loads(data), paths)
+    selector = _Selector(paths)
+    try:
+        for event, value in ijson.basic_parse(data, use_float=True):
+            if selector.event(event, value):
+                break
+    except ijson.JSONError as e:
+        raise ValueError(str(e)) from e
+    return selector.result
+
+
+async def select_stream(stream, paths):
+    """
+    Select parts of a document while it is received, requires ijson
+
+    :param stream: object with an async read(size) method, e.g. aiohttp.StreamReader
+    :param paths: path tuples, see compile_paths
+    :return: pruned document, the stream is not read further once nothing more can match
+    :raises ValueError: on invalid JSON
+    """
+    selector = _Selector(paths)
+    try:
+        async for event, value in ijson.basic_parse_async(stream, use_float=True):
+            if selector.event(event, value):
+                break
+    except ijson.JSONError as e:
+        raise ValueError(str(e)) from e
+    return selector.result
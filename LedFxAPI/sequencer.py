@@ -0,0 +1,342 @@
+import asyncio
+import logging
+import statistics
+import time
+from dataclasses import dataclass, field
+
+from .batch import check_response
+from .ledfx import LedFx
+
+_LOGGER = logging.getLogger(__name__)
+
+SCENE = 'scene'
+PRESET = 'preset'
+EFFECT = 'effect'
+UPDATE = 'update'
+
+
+@dataclass(slots=True)
+class Cue:
+    """
+    A change scheduled at a point of a timeline, use the scene/preset/effect/update constructors
+    """
+    at: float
+    action: str
+    data: dict
+    virtual_id: str = None
+    instance: str = None
+    label: str = None
+
+    @classmethod
+    def scene(cls, at, scene_id, instance=None, label=None):
+        """
+        :param at: seconds from the start of the timeline
+        :param scene_id: Id of the scene to activate
+        :param instance: name of the instance when sequencing a cluster
+        :param label: name shown in the report
+        :return: Cue
+        """
+        return cls(at, SCENE, {'id': scene_id, 'action': 'activate'}, instance=instance, label=label)
+
+    @classmethod
+    def preset(cls, at, virtual_id, effect_id, preset_id, category=None, instance=None, label=None):
+        """
+        :param at: seconds from the start of the timeline
+        :param virtual_id: Id of the virtual
+        :param effect_id: ID of the effect
+        :param preset_id: ID of the preset
+        :param category: PresetType, looked up in the preset index of the instance if None
+        :param instance: name of the instance when sequencing a cluster
+        :param label: name shown in the report
+        :return: Cue
+        """
+        data = {'effect_id': effect_id, 'preset_id': preset_id}
+        if category is not None:
+            data['category'] = category.value
+        return cls(at, PRESET, data, virtual_id, instance, label)
+
+    @classmethod
+    def effect(cls, at, virtual_id, effect_type, config=None, instance=None, label=None):
+        """
+        :param at: seconds from the start of the timeline
+        :param virtual_id: Id of the virtual
+        :param effect_type: effect type to set
+        :param config: effect config
+        :param instance: name of the instance when sequencing a cluster
+        :param label: name shown in the report
+        :return: Cue
+        """
+        return cls(at, EFFECT, {'type': effect_type, 'config': config or {}}, virtual_id, instance, label)
+
+    @classmethod
+    def update(cls, at, virtual_id, config, instance=None, label=None):
+        """
+        :param at: seconds from the start of the timeline
+        :param virtual_id: Id of the virtual
+        :param config: changed values of the active effect config
+        :param instance: name of the instance when sequencing a cluster
+        :param label: name shown in the report
+        :return: Cue
+        """
+        return cls(at, UPDATE, {'config': config}, virtual_id, instance, label)
+
+
+@dataclass(slots=True)
+class CueResult:
+    """
+    Timing of a fired cue, all times in seconds relative to the start of the timeline
+    """
+    cue: Cue
+    lead: float
+    fired: float = None
+    completed: float = None
+    error: Exception = None
+    response: dict = field(default=None, repr=False)
+
+    @property
+    def ok(self):
+        return self.error is None and self.completed is not None
+
+    @property
+    def fire_error(self):
+        """
+        Difference between the planned and the actual send time, i.e. scheduler jitter
+        """
+        return self.fired - (self.cue.at - self.lead)
+
+    @property
+    def latency(self):
+        return self.completed - self.fired if self.completed is not None else None
+
+    @property
+    def offset(self):
+        """
+        Estimated difference between the time the instance applied the change and the scheduled time,
+        assuming the request arrived after half of the round trip
+        """
+        if self.completed is None:
+            return None
+        return self.fired + self.latency / 2 - self.cue.at
+
+
+class SequenceReport:
+    """
+    Results of a timeline run in cue order
+    """
+
+    def __init__(self, results, duration):
+        self.results = results
+        self.duration = duration
+
+    def __iter__(self):
+        return iter(self.results)
+
+    def __len__(self):
+        return len(self.results)
+
+    @property
+    def failed(self):
+        return [result for result in self.results if result.fired is not None and not result.ok]
+
+    def jitter(self):
+        """
+        Statistics of the scheduler jitter (fire_error) and of the estimated apply offset in seconds
+
+        :return: dict
+        """
+        fired = [result for result in self.results if result.fired is not None]
+        applied = [result.offset for result in fired if result.ok]
+        return {
+            'cues': len(self.results),
+            'fired': len(fired),
+            'failed': len(self.failed),
+            'fire_error': _summary([result.fire_error for result in fired]),
+            'offset': _summary(applied),
+        }
+
+    def __repr__(self):
+        return f"SequenceReport(cues={len(self)}, failed={len(self.failed)}, duration={self.duration:.4f})"
+
+
+def _summary(values):
+    if not values:
+        return None
+    absolute = sorted(abs(value) for value in values)
+    return {
+        'mean': statistics.fmean(values),
+        'mean_abs': statistics.fmean(absolute),
+        'p95_abs': absolute[min(len(absolute) - 1, int(len(absolute) * 0.95))],
+        'max_abs': absolute[-1],
+    }
+
+
+class Sequencer:
+    """
+    Fires the cues of a timeline against the monotonic clock.
+
+    Every cue is scheduled relative to the start of the run so timing does not drift with request latency,
+    requests are sent without waiting for the previous cue except one of the same virtual that is still
+    in flight, so changes of one virtual apply in order. Payloads are serialized before the run,
+    idle connections are opened again shortly before a cue and cues can be fired early by an estimate
+    of the latency of each instance.
+    """
+
+    def __init__(self, instances, lead_fraction=0.5, prepare_ahead=0.5, idle_rewarm=10.0, spin=0.002,
+                 latency_smoothing=0.2):
+        """
+        :param instances: LedFx, or LedFxCluster / dict of instance name to LedFx
+        :param lead_fraction: fire cues early by this fraction of the smoothed round trip time, 0 to disable
+        :param prepare_ahead: seconds before a cue to check its connection
+        :param idle_rewarm: ping an instance before a cue if it was idle for this many seconds
+        :param spin: the last part of each wait in seconds is spent yielding to the loop instead of sleeping
+        :param latency_smoothing: weight of a new sample in the moving average of the round trip time
+        """
+        self._instances = instances
+        self.lead_fraction = lead_fraction
+        self.prepare_ahead = prepare_ahead
+        self.idle_rewarm = idle_rewarm
+        self.spin = spin
+        self.latency_smoothing = latency_smoothing
+        self._latency = {}
+        self._last_used = {}
+
+    def instance(self, name=None):
+        """
+        :param name: name of the instance, None for a single LedFx
+        :return: LedFx
+        """
+        if isinstance(self._instances, LedFx):
+            if name is not None:
+                raise ValueError(f"Unknown instance {name}")
+            return self._instances
+        return self._instances[name]
+
+    def latency(self, name=None):
+        """
+        Smoothed round trip time of an instance
+
+        :param name: name of the instance
+        :return: seconds or None if not measured yet
+        """
+        return self._latency.get(name)
+
+    def lead(self, name=None):
+        """
+        :param name: name of the instance
+        :return: seconds cues of this instance are fired early
+        """
+        return (self._latency.get(name) or 0.0) * self.lead_fraction
+
+    def _record_latency(self, name, sample):
+        current = self._latency.get(name)
+        if current is None:
+            self._latency[name] = sample
+        else:
+            self._latency[name] = current + self.latency_smoothing * (sample - current)
+        self._last_used[name] = time.monotonic()
+
+    async def warm_up(self, names=(None,), pings=3):
+        """
+        Open connections and measure the round trip time of instances
+
+        :param names: names of the instances, (None,) for a single LedFx
+        :param pings: number of requests per instance
+        """
+
+        async def warm(name):
+            api = self.instance(name).api
+            for _ in range(pings):
+                try:
+                    self._record_latency(name, await api.ping())
+                except Exception as e:
+                    _LOGGER.warning("Warm up of instance %s failed: %r", name, e)
+                    return
+
+        await asyncio.gather(*(warm(name) for name in names))
+
+    def _prepare(self, cue):
+        instance = self.instance(cue.instance)
+        data = cue.data
+        if cue.action == PRESET and 'category' not in data:
+            data = instance.helper.preset_config(data['effect_id'], data['preset_id'])
+        return instance.api.prepare(data)
+
+    def _call(self, cue, body):
+        api = self.instance(cue.instance).api
+        if cue.action == SCENE:
+            return api.scenes_set(body)
+        if cue.action == PRESET:
+            return api.virtual_presets_set(cue.virtual_id, body)
+        if cue.action == EFFECT:
+            return api.virtual_effect_set(cue.virtual_id, body)
+        if cue.action == UPDATE:
+            return api.virtual_effect_update(cue.virtual_id, body)
+        raise ValueError(f"Unknown cue action {cue.action}")
+
+    async def _sleep_until(self, loop, deadline):
+        delay = deadline - loop.time() - self.spin
+        if delay > 0:
+            await asyncio.sleep(delay)
+        while loop.time() < deadline:
+            await asyncio.sleep(0)
+
+    def _needs_rewarm(self, name):
+        last_used = self._last_used.get(name)
+        return last_used is None or time.monotonic() - last_used >= self.idle_rewarm
+
+    async def _rewarm(self, name):
+        self._last_used[name] = time.monotonic()
+        try:
+            self._record_latency(name, await self.instance(name).api.ping())
+        except Exception as e:
+            _LOGGER.warning("Warm up of instance %s failed: %r", name, e)
+
+    async def _fire(self, result, body, start, loop, previous=None):
+        if previous is not None and not previous.done():
+            # the previous cue of the same target is answered first, e.g. an update right after an effect change
+            await asyncio.wait((previous,))
+        result.fired = loop.time() - start
+        try:
+            result.response = check_response(await self._call(result.cue, body))
+        except Exception as e:
+            result.error = e
+            _LOGGER.warning("Cue %s failed: %r", result.cue.label or result.cue.action, e)
+            return
+        result.completed = loop.time() - start
+        self._record_latency(result.cue.instance, result.latency)
+
+    async def run(self, cues, warm_up=True):
+        """
+        Play a timeline, returns after all cues have been answered
+
+        :param cues: iterable of Cue
+        :param warm_up: open connections and measure latency of all instances before starting
+        :return: SequenceReport
+        """
+        cues = sorted(cues, key=lambda cue: cue.at)
+        bodies = [self._prepare(cue) for cue in cues]
+        if warm_up:
+            await self.warm_up(list(dict.fromkeys(cue.instance for cue in cues)))
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        results = []
+        tasks = []
+        last_fired = {}
+        try:
+            for cue, body in zip(cues, bodies):
+                if self.idle_rewarm is not None:
+                    await self._sleep_until(loop, start + cue.at - self.lead(cue.instance) - self.prepare_ahead)
+                    if self._needs_rewarm(cue.instance):
+                        tasks.append(loop.create_task(self._rewarm(cue.instance)))
+                result = CueResult(cue, self.lead(cue.instance))
+                results.append(result)
+                await self._sleep_until(loop, start + cue.at - result.lead)
+                target = (cue.instance, cue.virtual_id)
+                task = loop.create_task(self._fire(result, body, start, loop, last_fired.get(target)))
+                last_fired[target] = task
+                tasks.append(task)
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+        return SequenceReport(results, loop.time() - start)
@@ -0,0 +1,83 @@
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class JsonSerializer:
+    """
+    Serializer based on the json module of the standard library
+    """
+    name = 'json'
+    content_type = 'application/json'
+
+    def dumps(self, obj):
+        """
+        :param obj: json serializable object
+        :return: bytes
+        """
+        return json.dumps(obj, separators=(',', ':')).encode()
+
+    def loads(self, data):
+        """
+        :param data: bytes
+        :return: decoded object
+        """
+        return json.loads(data)
+
+
+class OrjsonSerializer:
+    """
+    Serializer based on orjson, decodes directly from bytes
+    """
+    name = 'orjson'
+    content_type = 'application/json'
+
+    def __init__(self):
+        if orjson is None:
+            raise ImportError('orjson is not installed')
+
+    def dumps(self, obj):
+        """
+        :param obj: json serializable object
+        :return: bytes
+        """
+        return orjson.dumps(obj)
+
+    def loads(self, data):
+        """
+        :param data: bytes
+        :return: decoded object
+        """
+        return orjson.loads(data)
+
+
+class PreparedBody:
+    """
+    Request body serialized ahead of time, e.g. for cues that have to be sent without delay
+    """
+    __slots__ = ('data', 'body')
+
+    def __init__(self, data, body):
+        """
+        :param data: original object, passed on to mutation listeners
+        :param body: serialized bytes
+        """
+        self.data = data
+        self.body = body
+
+    def __repr__(self):
+        return f"PreparedBody({len(self.body)} bytes)"
+
+
+def default_serializer():
+    """
+    Get the fastest available serializer
+
+    :return: OrjsonSerializer if orjson is installed, JsonSerializer otherwise
+    """
+    if orjson is not None:
+        return OrjsonSerializer()
+    return JsonSerializer()
@@ -0,0 +1,290 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+
+from .batch import BatchResult, check_response, run_batch
+
+DEVICE = 'device'
+VIRTUAL = 'virtual'
+EFFECT = 'effect'
+ACTIVE = 'active'
+SCENE = 'scene'
+PAUSED = 'paused'
+
+ADD = 'add'
+MODIFY = 'modify'
+REMOVE = 'remove'
+
+
+class Snapshot:
+    """
+    Configuration of a LedFx instance: devices, virtuals with their active effect, scenes and the global pause.
+
+    Only the parts needed to restore the state are kept, to_dict/from_dict give a json serializable form.
+    """
+
+    def __init__(self, devices=None, virtuals=None, scenes=None, paused=False, taken_at=None):
+        """
+        :param devices: dict of device id to {'type': ..., 'config': {...}}
+        :param virtuals: dict of virtual id to {'config': {...}, 'active': bool, 'effect': {'type': ..., 'config': {...}}}
+        :param scenes: dict of scene id to scene config
+        :param paused: global pause state
+        :param taken_at: unix time of the capture
+        """
+        self.devices = devices or {}
+        self.virtuals = virtuals or {}
+        self.scenes = scenes or {}
+        self.paused = paused
+        self.taken_at = taken_at
+
+    @classmethod
+    async def capture(cls, api, max_concurrency=10):
+        """
+        Fetch the state of an instance concurrently
+
+        :param api: RawAPI of the LedFx instance
+        :param max_concurrency: max number of per virtual effect requests in flight,
+            only needed if the virtual list does not contain the active effects
+        :return: Snapshot
+        """
+        devices, virtuals, scenes = await asyncio.gather(api.devices_all_config(), api.virtuals_all(),
+                                                         api.scenes_get_all())
+        devices, virtuals, scenes = check_response(devices), check_response(virtuals), check_response(scenes)
+        snapshot = cls(
+            devices={device_id: {'type': device.get('type'), 'config': device.get('config') or {}}
+                     for device_id, device in devices.get('devices', {}).items()},
+            virtuals={virtual_id: {'config': virtual.get('config') or {}, 'active': virtual.get('active', True),
+                                   'effect': _effect(virtual.get('effect'))}
+                      for virtual_id, virtual in virtuals.get('virtuals', {}).items()},
+            scenes=dict(scenes.get('scenes', {})),
+            paused=virtuals.get('paused', False),
+            taken_at=time.time())
+        missing = [virtual_id for virtual_id, virtual in virtuals.get('virtuals', {}).items() if 'effect' not in virtual]
+        if missing:
+            semaphore = asyncio.Semaphore(max_concurrency)
+
+            async def fetch_effect(virtual_id):
+                async with semaphore:
+                    response = check_response(await api.virtual_effect_active(virtual_id))
+                snapshot.virtuals[virtual_id]['effect'] = _effect(response.get('effect'))
+
+            await asyncio.gather(*(fetch_effect(virtual_id) for virtual_id in missing))
+        return snapshot
+
+    def to_dict(self):
+        """
+        :return: json serializable dict
+        """
+        return {'devices': self.devices, 'virtuals': self.virtuals, 'scenes': self.scenes, 'paused': self.paused,
+                'taken_at': self.taken_at}
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        :param data: dict created by to_dict
+        :return: Snapshot
+        """
+        return cls(data.get('devices'), data.get('virtuals'), data.get('scenes'), data.get('paused', False),
+                   data.get('taken_at'))
+
+    def diff(self, desired):
+        """
+        Changes turning this state into the desired one
+
+        :param desired: Snapshot
+        :return: list of Change
+        """
+        return diff(self, desired)
+
+    def __repr__(self):
+        return (f"Snapshot(devices={len(self.devices)}, virtuals={len(self.virtuals)}, scenes={len(self.scenes)}, "
+                f"paused={self.paused})")
+
+
+def _effect(data):
+    if not data or not data.get('type'):
+        return {}
+    return {'type': data['type'], 'config': data.get('config') or {}}
+
+
+@dataclass(slots=True, eq=False)
+class Change:
+    """
+    One difference between two snapshots and the data of the call resolving it
+    """
+    kind: str
+    op: str
+    id: str = None
+    data: dict = field(default=None)
+    old: object = field(default=None, repr=False)
+    new: object = field(default=None, repr=False)
+
+
+def _changed(old, new):
+    """
+    Values of new differing from old, None if keys were removed so a partial update is not enough
+    """
+    if old.keys() - new.keys():
+        return None
+    return {key: value for key, value in new.items() if old.get(key) != value}
+
+
+def _diff_items(kind, current, desired, modify):
+    changes = []
+    for item_id, item in desired.items():
+        if item_id not in current:
+            changes.append(Change(kind, ADD, item_id, item, None, item))
+        elif current[item_id] != item:
+            changes.extend(modify(item_id, current[item_id], item))
+    for item_id in current.keys() - desired.keys():
+        changes.append(Change(kind, REMOVE, item_id, None, current[item_id], None))
+    return changes
+
+
+def _modify_device(device_id, old, new):
+    if old['type'] != new['type']:
+        return [Change(DEVICE, REMOVE, device_id, None, old, None), Change(DEVICE, ADD, device_id, new, None, new)]
+    config = _changed(old['config'], new['config'])
+    return [Change(DEVICE, MODIFY, device_id, {'config': new['config'] if config is None else config}, old, new)]
+
+
+def _modify_virtual(virtual_id, old, new):
+    changes = []
+    if old['config'] != new['config']:
+        changes.append(Change(VIRTUAL, MODIFY, virtual_id, {'id': virtual_id, 'config': new['config']},
+                              old['config'], new['config']))
+    old_effect, new_effect = old['effect'], new['effect']
+    if old_effect != new_effect:
+        if not new_effect:
+            changes.append(Change(EFFECT, REMOVE, virtual_id, None, old_effect, new_effect))
+        elif old_effect.get('type') != new_effect['type']:
+            changes.append(Change(EFFECT, ADD, virtual_id, new_effect, old_effect, new_effect))
+        else:
+            config = _changed(old_effect['config'], new_effect['config'])
+            if config is None:
+                changes.append(Change(EFFECT, ADD, virtual_id, new_effect, old_effect, new_effect))
+            else:
+                changes.append(Change(EFFECT, MODIFY, virtual_id, {'config': config}, old_effect, new_effect))
+    if old['active'] != new['active']:
+        changes.append(Change(ACTIVE, MODIFY, virtual_id, {'active': new['active']}, old['active'], new['active']))
+    return changes
+
+
+def _modify_scene(scene_id, old, new):
+    return [Change(SCENE, MODIFY, scene_id, {'id': scene_id, **new}, old, new)]
+
+
+def diff(current, desired):
+    """
+    Changes turning the current state into the desired one, partial updates are used where possible
+
+    :param current: Snapshot
+    :param desired: Snapshot
+    :return: list of Change
+    """
+    changes = _diff_items(DEVICE, current.devices, desired.devices, _modify_device)
+    for change in _diff_items(VIRTUAL, current.virtuals, desired.virtuals, _modify_virtual):
+        if change.kind == VIRTUAL and change.op == ADD:
+            # a new virtual is created first, its effect and state follow as separate calls
+            virtual = change.new
+            changes.append(Change(VIRTUAL, ADD, change.id, {'id': change.id, 'config': virtual['config']},
+                                  None, virtual))
+            changes.extend(_modify_virtual(change.id, {'config': virtual['config'], 'active': True, 'effect': {}},
+                                           virtual))
+        else:
+            changes.append(change)
+    for change in _diff_items(SCENE, current.scenes, desired.scenes, _modify_scene):
+        if change.op == ADD:
+            change.data = {'id': change.id, **change.new}
+        changes.append(change)
+    if current.paused != desired.paused:
+        changes.append(Change(PAUSED, MODIFY, None, None, current.paused, desired.paused))
+    return changes
+
+
+def _call(api, change):
+    kind, op, item_id = change.kind, change.op, change.id
+    if kind == DEVICE:
+        if op == ADD:
+            return api.devices_add({'id': item_id, **change.data})
+        if op == MODIFY:
+            return api.devices_modify_by_id(item_id, change.data)
+        return api.devices_delete_by_id(item_id)
+    if kind == VIRTUAL:
+        if op == REMOVE:
+            return api.virtual_delete(item_id)
+        return api.virtuals_add(change.data)
+    if kind == EFFECT:
+        if op == ADD:
+            return api.virtual_effect_set(item_id, change.data)
+        if op == MODIFY:
+            return api.virtual_effect_update(item_id, change.data)
+        return api.virtual_effect_delete(item_id)
+    if kind == ACTIVE:
+        return api.virtual_pause_unpause(item_id, change.data['active'])
+    if kind == SCENE:
+        if op == REMOVE:
+            return api.scenes_delete_scene({'id': item_id})
+        return api.scenes_save_current_config_as_scene(change.data)
+    if kind == PAUSED:
+        return api.virtuals_pause_unpause_all()
+    raise ValueError(f"Unknown change {kind} {op}")
+
+
+def _phase(change, replaced):
+    # calls within a phase are independent, phases run one after another
+    if change.kind == DEVICE:
+        if change.op == REMOVE:
+            # a device changing its type is deleted before it is added again with the same id
+            return -1 if change.id in replaced else 6
+        return 0
+    if change.kind == VIRTUAL:
+        return 1 if change.op != REMOVE else 5
+    if change.kind == EFFECT:
+        return 2
+    if change.kind == ACTIVE:
+        # setting an effect activates the virtual, pausing it has to follow
+        return 3
+    if change.kind == SCENE:
+        return 4
+    return 7
+
+
+async def apply(api, changes, max_concurrency=10):
+    """
+    Issue the calls resolving a list of changes, independent calls are sent concurrently.
+    Devices and virtuals are created before effects are set and removed after them, virtuals are paused
+    or resumed after their effect is set and devices replaced by one of another type are removed first.
+    Later phases still run when a call fails.
+
+    :param api: RawAPI of the LedFx instance
+    :param changes: list of Change, see diff
+    :param max_concurrency: max number of requests in flight at once, None for no limit
+    :return: BatchResult keyed by Change
+    """
+    replaced = {change.id for change in changes if change.kind == DEVICE and change.op == ADD}
+    phases = {}
+    for change in changes:
+        phases.setdefault(_phase(change, replaced), []).append(change)
+    start = time.perf_counter()
+    results = []
+    for phase in sorted(phases):
+        offset = time.perf_counter() - start
+        batch = await run_batch(phases[phase], lambda change: _call(api, change), max_concurrency)
+        for result in batch:
+            result.completed_at += offset
+            results.append(result)
+    return BatchResult(results, time.perf_counter() - start)
+
+
+async def reconcile(api, desired, max_concurrency=10):
+    """
+    Capture the current state of an instance and apply the changes needed to reach the desired one
+
+    :param api: RawAPI of the LedFx instance
+    :param desired: Snapshot
+    :param max_concurrency: max number of requests in flight at once
+    :return: BatchResult keyed by Change, empty if nothing changed
+    """
+    current = await Snapshot.capture(api, max_concurrency)
+    return await apply(api, diff(current, desired), max_concurrency)
@@ -0,0 +1,248 @@
+import asyncio
+import inspect
+import logging
+
+from . import events
+from .models import Device, Virtual
+
+_LOGGER = logging.getLogger(__name__)
+
+VIRTUAL = 'virtual'
+DEVICE = 'device'
+
+
+class StateMirror:
+    """
+    Local copy of the virtuals and devices of a LedFx instance.
+
+    The mirror is updated from the responses of mutating calls made through the same RawAPI
+    and refreshed in the background, only entries that changed are parsed again.
+    Subscribers are called with (kind, id, old, new) where kind is 'virtual' or 'device'
+    and old/new are models or None.
+    """
+
+    def __init__(self, api):
+        """
+        :param api: RawAPI of the LedFx instance
+        """
+        self._api = api
+        self._virtual_data = {}
+        self._device_data = {}
+        self.virtuals = {}
+        self.devices = {}
+        self.paused = None
+        self.loaded = False
+        self._subscribers = []
+        self._refresh_task = None
+        self._pending_refresh = None
+        self._refresh_again = False
+        self._attached = False
+        self._unfollow = None
+
+    # reading
+
+    def get_virtual(self, virtual_id):
+        """
+        :param virtual_id: Id of the virtual
+        :return: Virtual or None
+        """
+        return self.virtuals.get(virtual_id)
+
+    def get_device(self, device_id):
+        """
+        :param device_id: Id of the device
+        :return: Device or None
+        """
+        return self.devices.get(device_id)
+
+    def active_effect(self, virtual_id):
+        """
+        :param virtual_id: Id of the virtual
+        :return: Effect or None
+        """
+        virtual = self.virtuals.get(virtual_id)
+        return virtual.effect if virtual is not None else None
+
+    def subscribe(self, callback):
+        """
+        Register a change callback, coroutine functions are scheduled as tasks
+
+        :param callback: callable(kind, id, old, new)
+        :return: function removing the subscription
+        """
+        self._subscribers.append(callback)
+        return lambda: self._subscribers.remove(callback)
+
+    # loading
+
+    async def load(self):
+        """
+        Fetch the full state and start tracking mutating calls
+        """
+        if not self._attached:
+            self._api.add_mutation_listener(self._on_mutation)
+            self._attached = True
+        await self.refresh()
+        self.loaded = True
+
+    async def refresh(self):
+        """
+        Fetch the state from the server and apply the differences
+        """
+        virtuals, devices = await asyncio.gather(self._api.virtuals_all(), self._api.devices_all_config())
+        if virtuals is not None and 'virtuals' in virtuals:
+            self.paused = virtuals.get('paused', self.paused)
+            self._sync(VIRTUAL, self._virtual_data, self.virtuals, virtuals['virtuals'])
+        if devices is not None and 'devices' in devices:
+            self._sync(DEVICE, self._device_data, self.devices, devices['devices'])
+
+    def start(self, interval=5.0):
+        """
+        Refresh the state periodically in the background
+
+        :param interval: seconds between two refreshes
+        """
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.get_running_loop().create_task(self._refresh_loop(interval))
+
+    def follow(self, event_client):
+        """
+        Refresh on server events instead of polling, e.g. for changes made by other clients.
+        The state is refreshed once per burst of events and after each reconnect.
+
+        :param event_client: EventClient of the same instance, started if needed
+        """
+        if self._unfollow is None:
+            self._unfollow = event_client.subscribe(self._on_event, events.DEFAULT_EVENTS + (events.CONNECTED,))
+            event_client.start()
+
+    def _on_event(self, event):
+        if self.loaded:
+            self._schedule_refresh()
+
+    async def stop(self):
+        """
+        Stop background refreshing and stop tracking mutating calls and events
+        """
+        if self._unfollow is not None:
+            self._unfollow()
+            self._unfollow = None
+        for task in (self._refresh_task, self._pending_refresh):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._refresh_task = None
+        self._pending_refresh = None
+        if self._attached:
+            self._api.remove_mutation_listener(self._on_mutation)
+            self._attached = False
+
+    async def _refresh_loop(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            await self._safe_refresh()
+
+    async def _safe_refresh(self):
+        try:
+            await self.refresh()
+        except Exception:
+            _LOGGER.exception("State refresh failed")
+
+    def _schedule_refresh(self):
+        if self._pending_refresh is None or self._pending_refresh.done():
+            self._pending_refresh = asyncio.get_running_loop().create_task(self._refresh_pending())
+        else:
+            # the running refresh may have fetched the state before this change
+            self._refresh_again = True
+
+    async def _refresh_pending(self):
+        while True:
+            self._refresh_again = False
+            await self._safe_refresh()
+            if not self._refresh_again:
+                return
+
+    # diffing
+
+    def _sync(self, kind, raw_store, model_store, items):
+        for item_id in [item_id for item_id in raw_store if item_id not in items]:
+            self._set(kind, raw_store, model_store, item_id, None)
+        for item_id, data in items.items():
+            self._set(kind, raw_store, model_store, item_id, data)
+
+    def _set(self, kind, raw_store, model_store, item_id, data):
+        if raw_store.get(item_id) == data:
+            return
+        old = model_store.get(item_id)
+        if data is None:
+            del raw_store[item_id]
+            del model_store[item_id]
+            new = None
+        else:
+            raw_store[item_id] = data
+            new = (Virtual if kind == VIRTUAL else Device).from_dict({'id': item_id, **data})
+            model_store[item_id] = new
+        self._notify(kind, item_id, old, new)
+
+    def _notify(self, kind, item_id, old, new):
+        for callback in list(self._subscribers):
+            try:
+                result = callback(kind, item_id, old, new)
+                if inspect.isawaitable(result):
+                    asyncio.ensure_future(result)
+            except Exception:
+                _LOGGER.exception("State subscriber failed")
+
+    def _update_virtual(self, virtual_id, **changes):
+        data = self._virtual_data.get(virtual_id)
+        if data is None:
+            self._schedule_refresh()
+            return
+        self._set(VIRTUAL, self._virtual_data, self.virtuals, virtual_id, {**data, **changes})
+
+    # local updates from our own mutating calls
+
+    def _on_mutation(self, method, path, data, response):
+        if not self.loaded or not isinstance(response, dict) or response.get('status') == 'failed':
+            return
+        parts = path.strip('/').split('/')
+        if parts[0] == 'virtuals' and len(parts) == 3 and parts[2] == 'effects':
+            self._on_virtual_effect(method, parts[1], data, response)
+        elif parts[0] == 'virtuals' and len(parts) == 3 and parts[2] == 'presets' and method == 'PUT':
+            self._on_virtual_preset(parts[1], response)
+        elif parts[0] == 'virtuals' and len(parts) == 2 and method == 'PUT' and isinstance(data, dict) \
+                and set(data) == {'active'}:
+            self._update_virtual(parts[1], active=data['active'])
+        elif parts[0] == 'devices' and len(parts) == 2 and method == 'DELETE':
+            if parts[1] in self._device_data:
+                self._set(DEVICE, self._device_data, self.devices, parts[1], None)
+        elif parts[0] in ('virtuals', 'devices', 'scenes'):
+            self._schedule_refresh()
+
+    def _on_virtual_preset(self, virtual_id, response):
+        # the request only names the preset, its config is known from the response
+        effect = response.get('effect')
+        if not isinstance(effect, dict) or 'type' not in effect:
+            self._schedule_refresh()
+            return
+        self._update_virtual(virtual_id, effect=effect)
+
+    def _on_virtual_effect(self, method, virtual_id, data, response):
+        effect = response.get('effect')
+        if method == 'DELETE':
+            effect = {}
+        elif not isinstance(effect, dict) or 'type' not in effect:
+            current = (self._virtual_data.get(virtual_id) or {}).get('effect') or {}
+            if not isinstance(data, dict) or method == 'PUT' and 'type' not in data and not current:
+                self._schedule_refresh()
+                return
+            config = data.get('config') or {}
+            if method == 'PUT':
+                config = {**(current.get('config') or {}), **config}
+            effect_type = data.get('type', current.get('type'))
+            effect = {'type': effect_type, 'name': current.get('name') if effect_type == current.get('type') else None,
+                      'config': config}
+        self._update_virtual(virtual_id, effect=effect)
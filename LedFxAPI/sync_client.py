@@ -0,0 +1,234 @@
+import asyncio
+import concurrent.futures
+import inspect
+import threading
+
+from .ledfx import LedFx
+
+
+class LoopThread:
+    """
+    Event loop running forever in a daemon thread, coroutines can be submitted from any thread
+    """
+
+    def __init__(self, name='LedFxAPI'):
+        """
+        :param name: name of the thread
+        """
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    @property
+    def running(self):
+        return self._thread.is_alive() and not self.loop.is_closed()
+
+    def submit(self, coro):
+        """
+        Schedule a coroutine on the loop
+
+        :param coro: coroutine object
+        :return: concurrent.futures.Future
+        """
+        if not self.running:
+            coro.close()
+            raise RuntimeError('Event loop thread has been stopped')
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro, timeout=None):
+        """
+        Run a coroutine on the loop and wait for its result
+
+        :param coro: coroutine object
+        :param timeout: seconds to wait, None to wait forever; the coroutine is cancelled when it expires
+        :return: result of the coroutine
+        :raises TimeoutError: if the coroutine did not finish in time
+        """
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError('Blocking call from the event loop thread would deadlock, await the coroutine instead')
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            # the caller gave up, requests not sent yet must not change the instance afterwards
+            future.cancel()
+            raise
+
+    def stop(self):
+        """
+        Stop the loop, wait for the thread and close the loop
+        """
+        if not self.running:
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+
+class SyncMethod:
+    """
+    Blocking version of a method executed on the loop thread, submit() returns a future instead
+    """
+
+    def __init__(self, loop_thread, function, timeout):
+        self._loop_thread = loop_thread
+        self._function = function
+        self._timeout = timeout
+        self.__name__ = function.__name__
+        self.__doc__ = function.__doc__
+
+    async def _call(self, args, kwargs):
+        result = self._function(*args, **kwargs)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
+    def __call__(self, *args, **kwargs):
+        return self._loop_thread.run(self._call(args, kwargs), self._timeout)
+
+    def submit(self, *args, **kwargs):
+        """
+        Call without blocking
+
+        :return: concurrent.futures.Future
+        """
+        return self._loop_thread.submit(self._call(args, kwargs))
+
+    def __repr__(self):
+        return f"SyncMethod({self.__name__})"
+
+
+class SyncProxy:
+    """
+    Wraps an object living on the loop thread, its methods become SyncMethods
+    """
+
+    def __init__(self, loop_thread, target, timeout=None):
+        self._loop_thread = loop_thread
+        self._target = target
+        self._timeout = timeout
+        self._methods = {}
+
+    def __getattr__(self, name):
+        method = self._methods.get(name)
+        if method is not None:
+            return method
+        value = getattr(self._target, name)
+        if not callable(value):
+            return value
+        method = SyncMethod(self._loop_thread, value, self._timeout)
+        self._methods[name] = method
+        return method
+
+    def __dir__(self):
+        return [name for name in dir(self._target) if not name.startswith('_')]
+
+    def __repr__(self):
+        return f"SyncProxy({self._target!r})"
+
+
+class SyncLedFx:
+    """
+    Blocking client for threaded code, e.g. web workers or MIDI bridges.
+
+    One background thread runs the event loop and the http session shared by all calls,
+    every method of RawAPI and APIHelpers is available as a blocking call on .api and .helper
+    and as a future via .submit(), e.g. client.api.ledfx_info() or client.api.ledfx_info.submit().
+    All methods can be called from many threads concurrently.
+    """
+
+    def __init__(self, host, port, ssl=False, call_timeout=None, **options):
+        """
+        :param host: host of the LedFx instance
+        :param port: port of the LedFx instance
+        :param ssl: use https
+        :param call_timeout: max seconds a blocking call waits, None to rely on the request timeouts
+        :param options: further keyword arguments of LedFx, e.g. cache or retry_policy
+        """
+        self._loop_thread = LoopThread(f"LedFxAPI {host}:{port}")
+        self._call_timeout = call_timeout
+        try:
+            self.ledfx = self._loop_thread.run(self._create(host, port, ssl, options))
+        except BaseException:
+            self._loop_thread.stop()
+            raise
+        self.api = SyncProxy(self._loop_thread, self.ledfx.api, call_timeout)
+        self.helper = SyncProxy(self._loop_thread, self.ledfx.helper, call_timeout)
+        self.state = SyncProxy(self._loop_thread, self.ledfx.state, call_timeout)
+        self._streamers = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    async def _create(host, port, ssl, options):
+        return LedFx(host, port, ssl, **options)
+
+    @property
+    def loop(self):
+        """
+        Event loop of the background thread, e.g. for asyncio.run_coroutine_threadsafe
+
+        :return: asyncio.AbstractEventLoop
+        """
+        return self._loop_thread.loop
+
+    def run(self, coro, timeout=None):
+        """
+        Run any coroutine on the loop thread, e.g. one using self.ledfx, and wait for the result
+
+        :param coro: coroutine object
+        :param timeout: seconds to wait, None to wait forever
+        :return: result of the coroutine
+        """
+        return self._loop_thread.run(coro, timeout)
+
+    def submit(self, coro):
+        """
+        Schedule any coroutine on the loop thread
+
+        :param coro: coroutine object
+        :return: concurrent.futures.Future
+        """
+        return self._loop_thread.submit(coro)
+
+    def streamer(self, virtual_id, interval=1 / 30, effect_type=None):
+        """
+        Get the rate limited effect streamer of a virtual, see LedFx.streamer
+
+        :return: SyncProxy of EffectStreamer
+        """
+        with self._lock:
+            if virtual_id not in self._streamers:
+                streamer = self.call(self.ledfx.streamer, virtual_id, interval, effect_type)
+                self._streamers[virtual_id] = SyncProxy(self._loop_thread, streamer, self._call_timeout)
+            return self._streamers[virtual_id]
+
+    def call(self, function, *args, **kwargs):
+        """
+        Call a function or coroutine function on the loop thread and wait for the result
+
+        :param function: callable
+        :return: result
+        """
+        return SyncMethod(self._loop_thread, function, self._call_timeout)(*args, **kwargs)
+
+    def close(self):
+        """
+        Close the LedFx instance and stop the loop thread
+        """
+        if not self._loop_thread.running:
+            return
+        try:
+            self._loop_thread.run(self.ledfx.close())
+        finally:
+            self._loop_thread.stop()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
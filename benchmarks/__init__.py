@@ -0,0 +1 @@
+"""Benchmarks for LedFxAPI, run from the repository root with python -m benchmarks.<name>"""
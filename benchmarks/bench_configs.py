@@ -0,0 +1,40 @@
+"""Time to build and validate effect configs for many virtuals"""
+import argparse
+import random
+import timeit
+
+from LedFxAPI import config_builder
+from LedFxAPI.config_builder import EffectSchemas
+
+from benchmarks import payloads
+
+
+def main(count, properties, repeat):
+    schemas = EffectSchemas.from_response(payloads.schema(60, properties))
+    schema = schemas['effect_0']
+    keys = list(schema.properties)
+    rows = [{key: random.random() for key in keys} for _ in range(count)]
+    if config_builder.np is not None:
+        columns = {key: config_builder.np.random.rand(count) for key in keys}
+    else:
+        columns = {key: [row[key] for row in rows] for key in keys}
+    print(f"{count} configs of {properties} properties, NumPy {'on' if config_builder.np is not None else 'off'}")
+    cases = {
+        'compile schemas': lambda: EffectSchemas.from_response(payloads.schema(60, properties)),
+        'build from columns': lambda: schema.build(count, columns),
+        'validate configs': lambda: schema.validate_many(rows),
+        'hsv colors to hex': lambda: config_builder.hex_colors(config_builder.hsv_to_rgb(
+            [i / count for i in range(count)])),
+    }
+    for name, function in cases.items():
+        duration = min(timeit.repeat(function, number=1, repeat=repeat))
+        print(f"  {name:<24} {duration * 1e3:8.2f} ms")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--count', type=int, default=1000)
+    parser.add_argument('--properties', type=int, default=12)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    main(args.count, args.properties, args.repeat)
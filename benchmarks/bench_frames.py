@@ -0,0 +1,53 @@
+"""Frames per second through REST effect updates versus DDP frames over UDP"""
+import argparse
+import asyncio
+import time
+
+from LedFxAPI import LedFx
+from LedFxAPI.frame_streamer import FrameStreamer
+
+from benchmarks.ddp_receiver import DdpReceiver
+from benchmarks.fake_server import FakeLedFx
+
+
+async def _rest(frames):
+    async with FakeLedFx() as server, LedFx(server.host, server.port) as ledfx:
+        start = time.perf_counter()
+        for i in range(frames):
+            await ledfx.api.virtual_effect_update('virtual_0', {'config': {'color': f"#{i % 256:02x}0000"}})
+        return frames / (time.perf_counter() - start)
+
+
+async def main(pixels, frames, fps, duration):
+    frame = bytes(range(256)) * (pixels * 3 // 256) + bytes(pixels * 3 % 256)
+    print(f"REST effect updates:      {await _rest(frames):10.0f} /s")
+    async with DdpReceiver(pixels) as receiver:
+        async with FrameStreamer(receiver.host, receiver.port, pixels) as streamer:
+            start = time.perf_counter()
+            for _ in range(frames):
+                streamer.send(frame)
+            elapsed = time.perf_counter() - start
+            print(f"DDP send, {pixels} pixels: {frames / elapsed:10.0f} frames/s"
+                  f"  ({streamer.packets_sent // frames} packets per frame)")
+        await asyncio.sleep(0.1)
+        received = receiver.frames
+        async with FrameStreamer(receiver.host, receiver.port, pixels, fps=fps) as streamer:
+            start = time.perf_counter()
+            # produce frames twice as fast as the target rate, the pacer drops the surplus
+            while time.perf_counter() - start < duration:
+                streamer.push(frame)
+                await asyncio.sleep(1 / (fps * 2))
+            stats = streamer.stats()
+        await asyncio.sleep(0.1)
+        print(f"DDP push at {fps} fps:     {stats['achieved_fps']:10.1f} frames/s  sent {stats['frames_sent']}"
+              f"  dropped {stats['frames_dropped']}  received {receiver.frames - received}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--pixels', type=int, default=1000)
+    parser.add_argument('--frames', type=int, default=2000)
+    parser.add_argument('--fps', type=int, default=60)
+    parser.add_argument('--duration', type=float, default=2.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.pixels, args.frames, args.fps, args.duration))
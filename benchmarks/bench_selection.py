@@ -0,0 +1,44 @@
+"""Time and peak memory of decoding a whole schema versus selecting parts of it"""
+import argparse
+import json
+import timeit
+import tracemalloc
+
+from LedFxAPI import selection
+from LedFxAPI.serializers import default_serializer
+
+from benchmarks import payloads
+
+
+def _peak(function):
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main(effects, properties, repeat, selectors):
+    raw = json.dumps(payloads.schema(effects, properties)).encode()
+    serializer = default_serializer()
+    print(f"schema: {len(raw) / 1024:.0f} KiB, streaming {'on' if selection.ijson else 'off (ijson not installed)'}")
+    cases = {f"full decode ({serializer.name})": lambda: serializer.loads(raw)}
+    for selector in selectors:
+        paths = selection.compile_paths(selector)
+        cases[f"decode + prune {selector}"] = lambda paths=paths: selection.prune(serializer.loads(raw), paths)
+        if selection.ijson is not None:
+            cases[f"stream {selector}"] = lambda paths=paths: selection.select_bytes(raw, paths)
+    for name, function in cases.items():
+        duration = min(timeit.repeat(function, number=1, repeat=repeat))
+        print(f"  {name:<40} {duration * 1e3:8.2f} ms   peak {_peak(function) / 1024:8.0f} KiB")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--effects', type=int, default=600)
+    parser.add_argument('--properties', type=int, default=30)
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--select', nargs='*', default=['devices', 'effects.*.id', 'effects.effect_1'])
+    args = parser.parse_args()
+    main(args.effects, args.properties, args.repeat, args.select)
@@ -0,0 +1,40 @@
+"""Encode/decode throughput of the available serializers over schema and config sized payloads"""
+import argparse
+import timeit
+
+from LedFxAPI.serializers import JsonSerializer, OrjsonSerializer
+
+from benchmarks import payloads
+
+
+def _serializers():
+    serializers = [JsonSerializer()]
+    try:
+        serializers.append(OrjsonSerializer())
+    except ImportError:
+        print('orjson not installed, skipping')
+    return serializers
+
+
+def main(effects, devices, repeat):
+    documents = {
+        'schema': payloads.schema(effects),
+        'config': payloads.config(devices, devices),
+    }
+    reference = JsonSerializer()
+    for name, document in documents.items():
+        raw = reference.dumps(document)
+        print(f"{name}: {len(raw) / 1024:.0f} KiB")
+        for serializer in _serializers():
+            decode = min(timeit.repeat(lambda: serializer.loads(raw), number=1, repeat=repeat))
+            encode = min(timeit.repeat(lambda: serializer.dumps(document), number=1, repeat=repeat))
+            print(f"  {serializer.name:<8} decode {decode * 1e3:8.3f} ms   encode {encode * 1e3:8.3f} ms")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--effects', type=int, default=120)
+    parser.add_argument('--devices', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+    main(args.effects, args.devices, args.repeat)
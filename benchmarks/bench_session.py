@@ -0,0 +1,53 @@
+"""Compare per-call latency of the pooled RESTClient session against a new ClientSession per call"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import aiohttp
+
+from LedFxAPI.rest_client import RESTClient, PoolConfig
+
+from benchmarks.fake_server import FakeLedFx
+
+
+async def per_call_session(host, port, calls):
+    url = f"http://{host}:{port}/api/info"
+    timings = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        async with aiohttp.ClientSession() as session:
+            async with session.get(url) as resp:
+                await resp.json()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+async def pooled_session(host, port, calls):
+    timings = []
+    async with RESTClient(host, port, '/api/', pool_config=PoolConfig()) as client:
+        for _ in range(calls):
+            start = time.perf_counter()
+            await client.get('info')
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+def _report(name, timings):
+    timings = sorted(timings)
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+    print(f"{name:<20} mean {statistics.mean(timings) * 1e6:9.1f} us   "
+          f"p50 {statistics.median(timings) * 1e6:9.1f} us   p99 {p99 * 1e6:9.1f} us")
+
+
+async def main(calls):
+    async with FakeLedFx() as server:
+        _report('session per call', await per_call_session(server.host, server.port, calls))
+        _report('pooled session', await pooled_session(server.host, server.port, calls))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--calls', type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(main(args.calls))
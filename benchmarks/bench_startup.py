@@ -0,0 +1,81 @@
+"""Import time, construction and first request of a fresh interpreter, plus per-request url building"""
+import argparse
+import asyncio
+import statistics
+import subprocess
+import sys
+import timeit
+import urllib.parse as url_parser
+
+from LedFxAPI.rest_client import RESTClient
+
+from benchmarks.fake_server import FakeLedFx
+
+# run in a fresh interpreter, prints milliseconds per phase
+_PROBE = '''
+import sys, time
+start = time.perf_counter()
+import LedFxAPI
+imported = time.perf_counter()
+from LedFxAPI import LedFx
+loaded = time.perf_counter()
+ledfx = LedFx('127.0.0.1', int(sys.argv[1]))
+constructed = time.perf_counter()
+import asyncio
+
+async def first_call():
+    async with ledfx:
+        await ledfx.api.ledfx_info()
+
+asyncio.run(first_call())
+called = time.perf_counter()
+print((imported - start) * 1e3, (loaded - imported) * 1e3, (constructed - loaded) * 1e3, (called - constructed) * 1e3)
+'''
+
+PHASES = ('import LedFxAPI', 'from LedFxAPI import LedFx', 'LedFx()', 'first request')
+
+
+async def startup(runs):
+    async with FakeLedFx() as server:
+        samples = []
+        for _ in range(runs):
+            process = await asyncio.create_subprocess_exec(sys.executable, '-c', _PROBE, str(server.port),
+                                                           stdout=subprocess.PIPE)
+            output, _ = await process.communicate()
+            samples.append([float(value) for value in output.split()])
+    return {phase: statistics.median(values) for phase, values in zip(PHASES, zip(*samples))}
+
+
+def url_building(repeat):
+    client = RESTClient('127.0.0.1', 8888, '/api/')
+    import yarl
+
+    paths = [f"virtuals/virtual_{i}/effects" for i in range(100)]
+    cases = {
+        'urljoin + parse per call': lambda: [yarl.URL(url_parser.urljoin(client.base_url, path)) for path in paths],
+        'cached per client': lambda: [client._url(path) for path in paths],
+    }
+    return {name: min(timeit.repeat(function, number=100, repeat=repeat)) / (100 * len(paths)) * 1e6
+            for name, function in cases.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=10, help='fresh interpreters to start')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--max-import-ms', type=float, help='exit with an error if importing LedFx takes longer')
+    args = parser.parse_args()
+    phases = asyncio.run(startup(args.runs))
+    print(f"startup, median of {args.runs} interpreters:")
+    for phase, duration in phases.items():
+        print(f"  {phase:<28} {duration:8.1f} ms")
+    print('url per request:')
+    for name, duration in url_building(args.repeat).items():
+        print(f"  {name:<28} {duration:8.2f} us")
+    import_ms = phases['import LedFxAPI'] + phases['from LedFxAPI import LedFx']
+    if args.max_import_ms is not None and import_ms > args.max_import_ms:
+        sys.exit(f"import took {import_ms:.1f} ms, more than {args.max_import_ms} ms")
+
+
+if __name__ == '__main__':
+    main()
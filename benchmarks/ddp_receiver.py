@@ -0,0 +1,62 @@
+"""Local UDP stand-in for a DDP device such as WLED"""
+import asyncio
+import struct
+
+HEADER = struct.Struct('!BBBBIH')
+PUSH = 0x01
+
+
+class DdpReceiver(asyncio.DatagramProtocol):
+    """
+    Reassembles DDP packets into frames, a frame is complete when a packet with the push flag arrives.
+
+    Use as async context manager, the bound port is available as .port once started.
+    """
+
+    def __init__(self, pixel_count=300, host='127.0.0.1', port=0):
+        """
+        :param pixel_count: size of the frame buffer in pixels
+        """
+        self.host = host
+        self.port = port
+        self.frame = bytearray(pixel_count * 3)
+        self.frames = 0
+        self.packets = 0
+        self.invalid = 0
+        self.sequences = []
+        # (flags, sequence, data type, destination, offset, length) of every valid packet
+        self.headers = []
+        self._transport = None
+
+    def datagram_received(self, data, addr):
+        if len(data) < HEADER.size or not data[0] & 0x40:
+            self.invalid += 1
+            return
+        header = HEADER.unpack_from(data)
+        flags, sequence, _, _, offset, length = header
+        self.packets += 1
+        self.headers.append(header)
+        payload = data[HEADER.size:HEADER.size + length]
+        if offset + len(payload) > len(self.frame):
+            self.frame.extend(bytes(offset + len(payload) - len(self.frame)))
+        self.frame[offset:offset + len(payload)] = payload
+        if flags & PUSH:
+            self.frames += 1
+            self.sequences.append(sequence)
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        self._transport, _ = await loop.create_datagram_endpoint(lambda: self, local_addr=(self.host, self.port))
+        self.port = self._transport.get_extra_info('sockname')[1]
+        return self
+
+    async def stop(self):
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.stop()
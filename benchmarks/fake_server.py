@@ -0,0 +1,312 @@
+"""Local aiohttp stand-in for the LedFx REST api used by RawAPI"""
+import asyncio
+import random
+
+from aiohttp import web
+
+from benchmarks import payloads
+
+
+class FakeLedFx:
+    """
+    In-memory LedFx server with configurable latency, sizes and error rate.
+
+    Use as async context manager, the bound port is available as .port once started.
+    """
+
+    def __init__(self, effects=60, presets=(8, 4), virtuals=40, devices=40, properties=12,
+                 latency=0.0, jitter=0.0, error_rate=0.0, seed=0, host='127.0.0.1', port=0):
+        """
+        :param effects: number of effects in the schema
+        :param presets: (default, custom) presets per effect
+        :param virtuals: number of virtuals
+        :param devices: number of devices
+        :param properties: number of config properties per effect schema
+        :param latency: seconds added to every response
+        :param jitter: max random seconds added on top of latency
+        :param error_rate: share of requests answered with HTTP 500
+        :param seed: seed for jitter and errors
+        """
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+        self.schema = payloads.schema(effects, properties)
+        self.presets = {effect_id: payloads.presets(effect_id, *presets) for effect_id in self.schema['effects']}
+        self.virtuals = payloads.virtuals(virtuals)['virtuals']
+        self.devices = payloads.devices(devices)['devices']
+        self.scenes = {f"scene_{i}": {'name': f"Scene {i}", 'virtuals': {}} for i in range(10)}
+        self.paused = False
+        self.version = '2.0.0'
+        self._websockets = {}
+        self._runner = None
+
+    # lifecycle
+
+    def app(self):
+        app = web.Application(middlewares=[self._middleware])
+        r = app.router
+        r.add_get('/api/info', self.info)
+        r.add_get('/api/websocket', self.websocket)
+        r.add_get('/api/config', self.config)
+        r.add_get('/api/schema', self.get_schema)
+        r.add_get('/api/schema/{section}', self.get_schema_section)
+        r.add_get('/api/devices', self.devices_all)
+        r.add_post('/api/devices', self.device_post)
+        r.add_get('/api/devices/{id}', self.device_get)
+        r.add_put('/api/devices/{id}', self.device_put)
+        r.add_delete('/api/devices/{id}', self.device_delete)
+        r.add_get('/api/effects', self.effects_all)
+        r.add_get('/api/effects/{id}', self.effect_get)
+        r.add_route('*', '/api/devices/{id}/effects', self.success)
+        r.add_route('*', '/api/devices/{id}/presets', self.success)
+        r.add_get('/api/effects/{id}/presets', self.effect_presets)
+        r.add_put('/api/effects/{id}/presets', self.success)
+        r.add_delete('/api/effects/{id}/presets', self.success)
+        r.add_get('/api/scenes', self.scenes_all)
+        r.add_route('*', '/api/scenes', self.success)
+        r.add_get('/api/virtuals', self.virtuals_all)
+        r.add_put('/api/virtuals', self.virtuals_toggle)
+        r.add_post('/api/virtuals', self.success)
+        r.add_get('/api/virtuals/{id}', self.virtual_get)
+        r.add_put('/api/virtuals/{id}', self.virtual_put)
+        r.add_delete('/api/virtuals/{id}', self.virtual_delete)
+        r.add_get('/api/virtuals/{id}/effects', self.virtual_effect_get)
+        r.add_route('*', '/api/virtuals/{id}/effects', self.virtual_effect_set)
+        r.add_get('/api/virtuals/{id}/presets', self.virtual_presets_get)
+        r.add_put('/api/virtuals/{id}/presets', self.virtual_presets_set)
+        return app
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+        return self
+
+    async def stop(self):
+        await self.drop_websockets()
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.stop()
+
+    @web.middleware
+    async def _middleware(self, request, handler):
+        self.requests += 1
+        delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay:
+            await asyncio.sleep(delay)
+        if self.error_rate and self._random.random() < self.error_rate:
+            self.errors += 1
+            return web.json_response({'status': 'failed', 'reason': 'injected error'}, status=500)
+        return await handler(request)
+
+    # events
+
+    async def emit(self, event_type, **data):
+        """
+        Send an event to all websockets subscribed to its type
+        """
+        message = {'event_type': event_type, **data}
+        for ws, event_types in list(self._websockets.items()):
+            if event_type in event_types and not ws.closed:
+                await ws.send_json({'id': event_types[event_type], 'type': 'event', **message})
+
+    async def drop_websockets(self):
+        """
+        Close all websocket connections, e.g. to test reconnects
+        """
+        for ws in list(self._websockets):
+            await ws.close()
+
+    async def websocket(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        subscriptions = self._websockets[ws] = {}
+        try:
+            async for message in ws:
+                data = message.json()
+                if data.get('type') == 'subscribe_event':
+                    subscriptions[data['event_type']] = data['id']
+                elif data.get('type') == 'unsubscribe_event':
+                    subscriptions.pop(data.get('event_type'), None)
+                await ws.send_json({'id': data.get('id'), 'type': 'result', 'success': True})
+        finally:
+            del self._websockets[ws]
+        return ws
+
+    # handlers
+
+    @staticmethod
+    def _not_found(item):
+        return web.json_response({'status': 'failed', 'reason': f"{item} not found"}, status=404)
+
+    async def success(self, request):
+        return web.json_response({'status': 'success'})
+
+    async def info(self, request):
+        return web.json_response({'url': f"http://{self.host}:{self.port}", 'name': 'LedFx Controller',
+                                  'version': self.version, 'developer_mode': False})
+
+    async def config(self, request):
+        return web.json_response({'host': self.host, 'port': self.port, 'devices': list(self.devices.values()),
+                                  'virtuals': list(self.virtuals.values()), 'scenes': self.scenes})
+
+    async def get_schema(self, request):
+        return web.json_response(self.schema)
+
+    async def get_schema_section(self, request):
+        section = {'device': 'devices', 'effect': 'effects', 'integration': 'integrations'}
+        key = section.get(request.match_info['section'])
+        if key is None:
+            return self._not_found('Schema')
+        return web.json_response(self.schema[key])
+
+    async def devices_all(self, request):
+        return web.json_response({'status': 'success', 'devices': self.devices})
+
+    async def device_get(self, request):
+        device = self.devices.get(request.match_info['id'])
+        if device is None:
+            return self._not_found('Device')
+        return web.json_response({'status': 'success', 'device': device})
+
+    async def device_post(self, request):
+        data = await request.json()
+        device_id = data.get('id') or f"device_{len(self.devices)}"
+        if device_id in self.devices:
+            return web.json_response({'status': 'failed', 'reason': f"Device {device_id} exists"}, status=400)
+        self.devices[device_id] = {'id': device_id, 'type': data.get('type'), 'config': data.get('config') or {},
+                                   'online': True, 'virtuals': []}
+        return web.json_response({'status': 'success', 'device': self.devices[device_id]})
+
+    async def device_put(self, request):
+        device = self.devices.get(request.match_info['id'])
+        if device is None:
+            return self._not_found('Device')
+        device['config'].update((await request.json()).get('config', {}))
+        await self.emit('device_update', device_id=request.match_info['id'])
+        return web.json_response({'status': 'success', 'device': device})
+
+    async def device_delete(self, request):
+        if self.devices.pop(request.match_info['id'], None) is None:
+            return self._not_found('Device')
+        return web.json_response({'status': 'success'})
+
+    async def effects_all(self, request):
+        effects = {virtual_id: virtual['effect'] for virtual_id, virtual in self.virtuals.items()}
+        return web.json_response({'status': 'success', 'effects': effects})
+
+    async def effect_get(self, request):
+        effect = self.schema['effects'].get(request.match_info['id'])
+        if effect is None:
+            return self._not_found('Effect')
+        return web.json_response(effect)
+
+    async def effect_presets(self, request):
+        presets = self.presets.get(request.match_info['id'])
+        if presets is None:
+            return self._not_found('Effect')
+        return web.json_response(presets)
+
+    async def scenes_all(self, request):
+        return web.json_response({'status': 'success', 'scenes': self.scenes})
+
+    async def virtuals_all(self, request):
+        return web.json_response({'status': 'success', 'virtuals': self.virtuals, 'paused': self.paused})
+
+    async def virtuals_toggle(self, request):
+        self.paused = not self.paused
+        await self.emit('global_pause', paused=self.paused)
+        return web.json_response({'status': 'success', 'paused': self.paused})
+
+    async def virtual_get(self, request):
+        virtual = self.virtuals.get(request.match_info['id'])
+        if virtual is None:
+            return self._not_found('Virtual')
+        return web.json_response({'status': 'success', request.match_info['id']: virtual})
+
+    async def virtual_put(self, request):
+        virtual = self.virtuals.get(request.match_info['id'])
+        if virtual is None:
+            return self._not_found('Virtual')
+        virtual['active'] = (await request.json()).get('active', virtual['active'])
+        await self.emit('virtual_pause', virtual_id=request.match_info['id'], paused=not virtual['active'])
+        return web.json_response({'status': 'success', 'active': virtual['active']})
+
+    async def virtual_delete(self, request):
+        if self.virtuals.pop(request.match_info['id'], None) is None:
+            return self._not_found('Virtual')
+        return web.json_response({'status': 'success'})
+
+    async def virtual_effect_get(self, request):
+        virtual = self.virtuals.get(request.match_info['id'])
+        if virtual is None:
+            return self._not_found('Virtual')
+        return web.json_response({'status': 'success', 'effect': virtual['effect']})
+
+    async def virtual_effect_set(self, request):
+        virtual = self.virtuals.get(request.match_info['id'])
+        if virtual is None:
+            return self._not_found('Virtual')
+        if request.method == 'DELETE':
+            virtual['effect'] = {}
+            await self.emit('effect_cleared', virtual_id=request.match_info['id'])
+        else:
+            data = await request.json() if request.can_read_body else {}
+            effect = virtual['effect']
+            config = data.get('config') or {}
+            if request.method == 'PUT':
+                config = {**effect.get('config', {}), **config}
+            effect_type = data.get('type', effect.get('type'))
+            virtual['effect'] = {'type': effect_type, 'name': effect_type, 'config': config}
+            # like LedFx, setting an effect activates a paused virtual
+            virtual['active'] = True
+            await self.emit('effect_set', virtual_id=request.match_info['id'], effect_name=effect_type)
+        return web.json_response({'status': 'success', 'effect': virtual['effect']})
+
+    async def virtual_presets_get(self, request):
+        virtual = self.virtuals.get(request.match_info['id'])
+        if virtual is None:
+            return self._not_found('Virtual')
+        effect_id = virtual['effect'].get('type')
+        return web.json_response({'status': 'success', 'virtual': request.match_info['id'], 'effect': effect_id,
+                                  **{k: v for k, v in self.presets.get(effect_id, {}).items() if k.endswith('presets')}})
+
+    async def virtual_presets_set(self, request):
+        virtual = self.virtuals.get(request.match_info['id'])
+        if virtual is None:
+            return self._not_found('Virtual')
+        data = await request.json()
+        presets = self.presets.get(data.get('effect_id'), {}).get(data.get('category'), {})
+        preset = presets.get(data.get('preset_id'))
+        if preset is None:
+            return self._not_found('Preset')
+        virtual['effect'] = {'type': data['effect_id'], 'name': data['effect_id'], 'config': preset['config']}
+        await self.emit('effect_set', virtual_id=request.match_info['id'], effect_name=data['effect_id'])
+        return web.json_response({'status': 'success', 'effect': virtual['effect']})
+
+
+async def main(port):
+    async with FakeLedFx(port=port) as server:
+        print(f"Fake LedFx listening on http://{server.host}:{server.port}/api/")
+        await asyncio.Event().wait()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--port', type=int, default=8888)
+    asyncio.run(main(parser.parse_args().port))
@@ -0,0 +1,108 @@
+"""Synthetic LedFx payloads shaped like real schema, config and preset responses"""
+
+
+def effect_schema(effect_id, properties=12):
+    return {
+        'schema': {
+            'type': 'object',
+            'properties': {
+                f"{effect_id}_prop_{i}": {
+                    'type': 'number',
+                    'title': f"Property {i}",
+                    'description': f"Setting {i} of the {effect_id} effect",
+                    'default': 0.5,
+                    'minimum': 0,
+                    'maximum': 1,
+                } for i in range(properties)
+            },
+        },
+        'id': effect_id,
+        'name': effect_id.replace('_', ' ').title(),
+        'category': 'Classic',
+    }
+
+
+def schema(effects=60, properties=12):
+    """
+    Response of GET /api/schema
+    """
+    effect_ids = [f"effect_{i}" for i in range(effects)]
+    return {
+        'devices': {
+            kind: {'schema': {'type': 'object', 'properties': {'name': {'type': 'string'}}}, 'id': kind}
+            for kind in ('wled', 'e131', 'ddp', 'udp')
+        },
+        'effects': {effect_id: effect_schema(effect_id, properties) for effect_id in effect_ids},
+        'integrations': {},
+        'virtuals': {'schema': {'type': 'object', 'properties': {}}},
+    }
+
+
+def presets(effect_id, default=8, custom=4):
+    """
+    Response of GET /api/effects/{effect_id}/presets
+    """
+    def preset(name):
+        return {'name': name, 'config': {'brightness': 1.0, 'speed': 0.5, 'gradient': 'linear-gradient(90deg, #ff0000 0%, #0000ff 100%)'}}
+
+    return {
+        'status': 'success',
+        'effect': effect_id,
+        'default_presets': {f"default_{i}": preset(f"Default {i}") for i in range(default)},
+        'custom_presets': {f"custom_{i}": preset(f"Custom {i}") for i in range(custom)},
+    }
+
+
+def virtual(virtual_id, effect_id='effect_0', pixels=300):
+    return {
+        'id': virtual_id,
+        'config': {'name': virtual_id, 'pixel_count': pixels, 'max_brightness': 1.0, 'mapping': 'span'},
+        'active': True,
+        'segments': [[f"device_{virtual_id}", 0, pixels - 1, False]],
+        'effect': {'type': effect_id, 'name': effect_id, 'config': {'brightness': 1.0, 'speed': 0.5}},
+    }
+
+
+def virtuals(count=40):
+    """
+    Response of GET /api/virtuals
+    """
+    return {
+        'status': 'success',
+        'virtuals': {f"virtual_{i}": virtual(f"virtual_{i}") for i in range(count)},
+        'paused': False,
+    }
+
+
+def devices(count=40):
+    """
+    Response of GET /api/devices
+    """
+    return {
+        'status': 'success',
+        'devices': {
+            f"device_{i}": {
+                'id': f"device_{i}",
+                'type': 'wled',
+                'config': {'name': f"device_{i}", 'ip_address': f"10.0.{i // 250}.{i % 250}", 'pixel_count': 300,
+                           'refresh_rate': 60},
+                'online': True,
+                'virtuals': [f"virtual_{i}"],
+            } for i in range(count)
+        },
+    }
+
+
+def config(virtual_count=40, device_count=40):
+    """
+    Response of GET /api/config
+    """
+    return {
+        'host': '0.0.0.0',
+        'port': 8888,
+        'dev_mode': False,
+        'devices': list(devices(device_count)['devices'].values()),
+        'virtuals': list(virtuals(virtual_count)['virtuals'].values()),
+        'scenes': {f"scene_{i}": {'name': f"Scene {i}", 'virtuals': {}} for i in range(10)},
+        'integrations': [],
+    }
@@ -0,0 +1,185 @@
+"""Benchmark suite against the local LedFx stand-in, results are written as JSON"""
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from LedFxAPI import ApiError, LedFx
+from LedFxAPI.rest_client import RESTClient
+
+from benchmarks.fake_server import FakeLedFx
+
+
+def summarize(timings, elapsed=None, errors=0):
+    """
+    :param timings: list of durations of successful calls in seconds
+    :param elapsed: wall time of the whole run, used for throughput
+    :param errors: number of calls that failed with ApiError
+    :return: dict with count, errors, throughput and latency percentiles in ms
+    """
+    ordered = sorted(timings)
+    if not ordered:
+        return {'count': 0, 'errors': errors}
+
+    def percentile(p):
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p))] * 1e3
+
+    result = {
+        'count': len(ordered),
+        'errors': errors,
+        'mean_ms': statistics.mean(ordered) * 1e3,
+        'p50_ms': percentile(0.50),
+        'p99_ms': percentile(0.99),
+        'max_ms': ordered[-1] * 1e3,
+    }
+    if elapsed:
+        result['ops_per_s'] = len(ordered) / elapsed
+    return result
+
+
+async def _timed(coro_factory, count, concurrency):
+    timings = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await coro_factory(i)
+            except ApiError:
+                # e.g. injected with --error-rate, failed calls are counted instead of timed
+                errors += 1
+                return
+            timings.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(count)))
+    return summarize(timings, time.perf_counter() - start, errors)
+
+
+async def bench_rest_verbs(server, args):
+    results = {}
+    async with RESTClient(server.host, server.port, '/api/', coalesce_gets=False) as client:
+        verbs = {
+            'get': lambda i: client.get('virtuals'),
+            'post': lambda i: client.post(f"virtuals/virtual_{i % 10}/effects", {'type': 'effect_1', 'config': {}}),
+            'put': lambda i: client.put(f"virtuals/virtual_{i % 10}/effects", {'config': {'speed': i}}),
+            'delete': lambda i: client.delete(f"virtuals/virtual_{i % 10}/effects"),
+        }
+        for verb, call in verbs.items():
+            results[verb] = await _timed(call, args.calls, args.concurrency)
+    return results
+
+
+async def bench_load_helpers(server, args):
+    async with LedFx(server.host, server.port) as ledfx:
+        return await _timed(lambda i: ledfx.helper.load_helpers(), args.rounds, 1)
+
+
+async def bench_bulk_preset(server, args):
+    async with LedFx(server.host, server.port) as ledfx:
+        await ledfx.helper.load_helpers()
+        virtuals = await ledfx.helper.get_all_virtuals()
+        skews = []
+
+        async def apply(i):
+            result = await ledfx.helper.batch_set_preset(virtuals, 'effect_1', 'default_1')
+            skews.append(result.skew)
+
+        result = await _timed(apply, args.rounds, 1)
+        result['skew_p50_ms'] = statistics.median(skews) * 1e3
+        result['targets'] = len(virtuals)
+        return result
+
+
+SCENARIOS = {
+    'rest_verbs': bench_rest_verbs,
+    'load_helpers': bench_load_helpers,
+    'bulk_preset': bench_bulk_preset,
+}
+
+
+async def run(args):
+    results = {}
+    server = FakeLedFx(effects=args.effects, presets=(args.presets, args.presets // 2), virtuals=args.virtuals,
+                       devices=args.virtuals, latency=args.latency, error_rate=args.error_rate)
+    async with server:
+        for name in args.scenarios:
+            results[name] = {'result': await SCENARIOS[name](server, args)}
+            if args.memory:
+                # separate pass, tracing allocations distorts timings
+                tracemalloc.start()
+                await SCENARIOS[name](server, args)
+                results[name]['peak_memory_kib'] = tracemalloc.get_traced_memory()[1] / 1024
+                tracemalloc.stop()
+    return results
+
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline):
+    """
+    Print the change of mean latency per scenario against a previous run
+    """
+    for name, scenario in current['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if previous is None:
+            continue
+        rows = scenario['result'] if 'count' not in scenario['result'] else {name: scenario['result']}
+        old_rows = previous['result'] if 'count' not in previous['result'] else {name: previous['result']}
+        for row, values in rows.items():
+            # rows where every call failed have no latency
+            if 'mean_ms' in values and 'mean_ms' in old_rows.get(row, {}):
+                change = values['mean_ms'] / old_rows[row]['mean_ms'] - 1
+                print(f"{name}/{row}: mean {values['mean_ms']:.3f} ms ({change:+.1%})", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument('--calls', type=int, default=1000, help='requests per REST verb')
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--rounds', type=int, default=20, help='repetitions of helper scenarios')
+    parser.add_argument('--effects', type=int, default=60)
+    parser.add_argument('--presets', type=int, default=8, help='default presets per effect')
+    parser.add_argument('--virtuals', type=int, default=40)
+    parser.add_argument('--latency', type=float, default=0.0, help='server side latency in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--no-memory', dest='memory', action='store_false', help='skip the memory pass')
+    parser.add_argument('--output', help='write results to this file instead of stdout')
+    parser.add_argument('--baseline', help='results of a previous run to compare against')
+    args = parser.parse_args()
+
+    results = {
+        'timestamp': time.time(),
+        'revision': _git_revision(),
+        'python': platform.python_version(),
+        'parameters': {key: value for key, value in vars(args).items() if key not in ('output', 'baseline')},
+        'scenarios': asyncio.run(run(args)),
+    }
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
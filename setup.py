@@ -20,9 +20,15 @@ setup(
     url='https://github.com/AlgorithmicEntropy/LedFxApiPython',
     download_url='https://github.com/AlgorithmicEntropy/LedFxApiPython/releases/tag/v0.0.2.tar.gz',
     keywords=['FX', 'LedFx', 'Local', 'API'],
+    python_requires='>=3.10',
     install_requires=[
         'requests', 'urllib3'
     ],
+    extras_require={
+        'fast': ['orjson'],
+        'stream': ['ijson'],
+        'numpy': ['numpy'],
+    },
     classifiers=[
         'Development Status :: 3 - Alpha',
         'Intended Audience :: Developers',
@@ -0,0 +1,98 @@
+import asyncio
+import time
+
+import pytest
+
+from LedFxAPI import ApiError, DiskCache, LedFx
+
+from benchmarks.fake_server import FakeLedFx
+
+
+def _indexed(ledfx):
+    return sum(ledfx.helper.preset_index.has_effect(f"effect_{i}") for i in range(5))
+
+
+def test_warm_start_does_not_wait_for_a_hung_instance(tmp_path):
+    async def scenario():
+        async with FakeLedFx(effects=5) as server:
+            async with LedFx(server.host, server.port, disk_cache=DiskCache(str(tmp_path))) as ledfx:
+                await ledfx.helper.load_helpers()
+            server.latency = 5.0
+            ledfx = LedFx(server.host, server.port, disk_cache=DiskCache(str(tmp_path)))
+            start = time.perf_counter()
+            await ledfx.helper.load_helpers()
+            loaded = time.perf_counter() - start
+            assert ledfx.helper.preset_index is not None
+            assert ledfx.helper._index_tasks
+            start = time.perf_counter()
+            await ledfx.close()
+            closed = time.perf_counter() - start
+            assert not ledfx.helper._index_tasks
+            return loaded, closed
+
+    loaded, closed = asyncio.run(scenario())
+    assert loaded < 1.0 and closed < 1.0
+
+
+def test_saved_tables_are_refreshed_only_for_a_new_version(tmp_path):
+    async def scenario():
+        async with FakeLedFx(effects=5) as server:
+            async with LedFx(server.host, server.port, disk_cache=DiskCache(str(tmp_path))) as ledfx:
+                await ledfx.helper.load_helpers()
+            requests = server.requests
+            async with LedFx(server.host, server.port, disk_cache=DiskCache(str(tmp_path))) as ledfx:
+                await ledfx.helper.load_helpers()
+                await ledfx.helper.flush()
+            unchanged = server.requests - requests
+            server.version = '2.1.0'
+            requests = server.requests
+            async with LedFx(server.host, server.port, disk_cache=DiskCache(str(tmp_path))) as ledfx:
+                await ledfx.helper.load_helpers()
+                await ledfx.helper.flush()
+            return unchanged, server.requests - requests
+
+    unchanged, updated = asyncio.run(scenario())
+    # info only, then info, the schema and the presets of all 5 effects
+    assert (unchanged, updated) == (1, 7)
+
+
+def test_partial_tables_are_not_saved(tmp_path):
+    async def scenario():
+        async with FakeLedFx(effects=5) as server:
+            missing = {effect_id: server.presets.pop(effect_id) for effect_id in ('effect_1', 'effect_2')}
+            async with LedFx(server.host, server.port, disk_cache=DiskCache(str(tmp_path))) as ledfx:
+                await ledfx.helper.load_helpers()
+                cold = _indexed(ledfx)
+            server.presets.update(missing)
+            async with LedFx(server.host, server.port, disk_cache=DiskCache(str(tmp_path))) as ledfx:
+                await ledfx.helper.load_helpers()
+                warm = _indexed(ledfx)
+            return cold, warm
+
+    cold, warm = asyncio.run(scenario())
+    assert (cold, warm) == (3, 5)
+
+
+def test_failed_refresh_keeps_the_presets_loaded_before():
+    async def scenario():
+        async with FakeLedFx(effects=5) as server:
+            async with LedFx(server.host, server.port) as ledfx:
+                await ledfx.helper.load_helpers()
+                server.presets.pop('effect_1')
+                await ledfx.helper.load_helpers()
+                return _indexed(ledfx)
+
+    assert asyncio.run(scenario()) == 5
+
+
+def test_closed_client_does_not_reopen_its_session():
+    async def scenario():
+        async with FakeLedFx() as server:
+            ledfx = LedFx(server.host, server.port)
+            await ledfx.api.ledfx_info()
+            await ledfx.close()
+            with pytest.raises(ApiError):
+                await ledfx.api.ledfx_info()
+            assert ledfx.api._client._session is None
+
+    asyncio.run(scenario())
@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+
+from LedFxAPI import ApiError, BatchFailedError, LedFxCluster
+
+from benchmarks.fake_server import FakeLedFx
+
+
+def test_close_closes_all_instances_before_the_session():
+    async def scenario():
+        async with FakeLedFx() as first, FakeLedFx() as second:
+            cluster = LedFxCluster()
+            instances = [cluster.add('first', first.host, first.port), cluster.add('second', second.host, second.port)]
+            commands = [await instance.commands.virtual_pause_unpause('virtual_0', False) for instance in instances]
+            session = cluster.session
+            await cluster.close()
+            assert all(command.done() and command.exception() is None for command in commands)
+            assert session.closed
+            for instance in instances:
+                with pytest.raises(ApiError):
+                    await instance.api.ledfx_info()
+
+    asyncio.run(scenario())
+
+
+def test_remove_closes_the_instance_only():
+    async def scenario():
+        async with FakeLedFx() as server:
+            async with LedFxCluster() as cluster:
+                removed = cluster.add('removed', server.host, server.port)
+                kept = cluster.add('kept', server.host, server.port)
+                await cluster.remove('removed')
+                assert 'removed' not in cluster and cluster.names == ['kept']
+                with pytest.raises(ApiError):
+                    await removed.api.ledfx_info()
+                assert (await kept.api.ledfx_info())['version']
+
+    asyncio.run(scenario())
+
+
+def test_set_preset_fails_instances_where_virtuals_failed():
+    async def scenario():
+        async with FakeLedFx(virtuals=2) as first, FakeLedFx(virtuals=2) as second:
+            async with LedFxCluster() as cluster:
+                cluster.add('first', first.host, first.port)
+                cluster.add('second', second.host, second.port)
+                await cluster.load_helpers()
+                virtual_ids = ['virtual_0', 'virtual_1', 'missing']
+                return await cluster.set_preset('effect_1', 'default_1', virtual_ids), first, second
+
+    result, first, second = asyncio.run(scenario())
+    assert set(result.failed) == {'first', 'second'}
+    error = result.failed['first']
+    assert isinstance(error, BatchFailedError)
+    assert list(error.result.failed) == ['missing'] and error.result.succeeded == ['virtual_0', 'virtual_1']
+    assert first.virtuals['virtual_0']['effect']['type'] == 'effect_1'
@@ -0,0 +1,137 @@
+import asyncio
+
+import pytest
+
+from LedFxAPI import ApiResponseError, CommandQueue, LedFx
+from LedFxAPI.command_queue import VIRTUAL
+
+from benchmarks.fake_server import FakeLedFx
+
+
+async def _until(predicate, timeout=2.0):
+    async def wait():
+        while not predicate():
+            await asyncio.sleep(0.001)
+
+    await asyncio.wait_for(wait(), timeout)
+
+
+def test_commands_run_in_order_per_target_and_concurrently_across_targets():
+    async def scenario():
+        async with FakeLedFx(jitter=0.01, seed=1) as server:
+            async with LedFx(server.host, server.port) as ledfx:
+                queue = CommandQueue(ledfx.api, max_concurrency=4)
+                log = {}
+                running = set()
+                peak = 0
+
+                def operation(virtual_id, index):
+                    async def run():
+                        nonlocal peak
+                        assert virtual_id not in running
+                        running.add(virtual_id)
+                        peak = max(peak, len(running))
+                        try:
+                            return await ledfx.api.virtual_effect_update(virtual_id, {'config': {'step': index}})
+                        finally:
+                            running.discard(virtual_id)
+                            log.setdefault(virtual_id, []).append(index)
+                    return run
+
+                virtual_ids = [f"virtual_{i}" for i in range(8)]
+                for index in range(5):
+                    for virtual_id in virtual_ids:
+                        await queue.submit((VIRTUAL, virtual_id), operation(virtual_id, index))
+                await queue.flush()
+                steps = {virtual_id: server.virtuals[virtual_id]['effect']['config']['step']
+                         for virtual_id in virtual_ids}
+                return log, peak, steps, queue.stats()
+
+    log, peak, steps, stats = asyncio.run(scenario())
+    assert all(order == list(range(5)) for order in log.values()) and len(log) == 8
+    assert 1 < peak <= 4
+    assert set(steps.values()) == {4}
+    assert (stats['completed'], stats['depth'], stats['in_flight'], stats['targets']) == (40, 0, 0, 0)
+
+
+def test_queued_changes_of_the_same_state_collapse():
+    async def scenario():
+        async with FakeLedFx(latency=0.05) as server:
+            async with LedFx(server.host, server.port) as ledfx:
+                queue = CommandQueue(ledfx.api)
+                first = await queue.virtual_effect_set('virtual_0', {'type': 'effect_0', 'config': {}})
+                await _until(lambda: queue.in_flight == 1)
+                dropped = await queue.virtual_effect_set('virtual_0', {'type': 'effect_1', 'config': {}})
+                pause = await queue.virtual_pause_unpause('virtual_0', False)
+                latest = await queue.virtual_effect_set('virtual_0', {'type': 'effect_2', 'config': {}})
+                await queue.flush()
+                return server, queue, [await future for future in (first, dropped, pause, latest)]
+
+    server, queue, (first, dropped, pause, latest) = asyncio.run(scenario())
+    assert first['effect']['type'] == 'effect_0'
+    assert dropped == latest and latest['effect']['type'] == 'effect_2'
+    assert pause['active'] is False
+    assert server.virtuals['virtual_0']['effect']['type'] == 'effect_2'
+    assert queue.target_stats((VIRTUAL, 'virtual_0'))['collapsed'] == 1
+    assert queue.stats()['completed'] == 3
+
+
+def test_partial_updates_are_never_dropped_or_skipped():
+    async def scenario():
+        async with FakeLedFx(latency=0.02) as server:
+            async with LedFx(server.host, server.port) as ledfx:
+                queue = CommandQueue(ledfx.api)
+                await queue.virtual_effect_set('virtual_0', {'type': 'effect_0', 'config': {}})
+                await _until(lambda: queue.in_flight == 1)
+                await queue.virtual_effect_set('virtual_0', {'type': 'effect_1', 'config': {}})
+                await queue.virtual_effect_update('virtual_0', {'config': {'speed': 2}})
+                await queue.virtual_effect_set('virtual_0', {'type': 'effect_2', 'config': {}})
+                await queue.flush()
+                return server.requests, queue.stats()
+
+    requests, stats = asyncio.run(scenario())
+    assert requests == 4 and stats['collapsed'] == 0
+
+
+def test_submit_waits_while_the_queue_is_full():
+    async def scenario():
+        async with FakeLedFx(latency=0.05) as server:
+            async with LedFx(server.host, server.port) as ledfx:
+                queue = CommandQueue(ledfx.api, maxsize=2, max_concurrency=1)
+                await queue.virtual_pause_unpause('virtual_0', False)
+                await _until(lambda: queue.in_flight == 1)
+                await queue.virtual_pause_unpause('virtual_1', False)
+                await queue.virtual_pause_unpause('virtual_2', False)
+                assert queue.depth == 2
+                blocked = asyncio.ensure_future(queue.virtual_pause_unpause('virtual_3', False))
+                await asyncio.sleep(0.02)
+                assert not blocked.done()
+                # a command replacing a queued one needs no slot
+                collapsed = await asyncio.wait_for(queue.virtual_pause_unpause('virtual_2', True), 0.01)
+                future = await asyncio.wait_for(blocked, 1.0)
+                await queue.flush()
+                return await future, await collapsed, server.virtuals
+
+    last, collapsed, virtuals = asyncio.run(scenario())
+    assert last['active'] is False and collapsed['active'] is True
+    assert virtuals['virtual_2']['active'] is True
+
+
+def test_errors_reach_the_futures_of_dropped_commands():
+    async def scenario():
+        async with FakeLedFx(latency=0.02) as server:
+            async with LedFx(server.host, server.port) as ledfx:
+                queue = CommandQueue(ledfx.api)
+                await queue.virtual_effect_set('missing', {'type': 'effect_0', 'config': {}})
+                await _until(lambda: queue.in_flight == 1)
+                dropped = await queue.virtual_effect_set('missing', {'type': 'effect_1', 'config': {}})
+                latest = await queue.virtual_effect_set('missing', {'type': 'effect_2', 'config': {}})
+                await queue.flush()
+                with pytest.raises(ApiResponseError):
+                    await latest
+                assert dropped.exception() is latest.exception()
+                return queue.target_stats((VIRTUAL, 'missing')), queue.last_error
+
+    stats, last_error = asyncio.run(scenario())
+    assert (stats['completed'], stats['errors'], stats['collapsed']) == (0, 2, 1)
+    assert isinstance(last_error, ApiResponseError)
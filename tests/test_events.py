@@ -0,0 +1,100 @@
+import asyncio
+
+from LedFxAPI import LedFx
+from LedFxAPI.events import CONNECTED, DISCONNECTED, EFFECT_SET, VIRTUAL_PAUSE
+
+from benchmarks.fake_server import FakeLedFx
+
+
+async def _until(predicate, timeout=2.0):
+    async def wait():
+        while not predicate():
+            await asyncio.sleep(0.01)
+
+    await asyncio.wait_for(wait(), timeout)
+
+
+def _subscribed(server, event_type):
+    return lambda: any(event_type in subscriptions for subscriptions in server._websockets.values())
+
+
+def test_subscribers_receive_their_event_types():
+    async def scenario():
+        async with FakeLedFx() as server:
+            async with LedFx(server.host, server.port) as ledfx:
+                received, pauses = [], []
+                ledfx.events.subscribe(received.append)
+                ledfx.events.subscribe(pauses.append, [VIRTUAL_PAUSE])
+                ledfx.events.start()
+                await _until(_subscribed(server, EFFECT_SET))
+                await server.emit(EFFECT_SET, virtual_id='virtual_0', effect_name='energy')
+                await server.emit(VIRTUAL_PAUSE, virtual_id='virtual_1')
+                await _until(lambda: len(received) == 3)
+                assert [event.type for event in received] == [CONNECTED, EFFECT_SET, VIRTUAL_PAUSE]
+                assert received[1].virtual_id == 'virtual_0' and received[1].effect_type == 'energy'
+                assert [event.virtual_id for event in pauses] == ['virtual_1']
+
+    asyncio.run(scenario())
+
+
+def test_new_event_types_are_subscribed_on_the_open_connection():
+    async def scenario():
+        async with FakeLedFx() as server:
+            async with LedFx(server.host, server.port) as ledfx:
+                client = ledfx.events
+                client.event_types = {EFFECT_SET}
+                client.start()
+                await client.wait_connected(2.0)
+                events = client.events(['custom_event'])
+                received = asyncio.ensure_future(events.__anext__())
+                await _until(_subscribed(server, 'custom_event'))
+                await server.emit('custom_event', value=1)
+                event = await asyncio.wait_for(received, 2.0)
+                await events.aclose()
+                return event.data
+
+    assert asyncio.run(scenario()) == {'value': 1}
+
+
+def test_reconnects_after_the_websocket_is_dropped():
+    async def scenario():
+        async with FakeLedFx() as server:
+            async with LedFx(server.host, server.port) as ledfx:
+                client = ledfx.events
+                client.reconnect_policy.backoff = 0.01
+                received = []
+                client.subscribe(received.append)
+                client.start()
+                await _until(_subscribed(server, EFFECT_SET))
+                await server.drop_websockets()
+                await _until(lambda: client.reconnects == 1 and _subscribed(server, EFFECT_SET)())
+                await server.emit(EFFECT_SET, virtual_id='virtual_0')
+                await _until(lambda: received[-1].type == EFFECT_SET)
+                return [event.type for event in received]
+
+    assert asyncio.run(scenario()) == [CONNECTED, DISCONNECTED, CONNECTED, EFFECT_SET]
+
+
+def test_unexpected_errors_reconnect_instead_of_ending_the_task():
+    async def scenario():
+        async with FakeLedFx() as server:
+            async with LedFx(server.host, server.port) as ledfx:
+                client = ledfx.events
+                client.reconnect_policy.backoff = 0.01
+                receive = client._receive
+                failures = []
+
+                async def failing_receive(ws):
+                    if not failures:
+                        failures.append(RuntimeError('broken handler'))
+                        raise failures[0]
+                    await receive(ws)
+
+                client._receive = failing_receive
+                client.start()
+                await _until(lambda: client.reconnects == 1 and client.connected)
+                assert client.last_error is failures[0]
+                assert not client._task.done()
+            assert client._task is None
+
+    asyncio.run(scenario())
@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+
+from LedFxAPI import FrameStreamer
+from LedFxAPI.frame_streamer import DDP_DATATYPE_RGB, DDP_DESTINATION, DDP_MAX_DATA, DDP_PUSH, DDP_VERSION_1
+
+from benchmarks.ddp_receiver import DdpReceiver
+
+
+async def _until(predicate, timeout=2.0):
+    async def wait():
+        while not predicate():
+            await asyncio.sleep(0.005)
+
+    await asyncio.wait_for(wait(), timeout)
+
+
+def _frame(pixels, seed=0):
+    return bytes((seed + i * 7) % 256 for i in range(pixels * 3))
+
+
+@pytest.mark.parametrize('scatter', [True, False])
+def test_frame_is_split_into_packets(scatter):
+    async def scenario():
+        async with DdpReceiver(pixel_count=1000) as receiver:
+            async with FrameStreamer(receiver.host, receiver.port) as streamer:
+                streamer._scatter = streamer._scatter and scatter
+                frame = _frame(1000)
+                assert streamer.send(frame) == 3
+                await _until(lambda: receiver.frames == 1)
+            return receiver, frame
+
+    receiver, frame = asyncio.run(scenario())
+    assert receiver.frame == frame
+    assert receiver.headers == [
+        (DDP_VERSION_1, 1, DDP_DATATYPE_RGB, DDP_DESTINATION, 0, DDP_MAX_DATA),
+        (DDP_VERSION_1, 1, DDP_DATATYPE_RGB, DDP_DESTINATION, DDP_MAX_DATA, DDP_MAX_DATA),
+        (DDP_VERSION_1 | DDP_PUSH, 1, DDP_DATATYPE_RGB, DDP_DESTINATION, 2 * DDP_MAX_DATA, 3000 - 2 * DDP_MAX_DATA),
+    ]
+
+
+def test_frames_are_cut_to_the_pixel_count_and_sequences_wrap():
+    async def scenario():
+        async with DdpReceiver(pixel_count=10) as receiver:
+            async with FrameStreamer(receiver.host, receiver.port, pixel_count=10) as streamer:
+                for seed in range(16):
+                    streamer.send(_frame(20, seed))
+                await _until(lambda: receiver.frames == 16)
+            return receiver
+
+    receiver = asyncio.run(scenario())
+    assert receiver.frame == _frame(10, 15)
+    assert {header[5] for header in receiver.headers} == {30}
+    assert receiver.sequences == list(range(1, 16)) + [1]
+
+
+def test_non_contiguous_frames_are_sent():
+    numpy = pytest.importorskip('numpy')
+
+    async def scenario():
+        rgba = numpy.arange(600 * 4, dtype=numpy.uint8).reshape(600, 4)
+        async with DdpReceiver(pixel_count=600) as receiver:
+            async with FrameStreamer(receiver.host, receiver.port) as streamer:
+                streamer.send(rgba[:, :3])
+                await _until(lambda: receiver.frames == 1)
+            return receiver.frame, rgba[:, :3].tobytes()
+
+    received, expected = asyncio.run(scenario())
+    assert received == expected
+
+
+def test_push_sends_the_latest_frame():
+    async def scenario():
+        async with DdpReceiver(pixel_count=10) as receiver:
+            async with FrameStreamer(receiver.host, receiver.port, fps=50) as streamer:
+                for seed in range(5):
+                    streamer.push(_frame(10, seed))
+                await _until(lambda: receiver.frames == 1)
+                return streamer.stats(), bytes(receiver.frame)
+
+    stats, frame = asyncio.run(scenario())
+    assert (stats['frames_pushed'], stats['frames_sent'], stats['frames_dropped']) == (5, 1, 4)
+    assert frame == _frame(10, 4)
+
+
+def test_push_is_paced_to_the_frame_rate():
+    async def scenario():
+        async with DdpReceiver(pixel_count=10) as receiver:
+            async with FrameStreamer(receiver.host, receiver.port, fps=20) as streamer:
+                loop = asyncio.get_running_loop()
+                end = loop.time() + 0.5
+                seed = 0
+                while loop.time() < end:
+                    streamer.push(_frame(10, seed))
+                    seed += 1
+                    await asyncio.sleep(0.002)
+                return streamer.frames_sent, streamer.achieved_fps
+
+    sent, fps = asyncio.run(scenario())
+    assert 5 <= sent <= 12
+    assert fps == pytest.approx(20, rel=0.3)
+
+
+def test_last_frame_is_resent_as_keepalive():
+    async def scenario():
+        async with DdpReceiver(pixel_count=10) as receiver:
+            async with FrameStreamer(receiver.host, receiver.port, keepalive=0.05) as streamer:
+                streamer.push(_frame(10))
+                await _until(lambda: receiver.frames >= 3)
+                return streamer.keepalives, streamer.frames_sent
+
+    keepalives, sent = asyncio.run(scenario())
+    assert keepalives >= 2 and sent == 1
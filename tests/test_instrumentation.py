@@ -0,0 +1,40 @@
+import asyncio
+import types
+
+from LedFxAPI import Instrumentation, LedFx
+from LedFxAPI import instrumentation
+from LedFxAPI.instrumentation import RequestEvent
+
+from benchmarks.fake_server import FakeLedFx
+
+
+def test_dns_and_connect_are_timed_from_their_own_start(monkeypatch):
+    trace_config = Instrumentation().trace_config()
+    event = RequestEvent('GET', 'info')
+    ctx = types.SimpleNamespace(trace_request_ctx=event)
+    clock = iter([1.0, 2.0, 4.0, 7.0])
+    monkeypatch.setattr(instrumentation.time, 'perf_counter', lambda: next(clock))
+
+    async def scenario():
+        # order of the aiohttp signals: the dns lookup runs inside connection creation
+        for signal in (trace_config.on_connection_create_start, trace_config.on_dns_resolvehost_start,
+                       trace_config.on_dns_resolvehost_end, trace_config.on_connection_create_end):
+            for callback in signal:
+                await callback(None, ctx, None)
+
+    asyncio.run(scenario())
+    assert (event.dns, event.connect) == (2.0, 6.0)
+
+
+def test_requests_report_connect_and_ttfb():
+    async def scenario():
+        events = []
+        async with FakeLedFx() as server:
+            async with LedFx('localhost', server.port, instrumentation=Instrumentation([events.append])) as ledfx:
+                await ledfx.api.ledfx_info()
+        return events
+
+    event, = asyncio.run(scenario())
+    assert event.connect is not None and event.ttfb is not None
+    assert event.dns is None or event.dns <= event.connect
+    assert event.ttfb <= event.total
@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+from LedFxAPI import ApiTimeoutError, CircuitBreaker, CircuitOpenError, LedFx, RetryPolicy
+
+from benchmarks.fake_server import FakeLedFx
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_circuit_opens_after_threshold_and_half_opens_after_timeout():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10.0, clock=clock)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+    assert breaker.rejected == 1
+    clock.now = 4.0
+    assert breaker.retry_after() == pytest.approx(6.0)
+    clock.now = 10.0
+    assert breaker.allow_request()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+
+def test_half_open_trial_closes_or_reopens():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=5.0, clock=clock)
+    breaker.record_failure()
+    clock.now = 5.0
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+    clock.now = 10.0
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.failures == 0
+
+
+def test_retries_idempotent_requests_on_timeout():
+    async def scenario():
+        async with FakeLedFx(latency=0.2) as server:
+            policy = RetryPolicy(attempts=3, backoff=0.0)
+            async with LedFx(server.host, server.port, timeout=0.1, retry_policy=policy) as ledfx:
+                with pytest.raises(ApiTimeoutError):
+                    await ledfx.api.virtual_pause_unpause('virtual_0', False)
+            await asyncio.sleep(0.25)
+            return server.requests
+
+    assert asyncio.run(scenario()) == 3
+
+
+def test_pause_toggle_is_never_retried():
+    async def scenario():
+        async with FakeLedFx(latency=0.2) as server:
+            policy = RetryPolicy(attempts=3, backoff=0.0)
+            async with LedFx(server.host, server.port, timeout=0.1, retry_policy=policy) as ledfx:
+                with pytest.raises(ApiTimeoutError):
+                    await ledfx.api.virtuals_pause_unpause_all()
+            await asyncio.sleep(0.25)
+            return server.requests, server.paused
+
+    assert asyncio.run(scenario()) == (1, True)
+
+
+def test_open_circuit_fails_fast():
+    async def scenario():
+        async with FakeLedFx(error_rate=1.0) as server:
+            breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60.0)
+            async with LedFx(server.host, server.port, retry_policy=RetryPolicy(attempts=1),
+                             circuit_breaker=breaker) as ledfx:
+                for _ in range(2):
+                    with pytest.raises(Exception):
+                        await ledfx.api.virtual_pause_unpause('virtual_0', False)
+                with pytest.raises(CircuitOpenError):
+                    await ledfx.api.virtual_pause_unpause('virtual_0', False)
+            return server.requests
+
+    assert asyncio.run(scenario()) == 2
+
+
+def test_per_call_timeout_overrides_the_client_timeout():
+    async def scenario():
+        async with FakeLedFx(latency=0.2) as server:
+            policy = RetryPolicy(attempts=1)
+            async with LedFx(server.host, server.port, timeout=10.0, retry_policy=policy) as ledfx:
+                with pytest.raises(ApiTimeoutError):
+                    await ledfx.api.ledfx_schema(timeout=0.05)
+                with pytest.raises(ApiTimeoutError):
+                    await ledfx.api.virtual_effect_set('virtual_0', {'type': 'effect_1'}, timeout=0.05)
+                return (await ledfx.api.ledfx_info(timeout=1.0))['version']
+
+    assert asyncio.run(scenario()) == '2.0.0'
@@ -0,0 +1,38 @@
+import pytest
+
+from LedFxAPI import ResponseCache
+
+TTLS = {'info': 60, 'effects/': 60, 'devices/': 60, 'virtuals': 60}
+PATHS = ['info', 'effects/energy/presets', 'effects/rainbow/presets', 'devices/wled/presets', 'virtuals',
+         'virtuals/v0/presets']
+
+
+def _cache():
+    cache = ResponseCache(ttls=TTLS)
+    for path in PATHS:
+        cache.store(path, {}, 10)
+    return cache
+
+
+def _cached(cache):
+    return [path for path in PATHS if cache.lookup(path) is not None]
+
+
+@pytest.mark.parametrize('method, path', [('PUT', 'effects/energy/presets'), ('DELETE', 'effects/energy/presets'),
+                                          ('POST', 'devices/wled/presets')])
+def test_preset_changes_drop_all_preset_lists(method, path):
+    cache = _cache()
+    cache.invalidate_for(method, path)
+    assert _cached(cache) == ['info', 'virtuals']
+
+
+def test_applying_a_preset_keeps_preset_lists_of_other_resources():
+    cache = _cache()
+    cache.invalidate_for('PUT', 'virtuals/v0/presets')
+    assert _cached(cache) == ['info', 'effects/energy/presets', 'effects/rainbow/presets', 'devices/wled/presets']
+
+
+def test_mutation_drops_its_top_level_resource():
+    cache = _cache()
+    cache.invalidate_for('POST', 'effects/energy')
+    assert _cached(cache) == ['info', 'devices/wled/presets', 'virtuals', 'virtuals/v0/presets']
@@ -0,0 +1,22 @@
+import asyncio
+
+from LedFxAPI import LedFx, ResponseCache
+
+from benchmarks.fake_server import FakeLedFx
+
+
+def test_selections_are_served_from_the_cache():
+    async def scenario():
+        async with FakeLedFx(effects=5) as server:
+            cache = ResponseCache()
+            async with LedFx(server.host, server.port, cache=cache) as ledfx:
+                effect_ids = [await ledfx.helper.get_all_effect_ids() for _ in range(5)]
+                names = await ledfx.api.ledfx_schema(select='effects.effect_0.name')
+                full = await ledfx.api.ledfx_schema()
+            return server.requests, effect_ids, names, full, cache.stats()
+
+    requests, effect_ids, names, full, stats = asyncio.run(scenario())
+    assert requests == 1
+    assert all(ids == list(full['effects']) for ids in effect_ids)
+    assert names == {'effects': {'effect_0': {'name': full['effects']['effect_0']['name']}}}
+    assert (stats['hits'], stats['entries']) == (6, 1)
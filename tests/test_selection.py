@@ -0,0 +1,68 @@
+import asyncio
+import json
+
+import pytest
+
+from LedFxAPI import selection
+
+DOCUMENT = {
+    'info': {'version': '2.0.0', 'name': 'LedFx'},
+    'effects': {
+        'energy': {'id': 'energy', 'name': 'Energy', 'schema': {'properties': {'speed': {'default': 1.5}}}},
+        'rainbow': {'id': 'rainbow', 'name': 'Rainbow', 'schema': {'properties': {}}},
+    },
+    'virtuals': [{'id': 'v0', 'active': True}, {'id': 'v1', 'active': False}],
+    'tail': list(range(100)),
+}
+
+SELECTIONS = ['info.version', 'effects.*.id', 'effects.energy.schema', 'virtuals.*.active', 'virtuals.1',
+              ['info.name', 'effects.rainbow.name'], '', 'missing.key', 'tail.3']
+
+
+@pytest.mark.parametrize('select', SELECTIONS)
+def test_streaming_selection_matches_pruning(select):
+    pytest.importorskip('ijson')
+    paths = selection.compile_paths(select)
+    data = json.dumps(DOCUMENT).encode()
+    assert selection.select_bytes(data, paths) == selection.prune(DOCUMENT, paths)
+
+
+def test_selector_stops_once_nothing_can_match():
+    pytest.importorskip('ijson')
+    import ijson
+
+    selector = selection._Selector(selection.compile_paths('info.version'))
+    events = 0
+    for event, value in ijson.basic_parse(json.dumps(DOCUMENT).encode()):
+        events += 1
+        if selector.event(event, value):
+            break
+    assert selector.result == {'info': {'version': '2.0.0'}}
+    assert events < 10
+
+
+def test_select_stream_reads_selected_values():
+    pytest.importorskip('ijson')
+
+    class Stream:
+        def __init__(self, data):
+            self.data = data
+
+        async def read(self, size=-1):
+            size = len(self.data) if size < 0 else size
+            chunk, self.data = self.data[:size], self.data[size:]
+            return chunk
+
+    paths = selection.compile_paths(['info.name', 'virtuals.0.id'])
+    result = asyncio.run(selection.select_stream(Stream(json.dumps(DOCUMENT).encode()), paths))
+    assert result == {'info': {'name': 'LedFx'}, 'virtuals': [{'id': 'v0'}]}
+
+
+def test_wildcard_selections_are_not_streamed():
+    pytest.importorskip('ijson')
+    size = selection.STREAMING_MIN_BYTES
+    assert selection.should_stream(size, selection.compile_paths('effects.energy.id'))
+    assert selection.should_stream(None, selection.compile_paths('info.version'))
+    assert not selection.should_stream(size - 1, selection.compile_paths('info.version'))
+    assert not selection.should_stream(size, selection.compile_paths('effects.*.id'))
+    assert not selection.should_stream(None, selection.compile_paths(['info.version', 'virtuals.*.id']))
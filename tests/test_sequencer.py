@@ -0,0 +1,36 @@
+import asyncio
+
+from LedFxAPI import Cue, LedFx, Sequencer
+
+from benchmarks.fake_server import FakeLedFx
+
+
+def test_cues_of_one_virtual_apply_in_order():
+    async def scenario():
+        async with FakeLedFx(virtuals=2, jitter=0.03, seed=0) as server:
+            async with LedFx(server.host, server.port) as ledfx:
+                cues = [Cue.effect(0.05, 'virtual_0', 'effect_2', {'speed': 1}),
+                        Cue.update(0.055, 'virtual_0', {'brightness': 0.5}),
+                        Cue.effect(0.05, 'virtual_1', 'effect_3')]
+                report = await Sequencer(ledfx, lead_fraction=0).run(cues)
+                return report, server.virtuals
+
+    report, virtuals = asyncio.run(scenario())
+    assert not report.failed
+    effect, update, other = sorted(report, key=lambda result: (result.cue.virtual_id, result.cue.at))
+    assert update.fired >= effect.completed
+    assert other.fired < effect.completed
+    assert virtuals['virtual_0']['effect'] == {'type': 'effect_2', 'name': 'effect_2',
+                                               'config': {'speed': 1, 'brightness': 0.5}}
+
+
+def test_preset_cues_look_up_the_category():
+    async def scenario():
+        async with FakeLedFx(virtuals=1) as server:
+            async with LedFx(server.host, server.port) as ledfx:
+                await ledfx.helper.load_helpers()
+                report = await Sequencer(ledfx).run([Cue.preset(0.01, 'virtual_0', 'effect_1', 'default_1')])
+                return report, server.virtuals['virtual_0']['effect']['type']
+
+    report, effect_type = asyncio.run(scenario())
+    assert not report.failed and effect_type == 'effect_1'
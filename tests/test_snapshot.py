@@ -0,0 +1,85 @@
+import asyncio
+import copy
+
+from LedFxAPI import LedFx, Snapshot
+from LedFxAPI.snapshot import ACTIVE, ADD, DEVICE, EFFECT, MODIFY, PAUSED, REMOVE, VIRTUAL, diff
+
+from benchmarks.fake_server import FakeLedFx
+
+
+def _desired(snapshot):
+    return Snapshot.from_dict(copy.deepcopy(snapshot.to_dict()))
+
+
+def test_diff_of_equal_snapshots_is_empty():
+    async def scenario():
+        async with FakeLedFx(devices=3, virtuals=3) as server, LedFx(server.host, server.port) as ledfx:
+            snapshot = await ledfx.snapshot()
+            return diff(snapshot, _desired(snapshot))
+
+    assert asyncio.run(scenario()) == []
+
+
+def test_diff_uses_partial_updates():
+    current = Snapshot(devices={'d': {'type': 'wled', 'config': {'a': 1, 'b': 2}}},
+                       virtuals={'v': {'config': {}, 'active': True, 'effect': {'type': 'e', 'config': {'x': 1}}}})
+    desired = Snapshot(devices={'d': {'type': 'wled', 'config': {'a': 1, 'b': 3}}},
+                       virtuals={'v': {'config': {}, 'active': False, 'effect': {'type': 'e', 'config': {'x': 2}}}},
+                       paused=True)
+    changes = {(change.kind, change.op): change for change in diff(current, desired)}
+    assert changes[DEVICE, MODIFY].data == {'config': {'b': 3}}
+    assert changes[EFFECT, MODIFY].data == {'config': {'x': 2}}
+    assert changes['active', MODIFY].data == {'active': False}
+    assert (PAUSED, MODIFY) in changes
+
+
+def test_new_virtual_is_created_before_its_effect():
+    current = Snapshot()
+    desired = Snapshot(virtuals={'v': {'config': {'name': 'v'}, 'active': True,
+                                       'effect': {'type': 'e', 'config': {}}}})
+    ops = [(change.kind, change.op) for change in diff(current, desired)]
+    assert ops == [(VIRTUAL, ADD), (EFFECT, ADD)]
+
+
+def test_device_type_change_removes_before_adding():
+    async def scenario():
+        async with FakeLedFx(devices=3, virtuals=3) as server, LedFx(server.host, server.port) as ledfx:
+            desired = _desired(await ledfx.snapshot())
+            desired.devices['device_1']['type'] = 'ddp'
+            result = await ledfx.reconcile(desired)
+            order = sorted(result, key=lambda target: target.completed_at)
+            return [(r.target.op, r.ok) for r in order], server.devices.get('device_1')
+
+    calls, device = asyncio.run(scenario())
+    assert calls == [(REMOVE, True), (ADD, True)]
+    assert device is not None and device['type'] == 'ddp'
+
+
+def test_reconcile_reaches_desired_state():
+    async def scenario():
+        async with FakeLedFx(devices=3, virtuals=3) as server, LedFx(server.host, server.port) as ledfx:
+            desired = _desired(await ledfx.snapshot())
+            desired.virtuals['virtual_0']['active'] = False
+            desired.virtuals['virtual_1']['effect'] = {'type': 'effect_3', 'config': {'speed': 1}}
+            del desired.devices['device_2']
+            result = await ledfx.reconcile(desired)
+            assert not result.failed
+            return diff(await ledfx.snapshot(), desired)
+
+    assert asyncio.run(scenario()) == []
+
+
+def test_virtual_is_paused_after_its_effect_is_set():
+    async def scenario():
+        async with FakeLedFx(devices=3, virtuals=3, jitter=0.02, seed=0) as server:
+            async with LedFx(server.host, server.port) as ledfx:
+                desired = _desired(await ledfx.snapshot())
+                desired.virtuals['virtual_0']['active'] = False
+                desired.virtuals['virtual_0']['effect'] = {'type': 'effect_3', 'config': {'speed': 1}}
+                result = await ledfx.reconcile(desired)
+                order = sorted(result, key=lambda target: target.completed_at)
+                return [r.target.kind for r in order], server.virtuals['virtual_0']
+
+    kinds, virtual = asyncio.run(scenario())
+    assert kinds == [EFFECT, ACTIVE]
+    assert virtual['active'] is False and virtual['effect']['type'] == 'effect_3'
@@ -0,0 +1,42 @@
+import asyncio
+
+from LedFxAPI import LedFx
+
+from benchmarks.fake_server import FakeLedFx
+
+PRESET = {'category': 'default_presets', 'effect_id': 'effect_1', 'preset_id': 'default_1'}
+
+
+def test_local_changes_update_the_mirror_without_refetching():
+    async def scenario():
+        async with FakeLedFx(virtuals=3) as server:
+            async with LedFx(server.host, server.port) as ledfx:
+                await ledfx.state.load()
+                requests = server.requests
+                await ledfx.api.virtual_effect_set('virtual_0', {'type': 'effect_2', 'config': {'speed': 2}})
+                await ledfx.api.virtual_presets_set('virtual_1', PRESET)
+                await ledfx.api.virtual_pause_unpause('virtual_2', False)
+                await asyncio.sleep(0.05)
+                return server, ledfx.state, server.requests - requests
+
+    server, state, requests = asyncio.run(scenario())
+    assert requests == 3
+    assert state.virtuals['virtual_0'].effect.id == 'effect_2'
+    assert state.virtuals['virtual_1'].effect.id == 'effect_1'
+    assert state._virtual_data['virtual_1']['effect'] == server.virtuals['virtual_1']['effect']
+    assert state.virtuals['virtual_2'].active is False
+
+
+def test_other_changes_refresh_the_mirror():
+    async def scenario():
+        async with FakeLedFx(virtuals=3) as server:
+            async with LedFx(server.host, server.port) as ledfx:
+                await ledfx.state.load()
+                requests = server.requests
+                await ledfx.api.virtual_delete('virtual_2')
+                await asyncio.sleep(0.05)
+                return ledfx.state, server.requests - requests
+
+    state, requests = asyncio.run(scenario())
+    assert requests == 3
+    assert 'virtual_2' not in state.virtuals
@@ -0,0 +1,40 @@
+import asyncio
+import time
+
+import pytest
+
+from LedFxAPI import SyncLedFx
+from LedFxAPI.sync_client import LoopThread
+
+from benchmarks.fake_server import FakeLedFx
+
+
+def test_run_cancels_the_coroutine_when_the_caller_gives_up():
+    thread = LoopThread()
+    finished = []
+
+    async def work():
+        await asyncio.sleep(0.2)
+        finished.append(True)
+
+    try:
+        with pytest.raises(TimeoutError):
+            thread.run(work(), timeout=0.05)
+        time.sleep(0.3)
+    finally:
+        thread.stop()
+    assert finished == []
+
+
+def test_blocking_calls_reach_the_instance():
+    server_thread = LoopThread('server')
+    server = FakeLedFx(virtuals=2)
+    server_thread.run(server.start())
+    try:
+        with SyncLedFx(server.host, server.port, call_timeout=5.0) as ledfx:
+            ledfx.api.virtual_pause_unpause('virtual_0', False)
+            assert ledfx.api.ledfx_info()['version'] == '2.0.0'
+        assert server.virtuals['virtual_0']['active'] is False
+    finally:
+        server_thread.run(server.stop())
+        server_thread.stop()